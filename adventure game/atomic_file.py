@@ -0,0 +1,31 @@
+# saves, the save index and the story bundle are all replaced whole. the new contents go to a temp file
+# next to the old one and are renamed over it, so a crash halfway through leaves either the old file
+# or the new one, never half of each
+import os
+
+def write_atomically(filepath, data):
+    temp_path = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    sync_directory(os.path.dirname(filepath))
+
+# the rename lives in the directory, it isn't on disk until the directory is synced too
+def sync_directory(directory):
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return # windows can't open a directory, its renames don't need this
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
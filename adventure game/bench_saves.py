@@ -0,0 +1,99 @@
+# compares the save codecs on a full party world state: how big a snapshot (in the sectioned layout
+# the game writes) and an autosave delta are, how long encoding and decoding take, and how long a
+# real store (snapshot written and fsynced), load (snapshot plus a run of deltas) and lazy open (what
+# loading a game from the menu does) take on this disk.
+# python bench_saves.py --rounds 2000
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from party import Party
+from player_classes import Mage
+from npc_classes import Fighter, Healer, Rogue
+from save_codecs import CODECS
+from save_journal import SaveJournal, diff_state, encode_snapshot
+from save_states import capture_state
+from tree import create_story
+
+def build_world():
+    player = Mage("Bench")
+    party = Party("player")
+    party.add_member(player)
+    for companion in (Fighter("Brom"), Healer("Ise"), Rogue("Vex")):
+        party.add_member(companion)
+    for member in party.members:
+        member.inventory.add_item("Mana Potion", 2)
+        member.inventory.add_item("Strength Elixir", 1)
+        member.active_buffs = {"Strength": [5, 5], "Defense": [3]}
+    story = create_story()
+    story.current_node = story.nodes["merchant"]
+    return player, party, story, random.Random(0)
+
+def autosave_states(count):
+    player, party, story, rng = build_world()
+    states = []
+    for turn in range(count):
+        member = party.members[turn % len(party.members)]
+        member.stats["Health"] -= 3
+        member.inventory.add_item("Health Potion", 1)
+        states.append(capture_state(player, "dungeon" if turn % 2 else "town", party, story, rng))
+    return states
+
+def time_per_call(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds
+
+def bench_codec(codec, states, rounds, directory):
+    delta = {"delta": diff_state(states[0], states[1])}
+    snapshot = encode_snapshot(codec, states[0])
+    encode_time = time_per_call(lambda: encode_snapshot(codec, states[0]), rounds)
+    decode_time = time_per_call(lambda: codec.read_frames(snapshot), rounds)
+
+    path = os.path.join(directory, f"bench_{codec.name}.save")
+    journal = SaveJournal(path, codec, compact_after=len(states))
+    store_time = time_per_call(lambda: journal.write_base(states[0]), max(1, rounds // 100))
+    for state in states[1:]:
+        journal.write(state)
+    file_size = os.path.getsize(path)
+    load_time = time_per_call(lambda: SaveJournal(path, codec, allow_pickle=True).load(), max(1, rounds // 20))
+    open_time = time_per_call(lambda: SaveJournal(path, codec, allow_pickle=True).open_lazy().close(),
+                              max(1, rounds // 20))
+    return {
+            "codec": codec.name,
+            "snapshot": len(snapshot),
+            "delta": len(codec.frame(delta)),
+            "file": file_size,
+            "encode_us": encode_time * 1e6,
+            "decode_us": decode_time * 1e6,
+            "store_ms": store_time * 1e3,
+            "load_ms": load_time * 1e3,
+            "open_ms": open_time * 1e3
+            }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the save codecs")
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--deltas", type=int, default=20, help="autosaves appended before timing a load")
+    parser.add_argument("--codecs", nargs="+", default=list(CODECS), choices=list(CODECS))
+    args = parser.parse_args()
+
+    states = autosave_states(args.deltas + 1)
+    directory = tempfile.mkdtemp(prefix="bench_saves")
+    try:
+        results = [bench_codec(CODECS[name], states, args.rounds, directory) for name in args.codecs]
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"{'Codec':<8} {'Snapshot':>8} {'Delta':>6} {'File':>7} {'Enc us':>8} {'Dec us':>8} "
+          f"{'Store ms':>9} {'Load ms':>8} {'Open ms':>8}")
+    for result in results:
+        print(f"{result['codec']:<8} {result['snapshot']:>8} {result['delta']:>6} {result['file']:>7} "
+              f"{result['encode_us']:>8.1f} {result['decode_us']:>8.1f} {result['store_ms']:>9.2f} "
+              f"{result['load_ms']:>8.2f} {result['open_ms']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# boss behaviour used to be if/elif chains on the boss class name in two different places in
+# combat. each boss class now registers a profile (when to drink, when to cast) and the profile is
+# turned into a couple of small functions once, so combat only does a dict lookup per boss turn.
+# adding a boss type means adding a register_boss_profile call, not editing combat.
+import random
+from collections import namedtuple
+
+CAST_WHEN_HEALTHY = "healthy" # cast while health is above cast_threshold of max health
+CAST_WHEN_HURT = "hurt" # cast once health drops below cast_threshold of max health
+CAST_BY_CHANCE = "chance" # cast cast_threshold of the time
+
+BossProfile = namedtuple("BossProfile", "potion_threshold cast_rule cast_threshold")
+
+class BossPolicy:
+    __slots__ = ("profile", "wants_to_cast", "cast_chance")
+
+    def __init__(self, profile):
+        self.profile = profile
+        threshold = profile.cast_threshold
+        if profile.cast_rule == CAST_WHEN_HEALTHY:
+            self.wants_to_cast = lambda boss, rng: boss.stats["Health"] > boss.max_health * threshold
+            self.cast_chance = lambda boss: 1.0 if boss.stats["Health"] > boss.max_health * threshold else 0.0
+        elif profile.cast_rule == CAST_WHEN_HURT:
+            self.wants_to_cast = lambda boss, rng: boss.stats["Health"] < boss.max_health * threshold
+            self.cast_chance = lambda boss: 1.0 if boss.stats["Health"] < boss.max_health * threshold else 0.0
+        elif profile.cast_rule == CAST_BY_CHANCE:
+            self.wants_to_cast = lambda boss, rng: rng.random() < threshold
+            self.cast_chance = lambda boss: threshold
+        else:
+            raise ValueError(f"Unknown cast rule: {profile.cast_rule}")
+
+    def should_use_mana_potion(self, boss):
+        if boss.inventory.get_item_count("Mana Potion") == 0:
+            return False
+        best_spell = boss.get_spell_table().best_spell
+        if not best_spell:
+            return False
+        return (boss.current_mana < best_spell.mana_cost
+                and boss.current_mana < boss.max_mana * self.profile.potion_threshold)
+
+    def choose_action(self, boss, rng=random):
+        if self.should_use_mana_potion(boss):
+            return "use_item", "Mana Potion"
+        spell_table = boss.get_spell_table()
+        if spell_table.can_cast_any(boss.current_mana) and self.wants_to_cast(boss, rng):
+            return "cast_spell", spell_table.choose(boss.current_mana, rng)
+        return "attack", None
+
+BOSS_POLICIES = {}
+
+def register_boss_profile(boss_class, potion_threshold, cast_rule, cast_threshold):
+    policy = BossPolicy(BossProfile(potion_threshold, cast_rule, cast_threshold))
+    BOSS_POLICIES[boss_class] = policy
+    return policy
+
+register_boss_profile("Dragon", potion_threshold=0.4, cast_rule=CAST_WHEN_HEALTHY, cast_threshold=0.7)
+register_boss_profile("Troll", potion_threshold=0.25, cast_rule=CAST_WHEN_HURT, cast_threshold=0.6)
+register_boss_profile("Giant", potion_threshold=0.3, cast_rule=CAST_BY_CHANCE, cast_threshold=0.6)
+
+def get_boss_policy(boss):
+    return BOSS_POLICIES.get(getattr(boss, "boss_class", None))
+
+def should_use_mana_potion(boss):
+    policy = get_boss_policy(boss)
+    if policy is None:
+        return False
+    return policy.should_use_mana_potion(boss)
+
+def choose_boss_action(boss, rng=random):
+    policy = get_boss_policy(boss)
+    if policy is None:
+        return "attack", None
+    return policy.choose_action(boss, rng)
+
+def choose_boss_actions(bosses, rng=random):
+    return [choose_boss_action(boss, rng) for boss in bosses]
+
+# what each boss would do on its next turn without rolling any dice, for balancing sweeps.
+# expected_spell_damage is the chance of casting times the average damage of the spell it would pick
+BossScore = namedtuple("BossScore", "uses_potion cast_chance expected_spell_damage")
+
+def score_bosses(bosses):
+    scores = []
+    for boss in bosses:
+        policy = get_boss_policy(boss)
+        if policy is None:
+            scores.append(BossScore(False, 0.0, 0.0))
+            continue
+        if policy.should_use_mana_potion(boss):
+            scores.append(BossScore(True, 0.0, 0.0))
+            continue
+        spell_table = boss.get_spell_table()
+        if not spell_table.can_cast_any(boss.current_mana):
+            scores.append(BossScore(False, 0.0, 0.0))
+            continue
+        cast_chance = policy.cast_chance(boss)
+        scores.append(BossScore(False, cast_chance, cast_chance * spell_table.expected_damage(boss.current_mana)))
+    return scores
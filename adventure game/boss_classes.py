@@ -1,161 +1,81 @@
 # i am going to at least put magic into the bosses for the dragon if nothing else
 # still deciding if I want to add anything else to enemy mechanics
-class Spell:
-    def __init__(self, name, mana_cost, base_damage, scaling_factor=0.5):
-        self.name = name
-        self.mana_cost = mana_cost
-        self.base_damage = base_damage
-        self.scaling_factor = scaling_factor
-
-    def can_cast(self, caster):
-        return caster.current_mana >= self.mana_cost
-
-def initialize_dragon_spells():
-    return {
-            "Fire Breath": Spell(
-                name="Fire Breath",
-                mana_cost=30,
-                base_damage=25,
-                scaling_factor=0.7
-                ),
-            "Tail Whip": Spell(
-                name="Tail Whip",
-                mana_cost=15,
-                base_damage=20,
-                scaling_factor=0.4
-                ),
-            "Claw Swipe": Spell(
-                name="Claw Swipe",
-                mana_cost=10,
-                base_damage=15,
-                scaling_factor=0.5
-                ),
-            "Roar": Spell(
-                name="Roar",
-                mana_cost=20,
-                base_damage=15,
-                scaling_factor=0.6
-                )
-            }
-
-def initialize_troll_spells():
-    return {
-            "Hammer Fist": Spell(
-                name="Hammer Fist",
-                mana_cost=30,
-                base_damage=25,
-                scaling_factor=0.6
-                ),
-            "Stomp": Spell(
-                name="Stomp",
-                mana_cost=10,
-                base_damage=15,
-                scaling_factor=0.5
-                ),
-            "Boulder Throw": Spell(
-                name="Boulder Throw",
-                mana_cost=20,
-                base_damage=20,
-                scaling_factor=0.4
-                )
-            }
-
-def initialize_giant_spells():
-    return {
-            "Club Swing": Spell(
-                name="Club Swing",
-                mana_cost=30,
-                base_damage=25,
-                scaling_factor=0.6
-                ),
-            "Stomp": Spell(
-                name="Stomp",
-                mana_cost=10,
-                base_damage=15,
-                scaling_factor=0.5
-                ),
-            "Boulder Throw": Spell(
-                name="Boulder Throw",
-                mana_cost=20,
-                base_damage=20,
-                scaling_factor=0.4
-                )
-            }
-
-class Item:
-    def __init__(self, name, effect_type, effect_value, description, use_text, duration=None):
-        self.name = name
-        self.effect_type = effect_type
-        self.effect_value = effect_value
-        self.description = description
-        self.use_text = use_text
-        self.duration = duration
-
-def initialize_common_items():
-    return {
-            "Mana Potion": Item(
-                name="Mana Potion",
-                effect_type="mana",
-                effect_value=20,
-                description="Restores 30 mana points",
-                use_text="You drink the potion and feel restored"
-                )
-            }
-
-class Inventory:
-    def __init__(self, owner, max_size=20):
-        self.items = {}
-        self.owner = owner
-        self.max_size = max_size
-        self.initialize_items()
-
-    def initialize_items(self):
-        self.add_item("Mana Potion", 3)
-
-    def add_item(self, item_name, quantity=1):
-        current_quantity = self.items.get(item_name, 0)
-        new_quantity = current_quantity + quantity
-
-        if len(self.items) >= self.max_size and item_name not in self.items:
-            return False, "Inventory is full!"
-
-        self.items[item_name] = new_quantity
-        return True, f"{quantity} {item_name} added to inventory"
-
-    def remove_item(self, item_name, quantity=1):
-        if item_name not in self.items:
-            return False, "Item not in inventory"
-
-        if self.items[item_name] < quantity:
-            return False, "Not enough items"
-
-        self.items[item_name] -= quantity
-        if self.items[item_name] == 0:
-            del self.items[item_name]
-
-        return True, f"{quantity} {item_name} removed from inventory"
-
-    def get_item_count(self, item_name):
-        return self.items.get(item_name, 0)
+import random
+from bisect import bisect_right
+from entity_stats import Stats
+from catalog import SPELLBOOKS, NO_SPELLS, BOSS_ITEMS, STARTING_ITEMS
+from inventory import Inventory
+
+# spell damage only depends on the boss's Magic, so the weighted pick list is built once per Magic
+# value. spells are kept in mana cost order, which makes the castable ones a prefix of the table
+# and lets one bisect find them and another pick from them.
+class SpellTable:
+    __slots__ = ("magic", "spells", "spell_names", "mana_costs", "cumulative_weights", "cumulative_damage",
+                 "best_spell")
+
+    def __init__(self, spells, magic):
+        self.magic = magic
+        self.spells = spells
+        self.best_spell = None
+        best_damage = 0
+        entries = []
+        for spell_name, spell in spells.items():
+            damage = spell.base_damage + (magic * spell.scaling_factor)
+            if damage > best_damage:
+                best_damage = damage
+                self.best_spell = spell
+            entries.append((spell.mana_cost, spell_name, int(damage / 5), damage))
+        entries.sort(key=lambda entry: entry[0])
+
+        self.spell_names = [spell_name for _, spell_name, _, _ in entries]
+        self.mana_costs = [mana_cost for mana_cost, _, _, _ in entries]
+        self.cumulative_weights = []
+        self.cumulative_damage = []
+        total = 0
+        total_damage = 0
+        for _, _, weight, damage in entries:
+            total += weight
+            total_damage += weight * damage
+            self.cumulative_weights.append(total)
+            self.cumulative_damage.append(total_damage)
+
+    def castable_weight(self, current_mana):
+        castable = bisect_right(self.mana_costs, current_mana)
+        if not castable:
+            return 0
+        return self.cumulative_weights[castable - 1]
+
+    def can_cast_any(self, current_mana):
+        return self.castable_weight(current_mana) > 0
+
+    def expected_damage(self, current_mana):
+        castable = bisect_right(self.mana_costs, current_mana)
+        if not castable or not self.cumulative_weights[castable - 1]:
+            return 0
+        return self.cumulative_damage[castable - 1] / self.cumulative_weights[castable - 1]
+
+    def choose(self, current_mana, rng=random):
+        total = self.castable_weight(current_mana)
+        if not total:
+            return None
+        return self.spell_names[bisect_right(self.cumulative_weights, rng.random() * total)]
 
 class Boss:
+    __slots__ = ("boss_class", "enemy_class", "experience_value", "level", "stats", "current_mana", "max_mana",
+                 "inventory", "available_items", "spells", "spell_table")
+
     def __init__(self, boss_class, level):
         self.boss_class = boss_class
         self.enemy_class = boss_class
         self.experience_value = 0
         self.level = level
-        self.stats = {
-                "Strength": 0,
-                "Health": 0,
-                "Defense": 0,
-                "Magic": 0,
-                "Agility": 0
-                } # sticking to one template for now, may change later
+        self.stats = Stats() # sticking to one template for now, may change later
         self.current_mana = 0
         self.max_mana = 0
-        self.inventory = Inventory(owner=self)
-        self.available_items = initialize_common_items()
-        self.spells = {}
+        self.inventory = Inventory(owner=self, starting_items=STARTING_ITEMS["Boss"])
+        self.available_items = BOSS_ITEMS
+        self.spells = NO_SPELLS
+        self.spell_table = None
 
         self.update_stats()
         self.initialize_class_features()
@@ -170,12 +90,29 @@ class Boss:
     def initialize_class_features(self):
         pass
 
+    def get_spell_table(self):
+        table = self.spell_table
+        if table is None or table.magic != self.stats["Magic"] or table.spells is not self.spells:
+            table = self.spell_table = SpellTable(self.spells, self.stats["Magic"])
+        return table
+
+    def reset(self, level):
+        self.level = level
+        self.update_stats()
+        self.initialize_class_features()
+        self.inventory.reset()
+        # the subclass constructors start every boss with an empty mana pool, recycled ones match that
+        self.current_mana = 0
+        self.max_mana = 0
+
 class Dragon(Boss):
+    __slots__ = ()
+
     def __init__(self, level):
         super().__init__("Dragon", level)
         self.current_mana = 0
         self.max_mana = 0
-        self.spells = initialize_dragon_spells()
+        self.spells = SPELLBOOKS["Dragon"]
 
     def update_stats(self):
         self.stats["Strength"] = 30 + 10 * (self.level - 1)
@@ -197,11 +134,13 @@ class Dragon(Boss):
         self.experience_value = 100 + 20 * (self.level - 1)
 
 class Troll(Boss):
+    __slots__ = ()
+
     def __init__(self, level):
         super().__init__("Troll", level)
         self.current_mana = 0
         self.max_mana = 0
-        self.spells = initialize_troll_spells()
+        self.spells = SPELLBOOKS["Troll"]
 
     def update_stats(self):
         self.stats["Strength"] = 25 + 10 * (self.level - 1)
@@ -223,11 +162,13 @@ class Troll(Boss):
         self.experience_value = 75 + 15 * (self.level - 1)
 
 class Giant(Boss):
+    __slots__ = ()
+
     def __init__(self, level):
         super().__init__("Giant", level)
         self.current_mana = 0
         self.max_mana = 0
-        self.spells = initialize_giant_spells()
+        self.spells = SPELLBOOKS["Giant"]
 
     def update_stats(self):
         self.stats["Strength"] = 20 + 12 * (self.level - 1)
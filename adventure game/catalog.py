@@ -0,0 +1,107 @@
+# spells and items used to be copy-pasted into the player, npc and boss files and rebuilt for every
+# character and every fight. they all live here now, built once when the module is imported and
+# frozen, and everything else looks them up by name.
+from collections import namedtuple
+from types import MappingProxyType
+
+class Spell(namedtuple("Spell", "name mana_cost base_damage scaling_factor", defaults=(0.5,))):
+    __slots__ = ()
+
+    def can_cast(self, caster):
+        return caster.current_mana >= self.mana_cost
+
+class Item(namedtuple("Item", "name effect_type effect_value description use_text duration", defaults=(None,))):
+    __slots__ = ()
+
+def build_spells():
+    spells = [
+            Spell(name="Fireball", mana_cost=20, base_damage=25, scaling_factor=0.6),
+            Spell(name="Ice Shard", mana_cost=15, base_damage=20, scaling_factor=0.4),
+            Spell(name="Lightning Bolt", mana_cost=25, base_damage=30, scaling_factor=0.7),
+            Spell(name="Heal", mana_cost=15, base_damage=20, scaling_factor=0.4),
+            Spell(name="Smite", mana_cost=10, base_damage=15, scaling_factor=0.3),
+            Spell(name="Blessing", mana_cost=20, base_damage=15, scaling_factor=0.4),
+            Spell(name="Fire Breath", mana_cost=30, base_damage=25, scaling_factor=0.7),
+            Spell(name="Tail Whip", mana_cost=15, base_damage=20, scaling_factor=0.4),
+            Spell(name="Claw Swipe", mana_cost=10, base_damage=15, scaling_factor=0.5),
+            Spell(name="Roar", mana_cost=20, base_damage=15, scaling_factor=0.6),
+            Spell(name="Hammer Fist", mana_cost=30, base_damage=25, scaling_factor=0.6),
+            Spell(name="Stomp", mana_cost=10, base_damage=15, scaling_factor=0.5),
+            Spell(name="Boulder Throw", mana_cost=20, base_damage=20, scaling_factor=0.4),
+            Spell(name="Club Swing", mana_cost=30, base_damage=25, scaling_factor=0.6)
+            ]
+    return {spell.name: spell for spell in spells}
+
+SPELLS = MappingProxyType(build_spells())
+
+def spellbook(*spell_names):
+    return MappingProxyType({name: SPELLS[name] for name in spell_names})
+
+# trolls and giants share Stomp and Boulder Throw, so they point at the same spell objects
+SPELLBOOKS = MappingProxyType({
+        "Mage": spellbook("Fireball", "Ice Shard", "Lightning Bolt"),
+        "Healer": spellbook("Heal", "Smite", "Blessing"),
+        "Dragon": spellbook("Fire Breath", "Tail Whip", "Claw Swipe", "Roar"),
+        "Troll": spellbook("Hammer Fist", "Stomp", "Boulder Throw"),
+        "Giant": spellbook("Club Swing", "Stomp", "Boulder Throw")
+        })
+
+NO_SPELLS = MappingProxyType({})
+
+def build_common_items():
+    items = [
+            Item(
+                name="Health Potion",
+                effect_type="heal",
+                effect_value=50,
+                description="Restores 50 health points",
+                use_text="You drink the potion and feel refreshed"
+                ),
+            Item(
+                name="Mana Potion",
+                effect_type="mana",
+                effect_value=30,
+                description="Restores 30 mana points",
+                use_text="You drink the potion and feel restored"
+                ),
+            Item(
+                name="Strength Elixir",
+                effect_type="buff_strength",
+                effect_value=10,
+                description="Temporarily increases strength by 10",
+                use_text="You drink the elixir and feel stronger!"
+                ),
+            Item(
+                name="Agility Elixir",
+                effect_type="buff_agility",
+                effect_value=10,
+                description="Temporarily increases agility by 10",
+                use_text="You drink the elixir and feel faster!"
+                )
+            ]
+    return {item.name: item for item in items}
+
+COMMON_ITEMS = MappingProxyType(build_common_items())
+
+# bosses carry a weaker mana potion under the same name
+BOSS_ITEMS = MappingProxyType({
+        "Mana Potion": Item(
+            name="Mana Potion",
+            effect_type="mana",
+            effect_value=20,
+            description="Restores 30 mana points",
+            use_text="You drink the potion and feel restored"
+            )
+        })
+
+DEFAULT_STARTING_ITEMS = MappingProxyType({"Health Potion": 3})
+
+STARTING_ITEMS = MappingProxyType({
+        "Warrior": MappingProxyType({"Health Potion": 3, "Strength Elixir": 1}),
+        "Mage": MappingProxyType({"Health Potion": 3, "Mana Potion": 2}),
+        "Archer": MappingProxyType({"Health Potion": 3, "Agility Elixir": 2}),
+        "Fighter": MappingProxyType({"Health Potion": 3, "Strength Elixir": 1}),
+        "Healer": MappingProxyType({"Health Potion": 3, "Mana Potion": 2}),
+        "Rogue": MappingProxyType({"Health Potion": 3, "Agility Elixir": 1}),
+        "Boss": MappingProxyType({"Mana Potion": 3})
+        })
@@ -1,29 +1,39 @@
 # I think I got over ambitious with the combat system and forgot I was making
 # a text based terminal game, so I am experimenting with a simpler combat system
 import random
-from player_classes import initialize_mage_spells, Player
-from npc_classes import initialize_healer_spells
-from boss_classes import initialize_dragon_spells, initialize_troll_spells, initialize_giant_spells
+from player_classes import Player
+from catalog import SPELLBOOKS
+from combat_events import CombatEvent, DAMAGE, KNOCKOUT, MANA_RESTORED, ITEM, FLED, FAILED_FLEE, LEVEL_UP
+import boss_ai
 
 class Combat:
-    def __init__(self, player_party, enemy_party):
+    def __init__(self, player_party, enemy_party, rng=None):
         self.player_party = player_party
         self.enemy_party = enemy_party
         self.is_player_turn = True
+        self.turn = 0 # turns taken so far, events emitted during a turn belong to this number
         self.active_player_index = 0
         self.active_enemy_index = 0
         self.fled = False
-        self.spells = {
-                "Mage": initialize_mage_spells(),
-                "Healer": initialize_healer_spells(),
-                "Dragon": initialize_dragon_spells(),
-                "Troll": initialize_troll_spells(),
-                "Giant": initialize_giant_spells()
-                }
+        self.spells = SPELLBOOKS
+        # anything with random() and choice() works, pass a seeded random.Random for repeatable fights
+        self.rng = rng if rng is not None else random
+        self.listeners = []
+
+    # listeners are called with a CombatEvent for everything that happens during a turn
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def emit(self, kind, actor, target=None, amount=0, detail=None):
+        event = CombatEvent(kind, actor, target, amount, detail)
+        for listener in self.listeners:
+            listener(event)
 
     def get_next_active_player(self):
-        active_members = self.player_party.get_active_members()
-        if not active_members:
+        if not self.player_party.is_party_alive():
             return None
         current_member = self.player_party.members[self.active_player_index]
         while current_member.stats["Health"] <= 0:
@@ -32,64 +42,13 @@ class Combat:
         return current_member
 
     def get_next_active_enemy(self):
-        active_members = self.enemy_party.get_active_members()
-        if not active_members:
-            return None
-        return random.choice(active_members)
+        return self.enemy_party.get_random_living_member(self.rng)
 
     def should_use_mana_potion(self, boss):
-        if boss.inventory.get_item_count("Mana Potion") == 0:
-            return False
-
-        best_spell = None
-        best_damage = 0
-        for _, spell in boss.spells.items():
-            potential_damage = spell.base_damage + (boss.stats["Magic"] * spell.scaling_factor)
-            if potential_damage > best_damage:
-                best_damage = potential_damage
-                best_spell = spell
-
-        if not best_spell:
-            return False
-
-        if boss.boss_class == "Dragon":
-            return boss.current_mana < best_spell.mana_cost and boss.current_mana < boss.max_mana * 0.4
-        elif boss.boss_class == "Troll":
-            return boss.current_mana < best_spell.mana_cost and boss.current_mana < boss.max_mana * 0.25
-        elif boss.boss_class == "Giant":
-            return boss.current_mana < best_spell.mana_cost and boss.current_mana < boss.max_mana * 0.3
-
-        return False
+        return boss_ai.should_use_mana_potion(boss)
 
     def choose_boss_action(self, boss):
-        if not hasattr(boss, 'boss_class'):
-            return "attack", None
-
-        if self.should_use_mana_potion(boss):
-            return "use_item", "Mana Potion"
-
-        available_spells = []
-        for spell_name, spell in boss.spells.items():
-            if spell.can_cast(boss):
-                damage = spell.base_damage + (boss.stats["Magic"] * spell.scaling_factor)
-                weight = int(damage / 5)
-                available_spells.extend([(spell_name, spell)] * weight)
-
-        if available_spells:
-            if boss.boss_class == "Dragon":
-                if boss.stats["Health"] > boss.max_health * 0.7:
-                    spell_name, _ = random.choice(available_spells)
-                    return "cast_spell", spell_name
-            elif boss.boss_class == "Troll":
-                if boss.stats["Health"] < boss.max_health * 0.6:
-                    spell_name, _ = random.choice(available_spells)
-                    return "cast_spell", spell_name
-            elif boss.boss_class == "Giant":
-                if random.random() < 0.6:
-                    spell_name, _ = random.choice(available_spells)
-                    return "cast_spell", spell_name
-
-        return "attack", None
+        return boss_ai.choose_boss_action(boss, self.rng)
 
     def use_item(self, user, item_name):
         if hasattr(user, 'use_item'):
@@ -98,17 +57,19 @@ class Combat:
         if not hasattr(user, 'inventory') or not hasattr(user, 'current_mana'):
             return "INVALID_ITEM", False
 
-        if item_name not in user.inventory.items:
+        if item_name not in user.inventory.items or item_name not in user.available_items:
             return "NO_ITEM", False 
 
-        item = user.inventory.items[item_name]
+        item = user.available_items[item_name]
         if item.effect_type == "mana":
             old_mana = user.current_mana
             user.current_mana = min(user.max_mana, user.current_mana + item.effect_value)
             mana_restored = user.current_mana - old_mana
             success = user.inventory.remove_item(item_name)
             if success:
-                return f"MANA_RESTORED_{mana_restored}", True
+                if self.listeners:
+                    self.emit(MANA_RESTORED, user, user, mana_restored, item_name)
+                return MANA_RESTORED, True
 
         return "INVALID_ITEM", False
 
@@ -121,13 +82,25 @@ class Combat:
         caster.current_mana -= spell.mana_cost
 
         target.stats["Health"] -= damage
+        if self.listeners:
+            self.emit(DAMAGE, caster, target, damage, spell_name)
         if target.stats["Health"] < 0:
             target.stats["Health"] = 0
-            if hasattr(caster, 'player_class'):
-                caster.gain_experience(target.experience_value)
-            return "DEFEAT" if isinstance(target, Player) else "VICTORY", True
-
-        return f"DAMAGE_{int(damage)}", True
+            return self.knock_out(caster, target), True
+
+        return DAMAGE, True
+
+    def knock_out(self, attacker, defender):
+        experience = 0
+        leveled_up = False
+        if hasattr(attacker, 'player_class'):
+            experience = defender.experience_value
+            leveled_up = attacker.gain_experience(experience)
+        if self.listeners:
+            self.emit(KNOCKOUT, attacker, defender, experience)
+            if leveled_up:
+                self.emit(LEVEL_UP, attacker, amount=attacker.level)
+        return "DEFEAT" if isinstance(defender, Player) else "VICTORY"
     
     def attack(self, target_index=None):
         if self.is_player_turn:
@@ -137,20 +110,20 @@ class Combat:
             defender = self.enemy_party.members[target_index]
         else:
             attacker = self.get_next_active_enemy()
-            defender = random.choice(self.player_party.get_active_members())
+            defender = self.player_party.get_random_living_member(self.rng)
 
         if not attacker or not defender:
             return "INVALID_COMBATANT", False
 
         damage = max(1, attacker.stats["Strength"] - (defender.stats["Defense"] // 2))
         defender.stats["Health"] -= damage
+        if self.listeners:
+            self.emit(DAMAGE, attacker, defender, damage)
 
         if defender.stats["Health"] < 0:
             defender.stats["Health"] = 0
-            if hasattr(attacker, 'player_class'):
-                attacker.gain_experience(defender.experience_value)
-            return "DEFEAT" if isinstance(defender, Player) else "VICTORY", True
-        return f"DAMAGE_{damage}", True
+            return self.knock_out(attacker, defender), True
+        return DAMAGE, True
 
     def handle_combat_turn(self, action_type, target_index=None, spell_name=None, item_name=None):
         if not self.player_party.is_party_alive():
@@ -171,11 +144,16 @@ class Combat:
             elif action_type == "use_item":
                 user = self.get_next_active_player()
                 success, item_message = self.use_item(user, item_name)
+                if success and self.listeners:
+                    self.emit(ITEM, user, user, user.available_items[item_name].effect_value, item_name)
 
                 self.is_player_turn = not self.is_player_turn
-                return f"ITEM_{item_message}", success
+                self.turn += 1
+                return ITEM, success
             elif action_type == "flee":
-                result = ("FLED", True) if random.random() < 0.4 else ("FAILED_FLEE", False)
+                result = (FLED, True) if self.rng.random() < 0.4 else (FAILED_FLEE, False)
+                if self.listeners:
+                    self.emit(result[0], self.get_next_active_player())
             else:
                 result = "INVALID_ACTION", False
         else:
@@ -183,7 +161,7 @@ class Combat:
             if hasattr(enemy, 'boss_class'):
                 action, action_name = self.choose_boss_action(enemy)
                 if action == "cast_spell":
-                    target = random.choice(self.player_party.get_active_members())
+                    target = self.player_party.get_random_living_member(self.rng)
                     result = self.cast_spell(enemy, action_name, target)
                 elif action == "use_item":
                     result = self.use_item(enemy, action_name)
@@ -193,6 +171,7 @@ class Combat:
                 result = self.attack()
 
         self.is_player_turn = not self.is_player_turn
+        self.turn += 1
         return result
 
     def get_combat_status(self):
@@ -0,0 +1,14 @@
+# combat used to report what happened as strings like "DAMAGE_23" that the game loop split apart
+# again (and MANA_RESTORED_30 split into three pieces). now Combat hands small tuples to whoever
+# subscribed, the game draws them, the simulator counts them, and nothing is built when nobody listens.
+from collections import namedtuple
+
+DAMAGE = "DAMAGE" # actor hit target for amount, detail is the spell name or None for an attack
+KNOCKOUT = "KNOCKOUT" # target dropped to 0 health, amount is the experience the actor got for it
+MANA_RESTORED = "MANA_RESTORED" # amount is the mana actually gained, detail is the item name
+ITEM = "ITEM" # a player or npc used an item, detail is the item name and amount its effect value
+LEVEL_UP = "LEVEL_UP" # actor's experience took it up a level, amount is the new level
+FLED = "FLED"
+FAILED_FLEE = "FAILED_FLEE"
+
+CombatEvent = namedtuple("CombatEvent", "kind actor target amount detail")
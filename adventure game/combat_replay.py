@@ -0,0 +1,204 @@
+# binary replay log for combat. every event a fight emits is packed into a fixed 16 byte record and
+# appended to the file, so millions of simulated fights stay small and cheap to write. records are
+# in (fight, turn) order, which lets the reader mmap the file and binary search straight to a turn
+# instead of reading everything before it.
+# python combat_replay.py record fights.log Mage Troll --fights 100
+# python combat_replay.py show fights.log --fight 3 --turn 4
+import argparse
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from collections import namedtuple
+from catalog import SPELLS, COMMON_ITEMS, BOSS_ITEMS
+from combat_events import DAMAGE, KNOCKOUT, MANA_RESTORED, ITEM, FLED, FAILED_FLEE, LEVEL_UP
+
+MAGIC = b"TAGREPLY"
+VERSION = 1
+HEADER = struct.Struct("<8sH6x")
+
+# fight, turn, kind, actor side, actor slot, target side, target slot, detail, amount
+RECORD = struct.Struct("<IHBBBBBBf")
+TURN_KEY = struct.Struct("<IH")
+
+KINDS = (DAMAGE, KNOCKOUT, MANA_RESTORED, ITEM, FLED, FAILED_FLEE, LEVEL_UP) # new kinds go on the end
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# spell and item names are stored as a byte, 0 means no name
+DETAILS = (None,) + tuple(sorted(set(SPELLS) | set(COMMON_ITEMS) | set(BOSS_ITEMS)))
+DETAIL_CODES = {detail: code for code, detail in enumerate(DETAILS)}
+
+PLAYER_SIDE = 0
+ENEMY_SIDE = 1
+NO_SIDE = 255
+
+ReplayRecord = namedtuple("ReplayRecord", "fight turn kind actor_side actor_slot target_side target_slot detail amount")
+
+class ReplayWriter:
+    def __init__(self, path, buffer_size=1 << 16):
+        self.path = path
+        self.next_fight = 0
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        exists = size >= HEADER.size
+        if exists:
+            with ReplayReader(path) as reader:
+                if len(reader):
+                    self.next_fight = reader[len(reader) - 1].fight + 1
+                records = len(reader)
+            # a record cut off by a crash would put every record after it out of line
+            if size != HEADER.size + records * RECORD.size:
+                os.truncate(path, HEADER.size + records * RECORD.size)
+        elif size:
+            os.truncate(path, 0) # not even the header made it
+        self.file = open(path, "ab", buffering=buffer_size)
+        if not exists:
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.fight = None
+        self.combat = None
+        self.slots = {}
+
+    # call once per fight, before the first turn. the parties shouldn't change while it is recorded
+    def record(self, combat):
+        if self.combat is not None:
+            self.combat.unsubscribe(self.write_event)
+        self.fight = self.next_fight
+        self.next_fight += 1
+        self.combat = combat
+        self.slots = {}
+        for slot, member in enumerate(combat.player_party.members):
+            self.slots[member] = (PLAYER_SIDE, slot)
+        for slot, member in enumerate(combat.enemy_party.members):
+            self.slots[member] = (ENEMY_SIDE, slot)
+        combat.subscribe(self.write_event)
+        return self.fight
+
+    def write_event(self, event):
+        actor_side, actor_slot = self.slots.get(event.actor, (NO_SIDE, 0))
+        target_side, target_slot = self.slots.get(event.target, (NO_SIDE, 0))
+        self.file.write(RECORD.pack(self.fight, min(self.combat.turn, 0xFFFF), KIND_CODES[event.kind],
+                                    actor_side, actor_slot, target_side, target_slot,
+                                    DETAIL_CODES.get(event.detail, 0), event.amount))
+
+    def close(self):
+        if self.combat is not None:
+            self.combat.unsubscribe(self.write_event)
+            self.combat = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TurnKeys:
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return len(self.reader)
+
+    def __getitem__(self, index):
+        return TURN_KEY.unpack_from(self.reader.data, HEADER.size + index * RECORD.size)
+
+class ReplayReader:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a combat replay")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported replay version: {version}")
+        # a half written record at the end (crash mid write) is ignored
+        self.count = (len(self.data) - HEADER.size) // RECORD.size
+        self.keys = TurnKeys(self)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        fight, turn, kind, actor_side, actor_slot, target_side, target_slot, detail, amount = \
+                RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+        return ReplayRecord(fight, turn, KINDS[kind], actor_side, actor_slot, target_side, target_slot,
+                            DETAILS[detail], amount)
+
+    def find(self, fight, turn=0):
+        return bisect_left(self.keys, (fight, turn))
+
+    def turn(self, fight, turn):
+        start = self.find(fight, turn)
+        end = self.find(fight, turn + 1)
+        return [self[i] for i in range(start, end)]
+
+    def fight(self, fight):
+        start = self.find(fight)
+        end = self.find(fight + 1)
+        return [self[i] for i in range(start, end)]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def describe(record):
+    sides = {PLAYER_SIDE: "player", ENEMY_SIDE: "enemy", NO_SIDE: "-"}
+    actor = f"{sides[record.actor_side]}[{record.actor_slot}]"
+    target = f"{sides[record.target_side]}[{record.target_slot}]"
+    detail = f" ({record.detail})" if record.detail else ""
+    return (f"fight {record.fight} turn {record.turn}: {record.kind} {actor} -> {target} "
+            f"{record.amount:g}{detail}")
+
+def record_fights(path, player_class, enemy_classes, level, fights, policy_name="caster", seed=0):
+    # imported here so reading a replay doesn't pull in the simulator
+    from seeding import derive_rng
+    from simulation import simulate_fight, POLICIES
+    policy = POLICIES[policy_name]
+    enemy_classes = tuple(enemy_classes)
+    with ReplayWriter(path) as writer:
+        for fight_number in range(fights):
+            rng = derive_rng(seed, player_class, enemy_classes, level, policy_name, fight_number)
+            simulate_fight(player_class, enemy_classes, level, policy, rng=rng, recorder=writer)
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and scrub binary combat replays")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="simulate fights into a replay log")
+    record.add_argument("path")
+    record.add_argument("player_class")
+    record.add_argument("enemies", nargs="+")
+    record.add_argument("--level", type=int, default=1)
+    record.add_argument("--fights", type=int, default=1000)
+    record.add_argument("--policy", default="caster")
+    record.add_argument("--seed", type=int, default=0)
+    show = commands.add_parser("show", help="print the records for a fight or a single turn")
+    show.add_argument("path")
+    show.add_argument("--fight", type=int, default=0)
+    show.add_argument("--turn", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_fights(args.path, args.player_class, args.enemies, args.level, args.fights, args.policy, args.seed)
+        return
+    with ReplayReader(args.path) as reader:
+        if args.turn is None:
+            records = reader.fight(args.fight)
+        else:
+            records = reader.turn(args.fight, args.turn)
+        for replay_record in records:
+            print(describe(replay_record))
+        print(f"{len(reader)} records in {args.path}")
+
+if __name__ == "__main__":
+    main()
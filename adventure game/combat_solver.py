@@ -0,0 +1,78 @@
+# physical attacks in Combat have no randomness once there is only one target on each side, so a
+# plain duel can be worked out with a bit of arithmetic instead of playing it turn by turn.
+# the encounter generator asks the same questions over and over, so the answers are cached.
+import math
+from collections import namedtuple
+from functools import lru_cache
+from boss_ai import should_use_mana_potion
+from seeding import derive_rng
+from simulation import create_player, create_enemy, simulate_fight, POLICIES
+
+# hp_remaining is the winner's health when the fight ends, before any level up from the experience
+DuelOutcome = namedtuple("DuelOutcome", "victory turns player_hits enemy_hits hp_remaining enemy_hp_remaining")
+
+# what expected_outcome returns, exact is False when the numbers come from simulated fights
+ExpectedOutcome = namedtuple("ExpectedOutcome", "win_rate turns hp_remaining exact")
+
+def attack_damage(attacker, defender):
+    return max(1, attacker.stats["Strength"] - (defender.stats["Defense"] // 2))
+
+def is_deterministic(enemy):
+    if not hasattr(enemy, "boss_class"):
+        return True
+    # mana never comes back on its own, so a boss that can't cast or drink on turn one never will
+    if enemy.get_spell_table().can_cast_any(enemy.current_mana):
+        return False
+    return not should_use_mana_potion(enemy)
+
+@lru_cache(maxsize=4096)
+def solve_duel(player_class, player_level, enemy_class, enemy_level):
+    player = create_player(player_class, player_level)
+    enemy = create_enemy(enemy_class, enemy_level)
+    if not is_deterministic(enemy):
+        return None
+
+    player_damage = attack_damage(player, enemy)
+    enemy_damage = attack_damage(enemy, player)
+    player_health = player.stats["Health"]
+    enemy_health = enemy.stats["Health"]
+
+    # a fight ends as soon as health reaches zero, and the player always swings first
+    player_hits = math.ceil(enemy_health / player_damage)
+    enemy_hits = math.ceil(player_health / enemy_damage)
+    if player_hits <= enemy_hits:
+        return DuelOutcome(True, 2 * player_hits - 1, player_hits, player_hits - 1,
+                           player_health - (player_hits - 1) * enemy_damage, 0)
+    return DuelOutcome(False, 2 * enemy_hits, enemy_hits, enemy_hits,
+                       0, enemy_health - enemy_hits * player_damage)
+
+def simulate_outcome(player_class, player_level, enemy_classes, enemy_level, policy_name, fights, seed):
+    policy = POLICIES[policy_name]
+    wins = 0
+    turns = 0
+    hp_remaining = 0
+    for fight_number in range(fights):
+        rng = derive_rng(seed, player_class, player_level, enemy_classes, enemy_level, policy_name, fight_number)
+        fight = simulate_fight(player_class, enemy_classes, player_level, policy,
+                               enemy_level=enemy_level, rng=rng)
+        wins += fight["outcome"] == "VICTORY"
+        turns += fight["turns"]
+        hp_remaining += fight["hp_remaining"]
+    return ExpectedOutcome(wins / fights, turns / fights, hp_remaining / fights, False)
+
+def expected_outcome(player_class, player_level, enemy_classes, enemy_level=None, policy_name="attack",
+                     fights=1000, seed=0):
+    if enemy_level is None:
+        enemy_level = player_level
+    if isinstance(enemy_classes, str):
+        enemy_classes = (enemy_classes,)
+    else:
+        enemy_classes = tuple(enemy_classes)
+
+    # spells and potions change the numbers between turns and more than one enemy means random
+    # targets, so only the plain one on one slugfest has a closed form
+    if policy_name == "attack" and len(enemy_classes) == 1:
+        duel = solve_duel(player_class, player_level, enemy_classes[0], enemy_level)
+        if duel is not None:
+            return ExpectedOutcome(1.0 if duel.victory else 0.0, duel.turns, duel.hp_remaining, True)
+    return simulate_outcome(player_class, player_level, enemy_classes, enemy_level, policy_name, fights, seed)
@@ -0,0 +1,73 @@
+# everything the game shows or asks for goes through a console instead of print and input, so the
+# same Game can be played in this terminal, by somebody connected to game_server.py, by a bot or by
+# nobody at all. pause is the console's too, a terminal sleeps but the others don't have to.
+# writes are only collected until the game asks for input or pauses, then the whole screen goes out
+# as one write. a combat screen used to be dozens of prints, each flushed on its own, which flickers
+# and lags over ssh.
+import sys
+import time
+from collections import deque
+
+class Console:
+    def __init__(self):
+        self.buffer = []
+
+    def write(self, text=""):
+        self.buffer.append(text)
+        self.buffer.append("\n")
+
+    # sends everything written since the last flush (and the prompt after it) in one go
+    def flush(self, prompt=""):
+        if prompt:
+            self.buffer.append(prompt)
+        if self.buffer:
+            frame = "".join(self.buffer)
+            self.buffer.clear()
+            self.emit(frame)
+
+    def emit(self, frame):
+        sys.stdout.write(frame)
+        sys.stdout.flush()
+
+    def read_line(self, prompt=""):
+        self.flush(prompt)
+        return input()
+
+    def pause(self, seconds):
+        self.flush()
+        time.sleep(seconds)
+
+# plays from a list of lines instead of a keyboard, for bots and tests. more lines can be fed in
+# while it runs, and running out of them is an EOFError like the end of stdin. every frame is kept
+class ScriptedConsole(Console):
+    def __init__(self, lines=()):
+        super().__init__()
+        self.lines = deque(lines)
+        self.frames = []
+
+    def feed(self, *lines):
+        self.lines.extend(lines)
+
+    def emit(self, frame):
+        self.frames.append(frame)
+
+    def read_line(self, prompt=""):
+        self.flush(prompt)
+        if not self.lines:
+            raise EOFError("The script ran out of input")
+        return self.lines.popleft()
+
+    def pause(self, seconds):
+        self.flush()
+
+    def output(self):
+        self.flush()
+        return "".join(self.frames)
+
+# scripted input with the output thrown away, for running games headless
+class NullConsole(ScriptedConsole):
+    def write(self, text=""):
+        pass
+
+    def emit(self, frame):
+        pass
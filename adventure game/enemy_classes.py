@@ -1,17 +1,15 @@
 # having the classes segregated will give me a chance to flesh out the enemy classes
 # i may implement similar magic/inventory system, or some other sort of buff system
+from entity_stats import Stats
+
 class Enemy:
+    __slots__ = ("enemy_class", "experience_value", "level", "stats")
+
     def __init__(self, enemy_class, level):
         self.enemy_class = enemy_class
         self.experience_value = 0
         self.level = level
-        self.stats = {
-                "Strength": 0,
-                "Health": 0,
-                "Defense": 0,
-                "Magic": 0,
-                "Agility": 0
-                } # using the same stats as player/npc for now, may change since they are unique now
+        self.stats = Stats() # using the same stats as player/npc for now, may change since they are unique now
         self.update_stats()
         self.initialize_class_features()
 
@@ -25,7 +23,14 @@ class Enemy:
     def initialize_class_features(self):
         pass
 
+    def reset(self, level):
+        self.level = level
+        self.update_stats()
+        self.initialize_class_features()
+
 class Ogre(Enemy):
+    __slots__ = ()
+
     def __init__(self, level):
         super().__init__("Ogre", level)
 
@@ -42,6 +47,8 @@ class Ogre(Enemy):
         self.experience_value = 30 + 5 * (self.level - 1)
 
 class Goblin(Enemy):
+    __slots__ = ()
+
     def __init__(self, level):
         super().__init__("Goblin", level)
 
@@ -59,6 +66,8 @@ class Goblin(Enemy):
         self.experience_value = 20 + 5 * (self.level - 1)
 
 class Orc(Enemy):
+    __slots__ = ()
+
     def __init__(self, level):
         super().__init__("Orc", level)
 
@@ -0,0 +1,57 @@
+# every player, npc, enemy and boss used to carry its own dict for the same five stats. this is a
+# fixed layout record instead, it still works like a dict (stats["Health"], .items(), dict(stats))
+# but costs a handful of pointers per entity instead of a whole hash table.
+# whoever is watching (the entity's parties) hears about every health change made through stats[...]
+from collections.abc import MutableMapping
+
+STAT_NAMES = ("Strength", "Health", "Defense", "Magic", "Agility")
+_STAT_SET = frozenset(STAT_NAMES)
+
+class Stats(MutableMapping):
+    __slots__ = STAT_NAMES + ("watchers",)
+
+    def __init__(self, Strength=0, Health=0, Defense=0, Magic=0, Agility=0):
+        self.Strength = Strength
+        self.Health = Health
+        self.Defense = Defense
+        self.Magic = Magic
+        self.Agility = Agility
+        self.watchers = () # almost always none or one, a tuple is the cheapest thing to loop over
+
+    def watch(self, watcher):
+        self.watchers += (watcher,)
+
+    # only this watcher goes, a member in two parties keeps reporting to the other one
+    def unwatch(self, watcher):
+        self.watchers = tuple(other for other in self.watchers if other is not watcher)
+
+    def __getitem__(self, stat):
+        if stat not in _STAT_SET:
+            raise KeyError(stat)
+        return getattr(self, stat)
+
+    def __setitem__(self, stat, value):
+        if stat not in _STAT_SET:
+            raise KeyError(stat)
+        if stat == "Health" and self.watchers:
+            old_health = self.Health
+            self.Health = value
+            for watcher in self.watchers:
+                watcher(old_health, value)
+            return
+        setattr(self, stat, value)
+
+    def __delitem__(self, stat):
+        raise TypeError("Stats have a fixed layout, they can't be removed")
+
+    def __contains__(self, stat):
+        return stat in _STAT_SET
+
+    def __iter__(self):
+        return iter(STAT_NAMES)
+
+    def __len__(self):
+        return len(STAT_NAMES)
+
+    def __repr__(self):
+        return f"Stats({dict(self)})"
@@ -1,40 +1,58 @@
 # there are likely more revisions to come, for now I have separate combat handlers for enemy and boss
 # this is for testing. By the end they should be unified as the only time the player should encounter
 # a boss is in a party.
+import argparse
 import random
-import time
-from save_states import GameSave
+from save_states import GameSave, close_save, restore_rng
+from console import Console
 from tree import create_story, handle_story_progression
+from story_loader import load_campaign
+from story_state import restore_story_state
 from key_press import KeyboardInput
-from player_classes import Player, Warrior, Mage, Archer, initialize_mage_spells
+from player_classes import Player, Warrior, Mage, Archer
+from npc_classes import Fighter, Healer, Rogue
+from catalog import SPELLBOOKS
 from party import Party
-from enemy_classes import Enemy, Goblin, Orc, Ogre
-from boss_classes import Boss, Dragon, Troll, Giant
+from spawner import EnemyPool
 from combat import Combat
+from combat_events import DAMAGE, KNOCKOUT, MANA_RESTORED, ITEM, LEVEL_UP
+
+NPC_CLASSES = {
+        "Fighter": Fighter,
+        "Healer": Healer,
+        "Rogue": Rogue
+        }
 
 class Game:
-    def __init__(self):
-        self.game_save = GameSave()
+    def __init__(self, seed=None, rng=None, campaign=None, console=None, game_save=None):
+        # every roll in the game comes from here, a seed makes a whole session repeatable
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.console = console if console is not None else Console() # where the game reads and writes
+        self.game_save = game_save if game_save is not None else GameSave(console=self.console)
         self.player = Player(name="", player_class="")
         self.player_party = Party("player")
         self.current_location = "town"
         self.playing = True
-        self.story = create_story()
+        # campaign is a story file or directory for story_loader, otherwise the built in story is played
+        self.story = create_story(load_campaign(campaign).graph if campaign else None)
         self.keyboard = KeyboardInput()
-        
+        self.enemy_pool = EnemyPool()
+        self.replay = None # a combat_replay.ReplayWriter to record every fight into
+        self.unloaded_companions = None # the loaded save, until the party is needed
+
     def main_menu(self):
         while True:
             self.display_main_menu()
-            choice = input("Enter your choice: ").strip()
+            choice = self.console.read_line("Enter your choice: ").strip()
             self.handle_main_menu_choice(choice)
 
     def display_main_menu(self):
-        print("\n" + "=" * 50)
-        print("WELCOME TO [GAME NAME]")
-        print("=" * 50)
-        print("1. New Game")
-        print("2. Load Game")
-        print("3. Quit")
+        self.console.write("\n" + "=" * 50)
+        self.console.write("WELCOME TO [GAME NAME]")
+        self.console.write("=" * 50)
+        self.console.write("1. New Game")
+        self.console.write("2. Load Game")
+        self.console.write("3. Quit")
 
     def handle_main_menu_choice(self, choice):
         if choice == "1":
@@ -44,31 +62,32 @@ class Game:
             if self.load_game():
                 self.main_game_loop()
         elif choice == "3":
-            print("\nThanks for playing!")
+            self.console.write("\nThanks for playing!")
             self.playing = False
-            exit(0)
+            raise SystemExit(0)
 
     def start_new_game(self):
         try:
-            name = input("Enter your name: ").strip().title()
+            name = self.console.read_line("Enter your name: ").strip().title()
             self.player = self.choose_player_class(name)
             self.player_party = Party("player")
             self.player_party.add_member(self.player)
-            print(f"\nWelcome, {name}! Your adventure begins now!")
-            print(f"Level {self.player.level} {self.player.player_class}")
+            self.unloaded_companions = None
+            self.console.write(f"\nWelcome, {name}! Your adventure begins now!")
+            self.console.write(f"Level {self.player.level} {self.player.player_class}")
             self.story.start_story("start")
             return True
         except ValueError as e:
-            print(f"Error creating character: {e}")
+            self.console.write(f"Error creating character: {e}")
             return False
 
     def choose_player_class(self, name):
         while True:
-            print("\nChoose your class:")
-            print("1. Warrior")
-            print("2. Mage")
-            print("3. Archer")
-            choice = input("Enter your choice (1-3): ")
+            self.console.write("\nChoose your class:")
+            self.console.write("1. Warrior")
+            self.console.write("2. Mage")
+            self.console.write("3. Archer")
+            choice = self.console.read_line("Enter your choice (1-3): ")
             if choice == "1":
                 return Warrior(name)
             elif choice == "2":
@@ -76,17 +95,61 @@ class Game:
             elif choice == "3":
                 return Archer(name)
             else:
-                print("Invalid choice. Please enter a number between 1 and 3.")
+                self.console.write("Invalid choice. Please enter a number between 1 and 3.")
 
     def load_game(self):
-        save_data = self.game_save.handle_save_menu(self.player, self.current_location)
+        self.restore_companions()
+        save_data = self.game_save.handle_save_menu(self.player, self.current_location, self.player_party,
+                                                    self.story, self.rng)
         if save_data:
-            self.reconstruct_player(save_data)
-            self.current_location = save_data["location"]
-            print(f"\nWelcome back, {self.player.level} {self.player.player_class}!")
+            self.restore_state(save_data)
+            self.console.write(f"\nWelcome back, {self.player.level} {self.player.player_class}!")
             return True
         return False
 
+    def autosave(self):
+        self.restore_companions()
+        self.game_save.save_game(self.player, self.current_location, auto_save=True, party=self.player_party,
+                                 story=self.story, rng=self.rng)
+
+    # only what the first prompt needs is read here, the companions wait until the party is used
+    def restore_state(self, save_data):
+        self.reconstruct_player(save_data)
+        self.current_location = save_data["location"]
+        self.unloaded_companions = save_data
+        # the visited nodes and flags go back first, setting the current node marks it visited
+        if "story_state" in save_data:
+            self.story.state = restore_story_state(save_data["story_state"], self.story.graph)
+        if "story" in save_data:
+            node_id = save_data["story"]["current_node"]
+            self.story.current_node = self.story.nodes.get(node_id) if node_id else None
+        if "rng" in save_data:
+            restore_rng(self.rng, save_data["rng"])
+
+    def restore_companions(self):
+        if self.unloaded_companions is None:
+            return
+        save_data, self.unloaded_companions = self.unloaded_companions, None
+        companions = save_data.get("companions", {})
+        close_save(save_data) # the companions were the last thing needed from the file
+        for position in sorted(companions, key=int):
+            member_data = companions[position]
+            companion = NPC_CLASSES[member_data["class"]](member_data["name"])
+            self.restore_member(companion, member_data)
+            self.player_party.add_member(companion)
+
+    # everything capture_member saved, old .json saves only have level, experience and stats so they skip this
+    def restore_member(self, member, member_data):
+        member.level = member_data["level"]
+        member.experience = member_data["experience"]
+        member.experience_to_next_level = member_data["experience_to_next_level"]
+        member.stats.update(member_data["stats"])
+        member.current_mana = member_data["current_mana"]
+        member.max_mana = member_data["max_mana"]
+        member.inventory.items.clear()
+        member.inventory.items.update(member_data["inventory"])
+        member.active_buffs = {stat: list(buffs) for stat, buffs in member_data["active_buffs"].items()}
+
     def reconstruct_player(self, save_data):
         player_class = save_data["player"]["class"]
         name = save_data["player"]["name"]
@@ -103,12 +166,14 @@ class Game:
         self.player.level = save_data["player"]["level"]
         self.player.experience = save_data["player"]["experience"]
         self.player.experience_to_next_level = 100 * (1.5 ** (self.player.level -1))
-        self.player.stats = save_data["player"]["stats"]
+        self.player.stats.update(save_data["player"]["stats"])
+        if "inventory" in save_data["player"]:
+            self.restore_member(self.player, save_data["player"])
 
         if player_class == "Mage":
             self.player.current_mana = save_data["player"]["current_mana"]
             self.player.max_mana = save_data["player"]["max_mana"]
-            self.player.spells = initialize_mage_spells()
+            self.player.spells = SPELLBOOKS["Mage"]
 
         self.player_party = Party("player")
         self.player_party.add_member(self.player)
@@ -117,10 +182,10 @@ class Game:
         self.playing = True
         while self.playing:
             if self.story.current_node and self.story.current_node.node_id == "start":
-                print("\nWhat would you like to do?")
-                print("1. Interact with NPCs")
-                print("2. Access Town Menu")
-                choice = input("\nEnter your choice: ").strip()
+                self.console.write("\nWhat would you like to do?")
+                self.console.write("1. Interact with NPCs")
+                self.console.write("2. Access Town Menu")
+                choice = self.console.read_line("\nEnter your choice: ").strip()
 
                 if choice == "1":
                     self.handle_story_node()
@@ -135,7 +200,9 @@ class Game:
     def handle_story_node(self):
         result = handle_story_progression(self.story)
         if result:
-            if result["type"] == "narrative":
+            if result["type"] in ("narrative", "dialog") and not result["choices"]:
+                self.handle_dead_end(result)
+            elif result["type"] == "narrative":
                 self.handle_narrative_node(result)
             elif result["type"] == "combat":
                 self.handle_combat_node(result)
@@ -143,81 +210,94 @@ class Game:
                 self.handle_recruitment_node(result)
             elif result["type"] == "dialog":
                 self.handle_dialog_node(result)
+            self.autosave()
         else:
             self.story.current_node = None
 
+    # every choice here is locked behind a visit or a flag the player doesn't have (or the node has no
+    # choices at all), so there is nothing to pick. story_analysis reports nodes that can end up like this
+    def handle_dead_end(self, result):
+        self.console.write("\n" + "=" * 50)
+        self.console.write(result["content"]["text"])
+        self.console.write(result["content"]["description"])
+        self.console.write("\nThere is no way forward from here.")
+        self.story.current_node = None
+
     def handle_narrative_node(self, result):
         narrative_result = result["content"]
-        print("\n" + "=" * 50)
-        print(narrative_result["text"])
-        print(narrative_result["description"])
+        self.console.write("\n" + "=" * 50)
+        self.console.write(narrative_result["text"])
+        self.console.write(narrative_result["description"])
         self.display_choices(result["choices"])
-        choice = self.get_choice(result["choices"])
+        position = self.get_choice_position(result["choices"])
+        choice = result["choices"][position]
         if choice:
-            print(f"Debug: Next node = {choice['next_node']}")
-            self.story.make_choice(choice["id"])
+            self.console.write(f"Debug: Next node = {choice['next_node']}")
+            self.story.make_choice_at(result["positions"][position])
 
             if choice["next_node"] == "start":
                 self.story.current_node = self.story.nodes["start"]
         else:
-            print("Invalid choice. Please try again.")
+            self.console.write("Invalid choice. Please try again.")
 
     def handle_dialog_node(self, result):
         dialog_result = result["content"]
-        print("\n" + "=" * 50)
-        print(dialog_result["text"])
-        print(dialog_result["description"])
+        self.console.write("\n" + "=" * 50)
+        self.console.write(dialog_result["text"])
+        self.console.write(dialog_result["description"])
         self.display_choices(result["choices"])
-        choice = self.get_choice(result["choices"])
+        position = self.get_choice_position(result["choices"])
+        choice = result["choices"][position]
         if choice:
-            print(f"Debug: Next node = {choice['next_node']}")
+            self.console.write(f"Debug: Next node = {choice['next_node']}")
             if choice["next_node"] == "buy_item":
                 pass # need to make a shop menu
-            self.story.make_choice(choice["id"])
+            self.story.make_choice_at(result["positions"][position])
 
             if choice["next_node"] == "start":
                 self.story.current_node = self.story.nodes["start"]
         else:
-            print("Invalid choice. Please try again.")
+            self.console.write("Invalid choice. Please try again.")
 
     def display_choices(self, choices):
-        print("\nChoices:")
+        self.console.write("\nChoices:")
         for i, choice in enumerate(choices, 1):
-            print(f"{i}. {choice['text']}")
+            self.console.write(f"{i}. {choice['text']}")
 
     def get_choice(self, choices):
+        return choices[self.get_choice_position(choices)]
+
+    def get_choice_position(self, choices):
         while True:
             try:
-                choice_num = int(input("Enter your choice: ").strip()) - 1
+                choice_num = int(self.console.read_line("Enter your choice: ").strip()) - 1
                 if 0 <= choice_num < len(choices):
-                    return choices[choice_num]
+                    return choice_num
             except ValueError:
-                print("Please enter a valid number.")
+                self.console.write("Please enter a valid number.")
 
     def handle_combat_node(self, result):
+        self.restore_companions()
         enemy_party = Party("enemy")
         enemy_type = result["content"]["enemy"]
         enemy_level = result["content"]["level"]
 
-        if enemy_type in ["Dragon", "Troll", "Giant"]:
-            enemy = Boss(enemy_type, enemy_level)
-        else:
-            enemy = Enemy(enemy_type, enemy_level)
-
+        enemy = self.enemy_pool.acquire(enemy_type, enemy_level)
         enemy_party.add_member(enemy)
-        combat = Combat(self.player_party, enemy_party)
+        combat = Combat(self.player_party, enemy_party, self.rng)
         
         combat_result = self.handle_combat(combat)
+        self.enemy_pool.release_party(enemy_party)
 
         if combat_result == "VICTORY":
-            print(f"\nYou defeated the {enemy_type}!")
-            self.player.gain_experience(result["content"]["experience_reward"])
-            next_node = result["content"]["victory_node"]
+            self.console.write(f"\nYou defeated the {enemy_type}!")
+            if self.player.gain_experience(result["content"].get("experience_reward", 0)):
+                self.console.write(f"{self.player.name} leveled up to {self.player.level}!")
         else:
-            print(f"\nYou were defeated by the {enemy_type}!")
-            next_node = result["content"]["defeat_node"]
+            self.console.write(f"\nYou were defeated by the {enemy_type}!")
 
-        self.story.current_node = self.story.nodes[next_node]
+        # a missing victory or defeat node ends the story instead of crashing, story_analysis reports them
+        self.story.finish_combat(combat_result == "VICTORY")
 
     def handle_recruitment_node(self, result):
         recruitment_result = result["content"]
@@ -230,7 +310,7 @@ class Game:
         elif self.current_location == "dungeon":
             self.dungeon_menu()
         else:
-            print("Error: Invalid location.")
+            self.console.write("Error: Invalid location.")
             self.current_location = "town"
 
     def town_menu(self):
@@ -239,30 +319,30 @@ class Game:
             if not self.valid_player_check():
                 return
             self.display_town_options()
-            choice = input("\nEnter your choice: ").strip()
+            choice = self.console.read_line("\nEnter your choice: ").strip()
             self.handle_town_choice(choice)
 
     def display_town_header(self):
-        print("\n" + "=" * 50)
-        print("TOWN")
-        print("=" * 50)
+        self.console.write("\n" + "=" * 50)
+        self.console.write("TOWN")
+        self.console.write("=" * 50)
 
     def valid_player_check(self):
         if self.player is None:
-            print("Error: Player not found.")
+            self.console.write("Error: Player not found.")
             return False
         return True
 
     def display_town_options(self):
-        print(f"Level {self.player.level} {self.player.player_class}")
-        print(f"HP: {self.player.stats['Health']}")
+        self.console.write(f"Level {self.player.level} {self.player.player_class}")
+        self.console.write(f"HP: {self.player.stats['Health']}")
         if self.player.player_class == "Mage":
-            print(f"Mana: {self.player.current_mana}/{self.player.max_mana}")
-        print("\nTown Options:")
-        print("1. Enter Dungeon")
-        print("2. Rest (Restore HP/Mana)")
-        print("3. Game Menu")
-        print("4. Quit to Main Menu")
+            self.console.write(f"Mana: {self.player.current_mana}/{self.player.max_mana}")
+        self.console.write("\nTown Options:")
+        self.console.write("1. Enter Dungeon")
+        self.console.write("2. Rest (Restore HP/Mana)")
+        self.console.write("3. Game Menu")
+        self.console.write("4. Quit to Main Menu")
 
     def handle_town_choice(self, choice):
         if choice == "1":
@@ -281,24 +361,24 @@ class Game:
             if not self.valid_player_check():
                 return
             self.display_dungeon_options()
-            choice = input("\nEnter your choice: ").strip()
+            choice = self.console.read_line("\nEnter your choice: ").strip()
             self.handle_dungeon_choice(choice)
 
     def display_dungeon_header(self):
-        print("\n" + "=" * 50)
-        print("DUNGEON")
-        print("=" * 50)
+        self.console.write("\n" + "=" * 50)
+        self.console.write("DUNGEON")
+        self.console.write("=" * 50)
 
     def display_dungeon_options(self):
-        print(f"Level {self.player.level} {self.player.player_class}")
-        print(f"HP: {self.player.stats['Health']}")
+        self.console.write(f"Level {self.player.level} {self.player.player_class}")
+        self.console.write(f"HP: {self.player.stats['Health']}")
         if self.player.player_class == "Mage":
-            print(f"Mana: {self.player.current_mana}/{self.player.max_mana}")
-        print("\nWhat would you like to do?")
-        print("1. Fight Enemy")
-        print("2. Fight Boss")
-        print("3. Return to Town")
-        print("4. Game Menu")
+            self.console.write(f"Mana: {self.player.current_mana}/{self.player.max_mana}")
+        self.console.write("\nWhat would you like to do?")
+        self.console.write("1. Fight Enemy")
+        self.console.write("2. Fight Boss")
+        self.console.write("3. Return to Town")
+        self.console.write("4. Game Menu")
 
     def handle_dungeon_choice(self, choice):
         if choice == "1":
@@ -313,192 +393,217 @@ class Game:
     def game_menu(self):
         while True:
             self.display_game_menu()
-            choice = input("\nEnter your choice: ").strip()
+            choice = self.console.read_line("\nEnter your choice: ").strip()
             if choice == "4":
                 break
             self.handle_game_menu_choice(choice)
 
     def display_game_menu(self):
-        print("\n" + "=" * 50)
-        print("GAME MENU")
-        print("=" * 50)
-        print("1. Save Game")
-        print("2. Load Game")
-        print("3. Character Stats")
-        print("4. Return to Game")
+        self.console.write("\n" + "=" * 50)
+        self.console.write("GAME MENU")
+        self.console.write("=" * 50)
+        self.console.write("1. Save Game")
+        self.console.write("2. Load Game")
+        self.console.write("3. Character Stats")
+        self.console.write("4. Return to Game")
 
     def handle_game_menu_choice(self, choice):
+        self.restore_companions()
         if choice == "1":
-            self.game_save.handle_save_menu(self.player, self.current_location)
+            self.game_save.handle_save_menu(self.player, self.current_location, self.player_party, self.story,
+                                            self.rng)
         elif choice == "2":
             self.load_game()
         elif choice == "3":
             self.show_character_stats()
 
     def show_character_stats(self):
-        print("\n" + "=" * 50)
-        print("CHARACTER STATS")
-        print("=" * 50)
+        self.console.write("\n" + "=" * 50)
+        self.console.write("CHARACTER STATS")
+        self.console.write("=" * 50)
         if self.player:
-            print(f"Name: {self.player.name}")
-            print(f"Class: {self.player.player_class}")
-            print(f"Level: {self.player.level}")
-            print("\nStats:")
+            self.console.write(f"Name: {self.player.name}")
+            self.console.write(f"Class: {self.player.player_class}")
+            self.console.write(f"Level: {self.player.level}")
+            self.console.write("\nStats:")
             for stat, value in self.player.stats.items():
-                print(f"{stat}: {value}")
-        input("\nPress Enter to continue...")
+                self.console.write(f"{stat}: {value}")
+        self.console.read_line("\nPress Enter to continue...")
 
     def rest(self):
-        print("\nResting...")
-        time.sleep(1)
+        self.console.write("\nResting...")
+        self.console.pause(1)
         if self.player:
             max_health = self.player.max_health
             if max_health is not None:
                 self.player.stats["Health"] = max_health
             if hasattr(self.player, "current_mana") and hasattr(self.player, "max_mana"):
                 self.player.current_mana = self.player.max_mana
-            print("HP and Mana restored!")
-        time.sleep(1)
+            self.console.write("HP and Mana restored!")
+        self.console.pause(1)
 
     def start_combat(self):
+        self.restore_companions()
         if self.player:
             enemy_level = self.player_party.get_average_level()
-            enemies_list = [Goblin(enemy_level), Orc(enemy_level), Ogre(enemy_level)]
-            random_enemy = random.choice(enemies_list)
             enemy_party = Party("enemy")
-            enemy = random_enemy
+            enemy = self.enemy_pool.acquire_random_enemy(enemy_level, self.rng)
             enemy_party.add_member(enemy)
-            combat = Combat(self.player_party, enemy_party)
+            combat = Combat(self.player_party, enemy_party, self.rng)
             result = self.handle_combat(combat)
+            self.enemy_pool.release_party(enemy_party)
             self.handle_combat_result(result)
 
     def start_boss_combat(self):
+        self.restore_companions()
         if self.player:
             enemy_level = self.player_party.get_average_level() + 2
-            boss_list = [Dragon(enemy_level), Troll(enemy_level), Giant(enemy_level)]
-            random_boss = random.choice(boss_list)
             enemy_party = Party("enemy")
-            boss = random_boss
+            boss = self.enemy_pool.acquire_random_boss(enemy_level, self.rng)
             enemy_party.add_member(boss)
-            combat = Combat(self.player_party, enemy_party)
+            combat = Combat(self.player_party, enemy_party, self.rng)
             result = self.handle_combat(combat)
+            self.enemy_pool.release_party(enemy_party)
             self.handle_combat_result(result)
     # boss and enemy combat are separated for testing, ideally they should be partied in the game
     # and so one combat system should be enough. I don't see putting the player in any solo boss fights
     def handle_combat(self, combat):
+        combat.subscribe(self.render_combat_event)
+        if self.replay is not None:
+            self.replay.record(combat)
         while True:
             self.display_combat_status(combat)
 
             if combat.is_player_turn:
-                print("\nActions:")
-                print("1. Attack")
+                self.console.write("\nActions:")
+                self.console.write("1. Attack")
                 if self.player.player_class == "Mage":
-                    print("2. Cast Spell")
-                print("3. Use Item")
-                print("4. Flee")
+                    self.console.write("2. Cast Spell")
+                self.console.write("3. Use Item")
+                self.console.write("4. Flee")
 
-                choice = input("\nEnter your choice: ").strip()
+                choice = self.console.read_line("\nEnter your choice: ").strip()
 
                 if choice == "1":
-                    print("\nChoose target:")
+                    self.console.write("\nChoose target:")
                     for i, enemy in enumerate(combat.enemy_party.members, 1):
-                        print(f"{i}. {enemy.enemy_class} - HP: {enemy.stats['Health']}")
-                    target = int(input("Enter target number: ").strip()) - 1
+                        self.console.write(f"{i}. {enemy.enemy_class} - HP: {enemy.stats['Health']}")
+                    target = int(self.console.read_line("Enter target number: ").strip()) - 1
                     result, success = combat.handle_combat_turn("attack", target)
 
                 elif choice == "2" and self.player.player_class == "Mage":
-                    print("\nAvailable Spells:")
+                    self.console.write("\nAvailable Spells:")
                     for i, spell in enumerate(self.player.spells, 1):
-                        print(f"{i}. {spell}")
-                    spell_choice = int(input("Enter spell number: ").strip()) - 1
+                        self.console.write(f"{i}. {spell}")
+                    spell_choice = int(self.console.read_line("Enter spell number: ").strip()) - 1
                     spell_name = list(self.player.spells.keys())[spell_choice]
 
-                    print("\nChoose target:")
+                    self.console.write("\nChoose target:")
                     for i, enemy in enumerate(combat.enemy_party.members, 1):
-                        print(f"{i}. {enemy.enemy_class} - HP: {enemy.stats['Health']}")
-                    target = int(input("Enter target number: ").strip()) - 1
+                        self.console.write(f"{i}. {enemy.enemy_class} - HP: {enemy.stats['Health']}")
+                    target = int(self.console.read_line("Enter target number: ").strip()) - 1
 
                     result, success = combat.handle_combat_turn("cast_spell", target, spell_name)
 
                 elif choice == "3":
                     if not self.player.inventory.items:
-                        print("\nNo items in inventory.")
+                        self.console.write("\nNo items in inventory.")
                         continue
 
-                    print("\nAvailable Items:")
+                    self.console.write("\nAvailable Items:")
                     items_list = list(self.player.inventory.items.items())
                     for i, (item_name, quantity) in enumerate(items_list, 1):
-                        print(f"{i}. {item_name} (x{quantity})")
+                        self.console.write(f"{i}. {item_name} (x{quantity})")
 
                     try:
-                        item_choice = int(input("Enter item number: (0 to cancel) ").strip())
+                        item_choice = int(self.console.read_line("Enter item number: (0 to cancel) ").strip())
                         if item_choice == 0:
                             continue
                         if not (1 <= item_choice <= len(items_list)):
-                            print("Invalid choice. Please try again.")
+                            self.console.write("Invalid choice. Please try again.")
                             continue
                         item_name = items_list[item_choice - 1][0]
                         target = self.player
                         result, success = combat.handle_combat_turn("use_item", target, None, item_name)
                         
-                        if success:
-                            print(f"\n{result}")
-                        else:
-                            print("\nFailed to use {selected_item}.")
+                        if not success:
+                            self.console.write(f"\nFailed to use {item_name}.")
                             continue
                     except ValueError:
-                        print("Invalid choice. Please try again.")
+                        self.console.write("Invalid choice. Please try again.")
                         continue
 
                 elif choice == "4":
                     result, success = combat.handle_combat_turn("flee")
                     if success:
-                        print("You fled from the battle!")
+                        self.console.write("You fled from the battle!")
                         return "FLED"
                 else:
-                    print("Invalid choice. Please try again.")
+                    self.console.write("Invalid choice. Please try again.")
                     continue
             else:
                 result, success = combat.handle_combat_turn("attack")
-                
-                if "_" in result:
-                    action, value = result.split("_")
-                    if action == "DAMAGE":
-                        print(f"\nYou dealt {value} damage to the enemy!")
-                    elif action == "MANA_RESTORED":
-                        print(f"\nYou restored {value} mana!")
-                    elif action == "ITEM":
-                        print(f"\n{value}")
 
                 if result in ["VICTORY", "DEFEAT"]:
                     return result
 
-                input("\nPress Enter to continue...")
+                self.console.read_line("\nPress Enter to continue...")
+
+    # article is "the" for a name in the middle of a sentence
+    def combatant_name(self, combatant, article="The"):
+        if combatant is self.player:
+            return "You"
+        if hasattr(combatant, "name"):
+            return combatant.name
+        return f"{article} {combatant.enemy_class}"
+
+    def render_combat_event(self, event):
+        actor = self.combatant_name(event.actor)
+        if event.kind == DAMAGE:
+            target = "you" if event.target is self.player else self.combatant_name(event.target, "the")
+            if event.detail:
+                self.console.write(f"\n{actor} cast {event.detail} on {target} for {int(event.amount)} damage!")
+            else:
+                self.console.write(f"\n{actor} dealt {int(event.amount)} damage to {target}!")
+        elif event.kind == KNOCKOUT:
+            self.console.write(f"\n{self.combatant_name(event.target)} fell!")
+        elif event.kind == MANA_RESTORED:
+            self.console.write(f"\n{actor} restored {event.amount} mana!")
+        elif event.kind == ITEM:
+            self.console.write(f"\n{actor} used a {event.detail}!")
+        elif event.kind == LEVEL_UP:
+            self.console.write(f"{event.actor.name} leveled up to {event.amount}!")
 
     def display_combat_status(self, combat):
         status = combat.get_combat_status()
-        print("\n" + "=" * 50)
-        print("COMBAT STATUS")
-        print("=" * 50)
-        print("\nPlayer Party:")
+        self.console.write("\n" + "=" * 50)
+        self.console.write("COMBAT STATUS")
+        self.console.write("=" * 50)
+        self.console.write("\nPlayer Party:")
         for member, member_type in status["player_party"]:
-            print(f"{member_type} {member.name} - HP: {member.stats['Health']}")
+            self.console.write(f"{member_type} {member.name} - HP: {member.stats['Health']}")
             if hasattr(member, "current_mana"):
-                print(f"Mana: {member.current_mana}/{member.max_mana}")
-        print("\nEnemy Party:")
+                self.console.write(f"Mana: {member.current_mana}/{member.max_mana}")
+        self.console.write("\nEnemy Party:")
         for member, member_type in status["enemy_party"]:
-            print(f"{member.enemy_class} - HP: {member.stats['Health']}")
+            self.console.write(f"{member.enemy_class} - HP: {member.stats['Health']}")
 
     def handle_combat_result(self, result):
         if result == "VICTORY":
-            print("\nYou won the battle!")
+            self.console.write("\nYou won the battle!")
         elif result == "DEFEAT":
-            print("\nYou were defeated!")
+            self.console.write("\nYou were defeated!")
             self.playing = False
             self.main_menu()
         elif result == "FLED":
             self.current_location = "town"
 
 if __name__ == "__main__":
-    game = Game()
-    game.main_menu()
+    parser = argparse.ArgumentParser(description="Terminal Adventure Game")
+    parser.add_argument("--campaign", default=None, help="json lines story file or directory of chapters")
+    args = parser.parse_args()
+    game = Game(campaign=args.campaign)
+    try:
+        game.main_menu()
+    finally:
+        game.console.flush()
@@ -0,0 +1,225 @@
+# plays the game over a plain tcp connection (telnet or nc), one independent Game per connection, all
+# in one process. the asyncio loop owns every socket. each Game still runs its menus as ordinary
+# blocking code, so it runs on a thread from a pool sized to max_sessions with a SessionConsole:
+# input lines are handed to it through a queue, its output is passed back to the loop to write, and
+# its pauses wait on the session instead of sleeping, so nothing a game does ever holds up the loop
+# or the other players. finished games hand their thread back to the pool for the next player.
+# players log in with a name and save into player_<name> under the save root, so they find their
+# saves again next time. a name can only be playing once at a time. every session's saves go
+# through the one shared save writer, which keeps each directory's flushes and failures to itself.
+# save directories nobody has written to for expire_days are deleted when the server starts and
+# once an hour after that.
+# python game_server.py --port 4000
+# telnet localhost 4000
+import argparse
+import asyncio
+import concurrent.futures
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from console import Console
+from game_loop import Game
+from save_states import GameSave
+from save_writer import get_shared_writer
+from tree import get_compiled_story
+
+MAX_SESSIONS = 500
+EXPIRE_DAYS = 30 # save directories untouched for this long are deleted
+EXPIRE_EVERY = 3600 # seconds between looks for expired save directories
+LOGIN_ATTEMPTS = 3
+PLAYER_NAME = re.compile(r"[a-z0-9_-]{1,24}")
+
+logger = logging.getLogger("game_server")
+
+class SessionClosed(Exception):
+    pass
+
+# a whole screen is one write on the socket, the console buffers it until the game waits. the game's
+# thread waits until the socket has taken the screen, so a client that doesn't read only holds up
+# its own game instead of piling up output on the server
+class SessionConsole(Console):
+    def __init__(self, loop, writer):
+        super().__init__()
+        self.loop = loop
+        self.writer = writer
+        self.lines = queue.Queue()
+        self.closed = threading.Event()
+
+    def emit(self, frame):
+        if self.closed.is_set():
+            return # nobody left to read it, the game stops at its next read or pause
+        data = frame.replace("\n", "\r\n").encode("utf-8")
+        try:
+            asyncio.run_coroutine_threadsafe(self.send(data), self.loop).result()
+        except (ConnectionError, concurrent.futures.CancelledError): # gone, or the server is shutting down
+            self.close()
+
+    async def send(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def read_line(self, prompt=""):
+        self.flush(prompt)
+        line = self.lines.get()
+        if line is None:
+            raise SessionClosed()
+        return line
+
+    def pause(self, seconds):
+        self.flush()
+        if self.closed.wait(seconds):
+            raise SessionClosed()
+
+    # the connection went away, wakes the game up wherever it is waiting
+    def close(self):
+        self.closed.set()
+        self.lines.put(None)
+
+class GameServer:
+    def __init__(self, host="127.0.0.1", port=4000, save_root="server_saves", max_sessions=MAX_SESSIONS,
+                 expire_days=EXPIRE_DAYS):
+        self.host = host
+        self.port = port
+        self.save_root = save_root
+        self.max_sessions = max_sessions
+        self.expire_days = expire_days
+        self.sessions = 0
+        self.players = set() # names playing right now, their directories are never expired
+        self.players_lock = threading.Lock() # expiring runs on a worker thread
+        self.save_writer = get_shared_writer()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_sessions, thread_name_prefix="session")
+
+    def save_directory(self, player):
+        return os.path.join(self.save_root, f"player_{player}")
+
+    def run_game(self, console, player):
+        game_save = GameSave(self.save_directory(player), writer=self.save_writer, console=console)
+        try:
+            game = Game(console=console, game_save=game_save)
+            game.main_menu()
+        except (SessionClosed, SystemExit):
+            pass
+        except Exception:
+            logger.exception("Session for %s crashed", player)
+            console.write("\nSomething went wrong on the server and your game has ended, sorry.")
+        finally:
+            try:
+                self.save_writer.flush(game_save.writer_owner)
+            except Exception:
+                logger.exception("Could not write the saves of %s", player)
+            console.flush() # the goodbye screen
+            console.loop.call_soon_threadsafe(console.writer.close)
+
+    # names are folded to lower case and limited to what is safe in a directory name
+    async def login(self, reader, writer):
+        for attempt in range(LOGIN_ATTEMPTS):
+            writer.write(b"Enter your name (letters, digits, - and _): ")
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                return None
+            player = line.decode("utf-8", "replace").strip().lower()
+            if not PLAYER_NAME.fullmatch(player):
+                writer.write(b"That name can't be used.\r\n")
+                continue
+            with self.players_lock:
+                if player not in self.players:
+                    self.players.add(player)
+                    return player
+            writer.write(b"That name is already playing.\r\n")
+        return None
+
+    async def handle_client(self, reader, writer):
+        if self.sessions >= self.max_sessions:
+            writer.write(b"The server is full, try again later.\r\n")
+            await writer.drain()
+            writer.close()
+            return
+        self.sessions += 1
+        player = None
+        game = None
+        console = SessionConsole(asyncio.get_running_loop(), writer)
+        try:
+            player = await self.login(reader, writer)
+            if player is None:
+                return
+            game = asyncio.get_running_loop().run_in_executor(self.executor, self.run_game, console, player)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                console.lines.put(line.decode("utf-8", "replace").rstrip("\r\n"))
+        except ConnectionError:
+            pass
+        finally:
+            console.close()
+            try:
+                if game is not None:
+                    # the name is only free again once the game has written its saves
+                    await asyncio.wait([game])
+            finally:
+                if player is not None:
+                    with self.players_lock:
+                        self.players.discard(player)
+                self.sessions -= 1
+                writer.transport.abort() # the client is gone, drop whatever it didn't read
+
+    # a directory's age is its newest file, saves append to their file without touching the directory
+    def expire_saves(self):
+        if not os.path.isdir(self.save_root):
+            return
+        cutoff = time.time() - self.expire_days * 86400
+        with os.scandir(self.save_root) as directories:
+            for directory in directories:
+                if not directory.is_dir():
+                    continue
+                with self.players_lock:
+                    if directory.name.removeprefix("player_") in self.players:
+                        continue
+                    newest = directory.stat().st_mtime
+                    with os.scandir(directory.path) as files:
+                        for entry in files:
+                            newest = max(newest, entry.stat().st_mtime)
+                    if newest < cutoff:
+                        logger.info("Deleting saves untouched since %s: %s", time.ctime(newest), directory.path)
+                        shutil.rmtree(directory.path, ignore_errors=True)
+
+    async def expire_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.expire_saves)
+            except OSError:
+                logger.exception("Could not expire old saves")
+            await asyncio.sleep(EXPIRE_EVERY)
+
+    async def serve(self):
+        # the story is loaded (and the bundle written) once up front, not by the first few games at once
+        get_compiled_story()
+        expiring = asyncio.create_task(self.expire_forever())
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiring.cancel()
+            self.executor.shutdown(wait=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Host the game for many players over TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--save-root", default="server_saves")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--expire-days", type=float, default=EXPIRE_DAYS,
+                        help="delete save directories nobody has written to for this many days")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(GameServer(args.host, args.port, args.save_root, args.max_sessions, args.expire_days).serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from catalog import DEFAULT_STARTING_ITEMS
+
+class Inventory:
+    __slots__ = ("items", "owner", "max_size", "starting_items")
+
+    def __init__(self, owner, max_size=20, starting_items=DEFAULT_STARTING_ITEMS):
+        self.items = {}
+        self.owner = owner
+        self.max_size = max_size
+        self.starting_items = starting_items
+        self.initialize_items()
+
+    def initialize_items(self):
+        for item_name, quantity in self.starting_items.items():
+            self.add_item(item_name, quantity)
+
+    def reset(self):
+        self.items.clear()
+        self.initialize_items()
+
+    def add_item(self, item_name, quantity=1):
+        current_quantity = self.items.get(item_name, 0)
+        new_quantity = current_quantity + quantity
+
+        if len(self.items) >= self.max_size and item_name not in self.items:
+            return False, "Inventory is full!"
+
+        self.items[item_name] = new_quantity
+        return True, f"{quantity} {item_name} added to inventory"
+
+    def remove_item(self, item_name, quantity=1):
+        if item_name not in self.items:
+            return False, "Item not in inventory"
+
+        if self.items[item_name] < quantity:
+            return False, "Not enough items"
+
+        self.items[item_name] -= quantity
+        if self.items[item_name] == 0:
+            del self.items[item_name]
+
+        return True, f"{quantity} {item_name} removed from inventory"
+
+    def get_item_count(self, item_name):
+        return self.items.get(item_name, 0)
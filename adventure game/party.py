@@ -1,12 +1,22 @@
 # mostly unchanged from the original code. I removed the level sync logic since I'm no longer
 # tethering levels in the class constructor logic as it will be easier to do that in the game loop
 # when constructing the party.
+# the party watches its members' health so "who is still standing", total health and the level
+# average are kept up to date as things happen instead of being recounted every time combat asks.
+import random
+from functools import partial
 
 class Party:
     def __init__(self, party_type="player", max_size=4):
         self.members = []
         self.party_type = party_type
         self.max_size = max_size
+        self.living_members = [] # no particular order, dead members are swapped out from the end
+        self.living_positions = {}
+        self.total_health = 0
+        self.level_total = 0
+        self.member_levels = {}
+        self.member_watchers = {}
 
     def add_member(self, member):
         if len(self.members) >= self.max_size:
@@ -21,21 +31,71 @@ class Party:
                 self.members.append(member)
             else:
                 raise ValueError("Can only add Enemy or Boss to enemy parties")
+        self.track_member(member)
 
     def remove_member(self, member):
         if member in self.members:
             self.members.remove(member)
+            self.untrack_member(member)
+
+    def track_member(self, member):
+        health = member.stats["Health"]
+        self.total_health += health
+        self.level_total += member.level
+        self.member_levels[member] = member.level
+        if health > 0:
+            self.add_living(member)
+        watcher = partial(self.health_changed, member)
+        self.member_watchers[member] = watcher
+        member.stats.watch(watcher)
+
+    def untrack_member(self, member):
+        member.stats.unwatch(self.member_watchers.pop(member))
+        self.total_health -= member.stats["Health"]
+        self.level_total -= self.member_levels.pop(member)
+        if member in self.living_positions:
+            self.remove_living(member)
+
+    def add_living(self, member):
+        self.living_positions[member] = len(self.living_members)
+        self.living_members.append(member)
+
+    def remove_living(self, member):
+        position = self.living_positions.pop(member)
+        last = self.living_members.pop()
+        if last is not member:
+            self.living_members[position] = last
+            self.living_positions[last] = position
+
+    def health_changed(self, member, old_health, new_health):
+        self.total_health += new_health - old_health
+        if old_health > 0 and new_health <= 0:
+            self.remove_living(member)
+        elif old_health <= 0 and new_health > 0:
+            self.add_living(member)
+        # update_stats always rewrites health, so level ups come through here as well
+        if member.level != self.member_levels[member]:
+            self.level_total += member.level - self.member_levels[member]
+            self.member_levels[member] = member.level
 
     def get_active_members(self):
-        return [member for member in self.members if member.stats["Health"] > 0]
+        return [member for member in self.members if member in self.living_positions]
+
+    def get_living_count(self):
+        return len(self.living_members)
+
+    def get_random_living_member(self, rng=random):
+        if not self.living_members:
+            return None
+        return rng.choice(self.living_members)
 
     def is_party_alive(self):
-        return len(self.get_active_members()) > 0
+        return len(self.living_members) > 0
 
     def get_total_health(self):
         if not self.members:
             return 0
-        return sum([member.stats["Health"] for member in self.members])
+        return self.total_health
 
     def get_party_status(self):
         member_info = []
@@ -53,4 +113,4 @@ class Party:
     def get_average_level(self):
         if not self.members:
             return 0
-        return sum([member.level for member in self.members]) / len(self.members)
+        return self.level_total / len(self.members)
@@ -0,0 +1,191 @@
+# the formats a save journal can be written in. json journals are the text lines from before (and
+# the old pretty printed saves load too), they get no magic bytes so they stay readable. the binary
+# codecs start the file with 8 magic bytes and store each record as a 4 byte length and the payload,
+# so load only has to look at the start of a file to know how to read the rest of it.
+# json goes through orjson when it is installed, it writes the same bytes, just faster.
+# marshal is tied to the python version and pickle can run code when loaded, so neither is ever
+# picked automatically, and pickle saves only load for a GameSave that was set up to write them.
+import json
+import marshal
+import pickle
+import struct
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FRAME = struct.Struct("<I")
+MAGIC_SIZE = 8
+
+class Codec:
+    name = None
+    magic = b""
+
+    def encode(self, record):
+        raise NotImplementedError("Codecs must implement encode")
+
+    def decode(self, payload):
+        raise NotImplementedError("Codecs must implement decode")
+
+    def frame(self, record):
+        payload = self.encode(record)
+        return FRAME.pack(len(payload)) + payload
+
+    # returns [(record, frame size)] for every complete record and whether the data ends in a torn one
+    def read_frames(self, data):
+        records = []
+        offset = len(self.magic)
+        while offset < len(data):
+            if offset + FRAME.size > len(data):
+                return records, True
+            size, = FRAME.unpack_from(data, offset)
+            end = offset + FRAME.size + size
+            if end > len(data):
+                return records, True
+            try:
+                record = self.decode(data[offset + FRAME.size:end])
+            except Exception:
+                return records, True
+            records.append((record, end - offset))
+            offset = end
+        return records, False
+
+    # the next record from an open file and its size on disk, None at the end or at a torn record
+    def read_frame(self, f):
+        prefix = f.read(FRAME.size)
+        if len(prefix) < FRAME.size:
+            return None
+        size, = FRAME.unpack(prefix)
+        payload = f.read(size)
+        if len(payload) < size:
+            return None
+        try:
+            return self.decode(payload), FRAME.size + size
+        except Exception:
+            return None
+
+    # decodes a frame that was read straight out of the file by its offset and size
+    def unframe(self, data):
+        return self.decode(data[FRAME.size:])
+
+class JsonCodec(Codec):
+    name = "json"
+
+    def encode(self, record):
+        return json.dumps(record, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, payload):
+        return json.loads(payload)
+
+    def frame(self, record):
+        return self.encode(record) + b"\n"
+
+    def read_frames(self, data):
+        records = []
+        offset = 0
+        while offset < len(data):
+            end = data.find(b"\n", offset)
+            if end == -1:
+                return records, True
+            try:
+                record = self.decode(data[offset:end])
+            except ValueError:
+                return records, True
+            records.append((record, end + 1 - offset))
+            offset = end + 1
+        return records, False
+
+    def read_frame(self, f):
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            return None
+        try:
+            return self.decode(line), len(line)
+        except ValueError:
+            return None
+
+    def unframe(self, data):
+        return self.decode(data)
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def encode(self, record):
+        return orjson.dumps(record)
+
+    def decode(self, payload):
+        return orjson.loads(payload)
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    magic = b"TAGSAVEk"
+
+    def encode(self, record):
+        return msgpack.packb(record, use_bin_type=True)
+
+    def decode(self, payload):
+        return msgpack.unpackb(payload, raw=False)
+
+class MarshalCodec(Codec):
+    name = "marshal"
+    magic = b"TAGSAVEm"
+
+    def encode(self, record):
+        return marshal.dumps(record, 4)
+
+    def decode(self, payload):
+        return marshal.loads(payload)
+
+class PickleCodec(Codec):
+    name = "pickle"
+    magic = b"TAGSAVEp"
+
+    def encode(self, record):
+        return pickle.dumps(record, protocol=5)
+
+    def decode(self, payload):
+        return pickle.loads(payload)
+
+CODECS = {"json": JsonCodec(), "marshal": MarshalCodec(), "pickle": PickleCodec()}
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec()
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+# every magic we know about, so a save from a codec that isn't installed gets a useful error
+KNOWN_MAGIC = {
+        MsgpackCodec.magic: "msgpack",
+        MarshalCodec.magic: "marshal",
+        PickleCodec.magic: "pickle"
+        }
+
+# what a GameSave writes with when it isn't told, first one that is installed
+AUTO_ORDER = ("msgpack", "orjson", "json")
+
+def get_codec(name=None):
+    if name is None:
+        for candidate in AUTO_ORDER:
+            if candidate in CODECS:
+                return CODECS[candidate]
+    if name not in CODECS:
+        raise ValueError(f"Save codec {name} is not available")
+    return CODECS[name]
+
+def json_codec():
+    return CODECS.get("orjson", CODECS["json"])
+
+def detect_codec(data, allow_pickle=False):
+    name = KNOWN_MAGIC.get(bytes(data[:MAGIC_SIZE]))
+    if name is None:
+        return json_codec()
+    if name == "pickle" and not allow_pickle:
+        raise ValueError("Refusing to load a pickle save, pickle saves have to be enabled")
+    if name not in CODECS:
+        raise ValueError(f"This save was written with {name}, which is not installed")
+    return CODECS[name]
@@ -0,0 +1,246 @@
+# saves used to rewrite the whole pretty printed document every time. a journal file starts with a
+# full snapshot on the first line and then gets one line per save holding only what changed since the
+# line before, so an autosave after a story node appends a few hundred bytes instead of the world.
+# once the changes add up the file is rewritten as a single snapshot again.
+# what a "line" looks like on disk is up to the codec (save_codecs.py), found again from the file on load
+# the snapshot is stored one top level section at a time behind a table of offsets, so open_lazy can
+# hand back the player and location straight away and only read the rest when something asks for it
+import copy
+import os
+from collections.abc import Mapping
+from atomic_file import write_atomically
+from save_codecs import get_codec, detect_codec, MAGIC_SIZE
+
+JOURNAL_VERSION = 2 # 1 kept the whole snapshot in one record, those still load
+REMOVED = "\u0000removed" # delta value for a key that is gone in the newer state
+COMPACT_AFTER = 64 # deltas appended before the journal is rewritten as one snapshot
+EAGER_SECTION_BYTES = 512 # sections this small are read when the save is opened
+
+# nested dicts are diffed key by key, anything else (numbers, strings, lists) is replaced whole
+def diff_state(old, new):
+    delta = {}
+    for key, value in new.items():
+        if key not in old:
+            delta[key] = value
+            continue
+        old_value = old[key]
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            nested = diff_state(old_value, value)
+            if nested:
+                delta[key] = nested
+        elif type(value) is not type(old_value) or value != old_value:
+            delta[key] = value
+    for key in old:
+        if key not in new:
+            delta[key] = REMOVED
+    return delta
+
+def apply_delta(state, delta):
+    for key, value in delta.items():
+        if value == REMOVED:
+            state.pop(key, None)
+        elif isinstance(value, dict) and isinstance(state.get(key), dict):
+            apply_delta(state[key], value)
+        else:
+            state[key] = value
+    return state
+
+class SaveJournal:
+    def __init__(self, path, codec=None, compact_after=COMPACT_AFTER, allow_pickle=False):
+        self.path = path
+        self.codec = codec if codec is not None else get_codec() # what snapshots are written with
+        self.file_codec = self.codec # what the file on disk uses, deltas have to match it
+        self.allow_pickle = allow_pickle
+        self.compact_after = compact_after
+        self.state = None # the state the last line of the file leaves you with
+        self.deltas = 0
+        self.base_bytes = 0
+        self.delta_bytes = 0
+        self.torn = False # the last line was cut off, appending after it would glue two lines together
+        self.legacy = False # an old pretty printed save, the next write replaces it with a snapshot
+
+    def load(self):
+        if self.state is None:
+            self.read()
+        return copy.deepcopy(self.state)
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if not data:
+            raise ValueError(f"{self.path} is empty")
+        self.file_codec = detect_codec(data, self.allow_pickle)
+        records, torn = self.file_codec.read_frames(data)
+        self.deltas = 0
+        self.delta_bytes = 0
+        self.torn = False
+        self.legacy = False
+        if not records or not is_header(records[0][0]):
+            self.read_legacy(data)
+            return
+        header, self.base_bytes = records[0]
+        if header["version"] == 1:
+            state = header["base"]
+            first_delta = 1
+        else:
+            names = list(header["sections"])
+            if len(records) <= len(names):
+                raise ValueError(f"{self.path} is missing sections")
+            state = {name: records[1 + i][0] for i, name in enumerate(names)}
+            self.base_bytes += sum(size for record, size in records[1:1 + len(names)])
+            first_delta = 1 + len(names)
+        for record, size in records[first_delta:]:
+            apply_delta(state, record["delta"])
+            self.deltas += 1
+            self.delta_bytes += size
+        self.torn = torn # the game went down halfway through appending the last one
+        self.state = state
+
+    def read_legacy(self, data):
+        if self.file_codec.magic:
+            raise ValueError(f"{self.path} has no snapshot")
+        state = self.file_codec.decode(data)
+        if not isinstance(state, dict) or "player" not in state:
+            raise ValueError(f"{self.path} is not a save")
+        self.legacy = True
+        self.base_bytes = len(data)
+        self.state = state
+
+    def write(self, state):
+        if self.state is None and os.path.exists(self.path):
+            try:
+                self.read()
+            except ValueError:
+                self.state = None
+        if self.state is None or self.needs_compaction():
+            self.write_base(state)
+            return
+        delta = diff_state(self.state, state)
+        if not delta:
+            return
+        line = self.file_codec.frame({"delta": delta})
+        with open(self.path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.state = copy.deepcopy(state)
+        self.deltas += 1
+        self.delta_bytes += len(line)
+
+    def needs_compaction(self):
+        return (self.torn or self.legacy or self.file_codec.magic != self.codec.magic
+                or self.deltas >= self.compact_after or self.delta_bytes > self.base_bytes)
+
+    def write_base(self, state):
+        line = encode_snapshot(self.codec, state)
+        write_atomically(self.path, line)
+        self.file_codec = self.codec
+        self.torn = False
+        self.legacy = False
+        self.state = copy.deepcopy(state)
+        self.deltas = 0
+        self.base_bytes = len(line)
+        self.delta_bytes = 0
+
+    # reads the table of sections and the deltas after them, but none of the sections themselves
+    def open_lazy(self):
+        if self.state is not None:
+            return self.load()
+        f = open(self.path, "rb")
+        try:
+            codec = detect_codec(f.read(MAGIC_SIZE), self.allow_pickle)
+            f.seek(len(codec.magic))
+            frame = codec.read_frame(f)
+            if frame is None or not is_header(frame[0]) or frame[0]["version"] == 1:
+                f.close()
+                return self.load()
+            table = frame[0]["sections"]
+            sections_start = f.tell()
+            f.seek(sections_start + sum(size for offset, size in table.values()))
+            pending = {}
+            while True:
+                frame = codec.read_frame(f)
+                if frame is None:
+                    break
+                for name, change in frame[0]["delta"].items():
+                    pending.setdefault(name, []).append(change)
+        except BaseException:
+            f.close()
+            raise
+        return LazySave(f, codec, sections_start, table, pending)
+
+# the codec's magic, the table of sections, then each top level section in its own frame
+def encode_snapshot(codec, state):
+    sections = []
+    table = {}
+    offset = 0
+    for name, value in state.items():
+        section = codec.frame(value)
+        table[name] = [offset, len(section)]
+        offset += len(section)
+        sections.append(section)
+    header = codec.frame({"version": JOURNAL_VERSION, "sections": table})
+    return b"".join([codec.magic, header] + sections)
+
+def is_header(record):
+    return isinstance(record, dict) and record.get("version") in (1, JOURNAL_VERSION) and (
+            "base" in record or "sections" in record)
+
+# a save as a read only mapping, the small sections (location, timestamp, rng...) are read straight
+# away and each big one is read from the file the first time it is used. the file stays open until
+# every section has been read or close is called, so a compaction replacing the file underneath
+# doesn't matter. whoever opens one closes it once they have read what they need, or uses it in a
+# with block
+class LazySave(Mapping):
+    def __init__(self, f, codec, sections_start, table, pending):
+        self.file = f
+        self.codec = codec
+        self.sections_start = sections_start
+        self.table = table
+        self.pending = pending # deltas not applied yet, by section
+        self.loaded = {}
+        self.names = [name for name in dict.fromkeys(list(table) + list(pending)) if self.exists(name)]
+        for name in self.names:
+            if name not in table or table[name][1] <= EAGER_SECTION_BYTES:
+                self[name]
+
+    def exists(self, name):
+        if name in self.pending:
+            return self.pending[name][-1] != REMOVED
+        return name in self.table
+
+    def __getitem__(self, name):
+        if name in self.loaded:
+            return self.loaded[name]
+        if not self.exists(name):
+            raise KeyError(name)
+        section = {}
+        if name in self.table:
+            offset, size = self.table[name]
+            self.file.seek(self.sections_start + offset)
+            section[name] = self.codec.unframe(self.file.read(size))
+        for change in self.pending.pop(name, ()):
+            apply_delta(section, {name: change})
+        self.loaded[name] = section[name]
+        if len(self.loaded) == len(self.names):
+            self.close()
+        return self.loaded[name]
+
+    def __contains__(self, name):
+        return name in self.loaded or self.exists(name)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,115 +1,254 @@
+# saves now cover the whole party (inventories and buffs included), where the story is (and what it
+# has visited and flagged along the way) and the rng, and are written through a SaveJournal so
+# repeated saves to the same slot only append what changed.
+# old .json saves still load, they just come back without the extra sections.
+import base64
 import json
 import os
+import struct
 from datetime import datetime
+from functools import partial
+from save_codecs import get_codec
+from atomic_file import write_atomically
+from save_journal import SaveJournal
+from save_writer import get_shared_writer
+from console import Console
+
+SAVE_EXTENSIONS = (".save", ".json")
+
+# the save menu reads this one file instead of opening every save. every save a GameSave writes updates
+# its entry, and each entry remembers the mtime and size of the save it was made from, so the menu only
+# stats the saves it finds and re-reads the ones that are new or were changed by something else
+INDEX_FILENAME = "saves.index"
+INDEX_VERSION = 1
+
+# the mersenne twister's 624 words and its position in them
+RNG_STATE = struct.Struct("<625I")
+
+def capture_member(member):
+    return {
+            "name": member.name,
+            "class": getattr(member, "player_class", None) or getattr(member, "npc_class", None),
+            "level": member.level,
+            "experience": member.experience,
+            "experience_to_next_level": member.experience_to_next_level,
+            "stats": dict(member.stats),
+            "current_mana": getattr(member, "current_mana", 0),
+            "max_mana": getattr(member, "max_mana", 0),
+            "inventory": dict(member.inventory.items),
+            "active_buffs": {stat: list(buffs) for stat, buffs in member.active_buffs.items()}
+            }
+
+def capture_state(player, current_location, party=None, story=None, rng=None):
+    if player is None:
+        raise ValueError("Player is required to save the game")
+    state = {
+            "player": capture_member(player),
+            "location": current_location,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+    # companions are keyed by their place in the party so a change to one of them diffs on its own
+    if party is not None:
+        state["companions"] = {
+                str(position): capture_member(member)
+                for position, member in enumerate(party.members) if member is not player
+                }
+    if story is not None:
+        state["story"] = {"current_node": story.current_node.node_id if story.current_node else None}
+        state["story_state"] = story.state.snapshot(story.graph)
+    if rng is not None:
+        state["rng"] = capture_rng(rng)
+    return state
+
+# the generator's state is read without drawing from it, so saving doesn't change what comes next
+def capture_rng(rng):
+    version, internal, gauss_next = rng.getstate()
+    return {
+            "state": base64.b64encode(RNG_STATE.pack(*internal)).decode("ascii"),
+            "gauss_next": gauss_next
+            }
+
+def restore_rng(rng, saved):
+    # older saves kept a seed instead
+    if isinstance(saved, int):
+        rng.seed(saved)
+        return
+    internal = RNG_STATE.unpack(base64.b64decode(saved["state"]))
+    rng.setstate((rng.VERSION, internal, saved["gauss_next"]))
+
+def summarize_save(filename, save_data):
+    return {
+            "filename": filename,
+            "timestamp": save_data["timestamp"],
+            "name": save_data["player"]["name"],
+            "player_class": save_data["player"]["class"],
+            "player_level": save_data["player"]["level"],
+            "location": save_data["location"]
+            }
+
+# lazy saves hold their file open until every section has been read, old .json saves are plain dicts
+def close_save(save_data):
+    if hasattr(save_data, "close"):
+        save_data.close()
 
 class GameSave:
-    def __init__(self, save_directory="saves"):
+    def __init__(self, save_directory="saves", writer=None, codec=None, console=None):
         self.save_directory = save_directory
+        self.codec = get_codec(codec) # saves in any format still load, this is only what new writes use
         self.max_slots = 5
+        self.journals = {}
+        # writes happen on the writer's thread, the state is captured here so it can't change underneath
+        self.writer = writer if writer is not None else get_shared_writer()
+        self.writer_owner = os.path.abspath(save_directory) # flush only waits for this directory's saves
+        self.console = console if console is not None else Console() # for the save menu
         if not os.path.exists(save_directory):
             os.makedirs(save_directory)
-            
-    def save_game(self, player, current_location, slot=1, auto_save=False):
-        if player is None:
-            raise ValueError("Player is required to save the game")
-
-        save_data = {
-                "player": {
-                    "name": player.name,
-                    "class": player.player_class,
-                    "level": player.level,
-                    "experience": player.experience,
-                    "stats": player.stats,
-                    "current_mana": getattr(player, "current_mana", 0),
-                    "max_mana": getattr(player, "max_mana", 0),
-                },
-                "location": current_location,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+
+    def journal(self, filepath):
+        if filepath not in self.journals:
+            self.journals[filepath] = SaveJournal(filepath, self.codec, allow_pickle=self.codec.name == "pickle")
+        return self.journals[filepath]
+
+    def save_game(self, player, current_location, slot=1, auto_save=False, party=None, story=None, rng=None):
+        save_data = capture_state(player, current_location, party, story, rng)
         if auto_save:
-            filename = "autosave.json"
+            filename = "autosave.save"
         elif slot is not None:
             if slot > self.max_slots:
                 raise ValueError(f"Slot number must be between 1 and {self.max_slots}")
-            filename = f"save_{slot}.json"
+            filename = f"save_{slot}.save"
         else:
-            filename = f"save_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+            filename = f"save_{datetime.now().strftime('%Y%m%d%H%M%S')}.save"
         filepath = os.path.join(self.save_directory, filename)
-        with open(filepath, "w") as f:
-            json.dump(save_data, f, indent=4)
+        self.writer.submit(filepath, partial(self.write_save, filename, save_data), self.writer_owner)
         return filepath
 
+    def write_save(self, filename, save_data):
+        self.journal(os.path.join(self.save_directory, filename)).write(save_data)
+        self.update_index(filename, save_data)
+
+    def index_path(self):
+        return os.path.join(self.save_directory, INDEX_FILENAME)
+
+    def read_index(self):
+        try:
+            with open(self.index_path(), "r") as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return {}
+        return index["saves"]
+
+    def write_index(self, entries):
+        write_atomically(self.index_path(), json.dumps({"version": INDEX_VERSION, "saves": entries},
+                                                       separators=(",", ":")).encode("utf-8"))
+
+    def index_entry(self, filename, save_data, stat):
+        entry = summarize_save(filename, save_data)
+        entry["mtime_ns"] = stat.st_mtime_ns
+        entry["size"] = stat.st_size
+        return entry
+
+    def update_index(self, filename, save_data):
+        entries = self.read_index()
+        stat = os.stat(os.path.join(self.save_directory, filename))
+        entries[filename] = self.index_entry(filename, save_data, stat)
+        self.write_index(entries)
+
     def load_game(self, filename):
+        self.writer.flush(self.writer_owner)
         filepath = os.path.join(self.save_directory, filename)
         try:
-            with open(filepath, "r") as f:
-                save_data = json.load(f)
-            return save_data
+            return self.journal(filepath).open_lazy()
         except FileNotFoundError:
             return None
 
     def list_saves(self):
+        self.writer.flush(self.writer_owner)
+        entries = self.read_index()
+        fresh = {}
+        changed = False
+        with os.scandir(self.save_directory) as directory:
+            for dir_entry in directory:
+                if not dir_entry.name.endswith(SAVE_EXTENSIONS):
+                    continue
+                entry = entries.get(dir_entry.name)
+                stat = dir_entry.stat()
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    fresh[dir_entry.name] = entry
+                    continue
+                # new, changed behind our back, or never indexed (older saves)
+                changed = True
+                self.journals.pop(dir_entry.path, None)
+                try:
+                    save_data = self.load_game(dir_entry.name)
+                except ValueError:
+                    save_data = None
+                if save_data:
+                    fresh[dir_entry.name] = self.index_entry(dir_entry.name, save_data, stat)
+                    close_save(save_data)
+        if changed or len(fresh) != len(entries):
+            self.write_index(fresh)
+
         saves = []
-        for filename in os.listdir(self.save_directory):
-            if filename.endswith(".json"):
-                filepath = os.path.join(self.save_directory, filename)
-                with open(filepath, "r") as f:
-                    save_data = json.load(f)
-                    saves.append({
-                        "filename": filename,
-                        "timestamp": save_data["timestamp"],
-                        "name": save_data["player"]["name"],
-                        "player_class": save_data["player"]["class"],
-                        "player_level": save_data["player"]["level"],
-                        "location": save_data["location"]
-                        })
+        for filename in sorted(fresh):
+            entry = fresh[filename]
+            saves.append({key: entry[key] for key in
+                          ("filename", "timestamp", "name", "player_class", "player_level", "location")})
         return saves
 
-    def handle_save_menu(self, player, current_location):
+    def handle_save_menu(self, player, current_location, party=None, story=None, rng=None):
         while True:
-            print("\nSave Game Menu:")
-            print("1. Create New Save")
-            print("2. Load Save")
-            print("3. List Saves")
-            print("4. Return to Game")
+            self.console.write("\nSave Game Menu:")
+            self.console.write("1. Create New Save")
+            self.console.write("2. Load Save")
+            self.console.write("3. List Saves")
+            self.console.write("4. Return to Game")
             
-            choice = input("Enter choice (1-4): ")
+            choice = self.console.read_line("Enter choice (1-4): ")
             if choice == "1":
                 if player is None:
-                    print("No active game session to save!")
+                    self.console.write("No active game session to save!")
                     continue
                 if current_location is None:
                     current_location = "town"
-                filepath = self.save_game(player, current_location)
-                print(f"Game saved successfully to {filepath}")
+                filepath = self.save_game(player, current_location, party=party, story=story, rng=rng)
+                # the write happens on the writer's thread, it has to finish before it can be reported
+                try:
+                    self.writer.flush(self.writer_owner)
+                except OSError as e:
+                    self.console.write(f"Could not save the game to {filepath}: {e}")
+                    continue
+                self.console.write(f"Game saved successfully to {filepath}")
                 return None
             elif choice == "2":
                 saves = self.list_saves()
                 if not saves:
-                    print("No saved games found!")
+                    self.console.write("No saved games found!")
                     continue
-                print("\nAvailable Saves:")
+                self.console.write("\nAvailable Saves:")
                 for i, save in enumerate(saves, 1):
-                    print(f"{i}. {save['timestamp']} - {save['player_class']} Level {save['player_level']} - {save['location']}")
+                    self.console.write(f"{i}. {save['timestamp']} - {save['player_class']} Level {save['player_level']} - {save['location']}")
                 try:
-                    save_choice = int(input("Enter save number to load (0 to cancel): "))
+                    save_choice = int(self.console.read_line("Enter save number to load (0 to cancel): "))
                     if save_choice == 0:
                         continue
                     if 1 <= save_choice <= len(saves):
                         save_data = self.load_game(saves[save_choice - 1]["filename"])
                         return save_data
-                    print("Invalid save number!")
+                    self.console.write("Invalid save number!")
                 except ValueError:
-                    print("Invalid input. Please enter a valid number!")
+                    self.console.write("Invalid input. Please enter a valid number!")
             elif choice == "3":
                 saves = self.list_saves()
                 if not saves:
-                    print("No saved games found!")
+                    self.console.write("No saved games found!")
                     continue
-                print("\nAvailable Saves:")
+                self.console.write("\nAvailable Saves:")
                 for i, save in enumerate(saves, 1):
-                    print(f"{i}. {save['timestamp']} - {save['player_class']} Level {save['player_level']} - {save['location']}")
+                    self.console.write(f"{i}. {save['timestamp']} - {save['player_class']} Level {save['player_level']} - {save['location']}")
             elif choice == "4":
                 return None
             else:
-                print("Invalid choice. Please enter a number between 1 and 4.")
+                self.console.write("Invalid choice. Please enter a number between 1 and 4.")
@@ -0,0 +1,104 @@
+# saving used to block the game loop on the disk. save jobs now go to one background thread, and a
+# job for a file that already has one waiting replaces it, so a burst of autosaves is one write.
+# anything that reads saves back calls flush first.
+# every job belongs to an owner (a GameSave passes its save directory), flush(owner) only waits for
+# that owner's jobs and only raises that owner's failed writes, so one writer can be shared by
+# saves that have nothing to do with each other. an owner somebody is waiting on is written first.
+import atexit
+import threading
+
+class SaveWriter:
+    def __init__(self):
+        self.pending = {} # key -> (owner, job), oldest first
+        self.running = None # owner of the job being written right now
+        self.busy = False
+        self.errors = {} # owner -> the first write of theirs that failed since their last flush
+        self.waiting = {} # owner -> how many flushes are waiting on it
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="save-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, key, job, owner=None):
+        with self.condition:
+            if self.closed:
+                raise ValueError("Save writer is closed")
+            self.pending.pop(key, None) # the newer save for this file wins
+            self.pending[key] = (owner, job)
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                key = self.next_key()
+                owner, job = self.pending.pop(key)
+                self.running = owner
+                self.busy = True
+            try:
+                job()
+            except Exception as e:
+                with self.condition:
+                    self.errors.setdefault(owner, e)
+            with self.condition:
+                self.busy = False
+                self.running = None
+                self.condition.notify_all()
+
+    # the oldest job of an owner that is being flushed, or the oldest job
+    def next_key(self):
+        if self.waiting:
+            for key, (owner, job) in self.pending.items():
+                if owner in self.waiting:
+                    return key
+        return next(iter(self.pending))
+
+    def has_work(self, owner):
+        if owner is None:
+            return bool(self.pending) or self.busy
+        if self.busy and self.running == owner:
+            return True
+        return any(job_owner == owner for job_owner, job in self.pending.values())
+
+    # waits for everything the owner submitted so far (everybody's, with no owner), a failed write is
+    # raised here
+    def flush(self, owner=None):
+        with self.condition:
+            self.waiting[owner] = self.waiting.get(owner, 0) + 1
+            try:
+                while self.has_work(owner):
+                    self.condition.wait()
+            finally:
+                self.waiting[owner] -= 1
+                if not self.waiting[owner]:
+                    del self.waiting[owner]
+            if owner is None:
+                errors = list(self.errors.values())
+                self.errors.clear()
+                error = errors[0] if errors else None
+            else:
+                error = self.errors.pop(owner, None)
+        if error is not None:
+            raise error
+
+    # the jobs already submitted are still written before the thread stops
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        atexit.unregister(self.close)
+
+shared_writer = None
+shared_writer_lock = threading.Lock()
+
+def get_shared_writer():
+    global shared_writer
+    with shared_writer_lock:
+        if shared_writer is None:
+            shared_writer = SaveWriter()
+        return shared_writer
@@ -0,0 +1,13 @@
+# seeds for reproducible runs. every fight gets its own seed worked out from the master seed and
+# whatever identifies the fight (matchup, fight number...), so a fight plays out the same way no
+# matter which worker process ends up running it or in what order. hash() is salted per process,
+# so this goes through blake2b instead.
+import hashlib
+import random
+
+def derive_seed(master_seed, *keys):
+    digest = hashlib.blake2b(repr((master_seed,) + keys).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def derive_rng(master_seed, *keys):
+    return random.Random(derive_seed(master_seed, *keys))
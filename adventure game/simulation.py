@@ -0,0 +1,249 @@
+# headless combat runner for balancing. handle_combat in the game loop needs a person at the
+# keyboard for every turn, so this plays Combat.handle_combat_turn directly with a policy picking
+# the player's moves and spreads the fights over a process pool.
+import argparse
+from collections import Counter
+from multiprocessing import Pool
+from player_classes import Warrior, Mage, Archer
+from party import Party
+from spawner import SPAWNABLE_TYPES, EnemyPool, spawn
+from combat import Combat
+from combat_events import DAMAGE, ITEM, MANA_RESTORED
+from seeding import derive_rng
+
+PLAYER_CLASSES = {
+        "Warrior": Warrior,
+        "Mage": Mage,
+        "Archer": Archer
+        }
+
+ENEMY_CLASSES = SPAWNABLE_TYPES
+
+# each worker process recycles its own enemies between fights
+ENEMY_POOL = EnemyPool()
+
+MAX_TURNS = 500
+
+def first_living_target(combat):
+    for i, enemy in enumerate(combat.enemy_party.members):
+        if enemy.stats["Health"] > 0:
+            return i
+    return None
+
+# policies get the combat and the acting player and return the arguments for handle_combat_turn
+def attack_policy(combat, player):
+    return "attack", first_living_target(combat), None, None
+
+def caster_policy(combat, player):
+    target = first_living_target(combat)
+    best_spell = None
+    best_damage = 0
+    for spell_name, spell in player.spells.items():
+        if spell.can_cast(player):
+            damage = spell.base_damage + (player.stats["Magic"] * spell.scaling_factor)
+            if damage > best_damage:
+                best_damage = damage
+                best_spell = spell_name
+    if best_spell:
+        return "cast_spell", target, best_spell, None
+    return "attack", target, None, None
+
+def cautious_policy(combat, player):
+    if player.stats["Health"] < player.max_health * 0.3:
+        if player.inventory.get_item_count("Health Potion") > 0:
+            return "use_item", None, None, "Health Potion"
+        return "flee", None, None, None
+    return caster_policy(combat, player)
+
+POLICIES = {
+        "attack": attack_policy,
+        "caster": caster_policy,
+        "cautious": cautious_policy
+        }
+
+def create_player(player_class, level):
+    player = PLAYER_CLASSES[player_class]("Sim")
+    if level != player.level:
+        player.level = level
+        player.update_stats()
+    return player
+
+def create_enemy(enemy_class, level):
+    return spawn(enemy_class, level)
+
+def simulate_fight(player_class, enemy_class, level, policy, max_turns=MAX_TURNS, enemy_level=None, rng=None,
+                   listener=None, recorder=None):
+    if enemy_level is None:
+        enemy_level = level
+    player = create_player(player_class, level)
+    player_party = Party("player")
+    player_party.add_member(player)
+    enemy_party = Party("enemy")
+    enemy_classes = (enemy_class,) if isinstance(enemy_class, str) else enemy_class
+    for name in enemy_classes:
+        enemy_party.add_member(ENEMY_POOL.acquire(name, enemy_level))
+    combat = Combat(player_party, enemy_party, rng)
+    if listener is not None:
+        combat.subscribe(listener)
+    if recorder is not None:
+        recorder.record(combat)
+
+    start_player_health = player_party.get_total_health()
+    start_enemy_health = enemy_party.get_total_health()
+    outcome = "TIMEOUT"
+    turns = 0
+    player_health = player.stats["Health"]
+    while turns < max_turns:
+        if combat.is_player_turn:
+            result, success = combat.handle_combat_turn(*policy(combat, player))
+        else:
+            result, success = combat.handle_combat_turn("attack")
+        turns += 1
+        if result == "FLED":
+            outcome = "FLED"
+            break
+        # some results are reported per member, so the parties decide who actually won
+        if not enemy_party.is_party_alive():
+            outcome = "VICTORY"
+            break
+        # the blow that wins the fight can level the player up, and that heals, so the health the fight
+        # left the player with is kept from before the winning turn
+        player_health = player.stats["Health"]
+        if not player_party.is_party_alive():
+            outcome = "DEFEAT"
+            break
+
+    fight = {
+            "outcome": outcome,
+            "turns": turns,
+            "damage_dealt": start_enemy_health - enemy_party.get_total_health(),
+            "damage_taken": start_player_health - player_party.get_total_health(),
+            "hp_remaining": player_health # before any level up from the experience
+            }
+    ENEMY_POOL.release_party(enemy_party)
+    return fight
+
+class SimulationStats:
+    def __init__(self):
+        self.fights = 0
+        self.outcomes = Counter()
+        self.turns = Counter()
+        self.damage_dealt = Counter()
+        self.damage_taken = Counter()
+        self.events = Counter()
+
+    # subscribed to every fight's Combat, counts what happened by kind without rendering any of it
+    def record_event(self, event):
+        self.events[event.kind] += 1
+
+    def record(self, fight):
+        self.fights += 1
+        self.outcomes[fight["outcome"]] += 1
+        self.turns[fight["turns"]] += 1
+        self.damage_dealt[int(fight["damage_dealt"])] += 1
+        self.damage_taken[int(fight["damage_taken"])] += 1
+
+    def merge(self, other):
+        self.fights += other.fights
+        self.outcomes.update(other.outcomes)
+        self.turns.update(other.turns)
+        self.damage_dealt.update(other.damage_dealt)
+        self.damage_taken.update(other.damage_taken)
+        self.events.update(other.events)
+
+    @property
+    def win_rate(self):
+        if not self.fights:
+            return 0
+        return self.outcomes["VICTORY"] / self.fights
+
+def histogram_mean(histogram):
+    total = sum(histogram.values())
+    if not total:
+        return 0
+    return sum(value * count for value, count in histogram.items()) / total
+
+def histogram_percentile(histogram, percentile):
+    total = sum(histogram.values())
+    if not total:
+        return 0
+    threshold = total * percentile
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= threshold:
+            return value
+    return max(histogram)
+
+def fight_rng(seed, player_class, enemy_class, level, policy_name, fight_number):
+    return derive_rng(seed, player_class, enemy_class, level, policy_name, fight_number)
+
+def run_chunk(job):
+    player_class, enemy_class, level, policy_name, first_fight, fights, seed = job
+    policy = POLICIES[policy_name]
+    stats = SimulationStats()
+    for fight_number in range(first_fight, first_fight + fights):
+        rng = fight_rng(seed, player_class, enemy_class, level, policy_name, fight_number)
+        stats.record(simulate_fight(player_class, enemy_class, level, policy, rng=rng,
+                                    listener=stats.record_event))
+    return (player_class, enemy_class, level), stats
+
+# fights are numbered per matchup and seeded by number, so the totals don't change with the chunk
+# size or the number of processes
+def build_jobs(matchups, fights, policy_name, seed, chunk_size):
+    jobs = []
+    for player_class, enemy_class, level in matchups:
+        for first_fight in range(0, fights, chunk_size):
+            chunk = min(chunk_size, fights - first_fight)
+            jobs.append((player_class, enemy_class, level, policy_name, first_fight, chunk, seed))
+    return jobs
+
+def run_simulations(matchups, fights=1000, policy_name="caster", seed=0, processes=None, chunk_size=1000):
+    if policy_name not in POLICIES:
+        raise ValueError(f"Unknown policy: {policy_name}")
+    jobs = build_jobs(matchups, fights, policy_name, seed, chunk_size)
+    results = {}
+    if processes == 1:
+        chunks = map(run_chunk, jobs)
+        for key, stats in chunks:
+            results.setdefault(key, SimulationStats()).merge(stats)
+        return results
+    with Pool(processes) as pool:
+        for key, stats in pool.imap_unordered(run_chunk, jobs):
+            results.setdefault(key, SimulationStats()).merge(stats)
+    return results
+
+def format_report(results):
+    lines = [
+            f"{'Class':<8} {'Enemy':<8} {'Lvl':>3} {'Fights':>8} {'Win %':>6} {'Fled %':>6} "
+            f"{'Turns':>6} {'p90':>4} {'Dealt':>7} {'Taken':>7} {'p90':>5} {'Hits':>5} {'Items':>5}"
+            ]
+    for (player_class, enemy_class, level), stats in sorted(results.items()):
+        lines.append(
+                f"{player_class:<8} {enemy_class:<8} {level:>3} {stats.fights:>8} "
+                f"{stats.win_rate * 100:>6.1f} {stats.outcomes['FLED'] / stats.fights * 100:>6.1f} "
+                f"{histogram_mean(stats.turns):>6.1f} {histogram_percentile(stats.turns, 0.9):>4} "
+                f"{histogram_mean(stats.damage_dealt):>7.1f} {histogram_mean(stats.damage_taken):>7.1f} "
+                f"{histogram_percentile(stats.damage_taken, 0.9):>5} "
+                f"{stats.events[DAMAGE] / stats.fights:>5.1f} "
+                f"{(stats.events[ITEM] + stats.events[MANA_RESTORED]) / stats.fights:>5.2f}"
+                )
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless combat simulations")
+    parser.add_argument("--classes", nargs="+", default=list(PLAYER_CLASSES), choices=list(PLAYER_CLASSES))
+    parser.add_argument("--enemies", nargs="+", default=["Goblin", "Orc", "Ogre"], choices=list(ENEMY_CLASSES))
+    parser.add_argument("--levels", nargs="+", type=int, default=[1])
+    parser.add_argument("--fights", type=int, default=1000)
+    parser.add_argument("--policy", default="caster", choices=list(POLICIES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    matchups = [(c, e, l) for c in args.classes for e in args.enemies for l in args.levels]
+    results = run_simulations(matchups, args.fights, args.policy, args.seed, args.processes)
+    print(format_report(results))
+
+if __name__ == "__main__":
+    main()
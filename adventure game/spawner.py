@@ -0,0 +1,68 @@
+# the dungeon used to build one of every enemy type just to pick one at random and throw the rest
+# away. spawn only builds the type that was picked, and EnemyPool hangs on to enemies after a fight
+# so the next fight can reset one to the new level instead of allocating a fresh one.
+import random
+from enemy_classes import Goblin, Orc, Ogre
+from boss_classes import Dragon, Troll, Giant
+
+ENEMY_TYPES = {
+        "Goblin": Goblin,
+        "Orc": Orc,
+        "Ogre": Ogre
+        }
+
+BOSS_TYPES = {
+        "Dragon": Dragon,
+        "Troll": Troll,
+        "Giant": Giant
+        }
+
+SPAWNABLE_TYPES = {**ENEMY_TYPES, **BOSS_TYPES}
+
+ENEMY_NAMES = tuple(ENEMY_TYPES)
+BOSS_NAMES = tuple(BOSS_TYPES)
+
+def spawn(enemy_type, level):
+    if enemy_type not in SPAWNABLE_TYPES:
+        raise ValueError(f"Unknown enemy type: {enemy_type}")
+    return SPAWNABLE_TYPES[enemy_type](level)
+
+def spawn_random_enemy(level, rng=random):
+    return spawn(rng.choice(ENEMY_NAMES), level)
+
+def spawn_random_boss(level, rng=random):
+    return spawn(rng.choice(BOSS_NAMES), level)
+
+class EnemyPool:
+    def __init__(self, max_free_per_type=64):
+        self.max_free_per_type = max_free_per_type
+        self.free = {}
+
+    def acquire(self, enemy_type, level):
+        free = self.free.get(enemy_type)
+        if free:
+            enemy = free.pop()
+            enemy.reset(level)
+            return enemy
+        return spawn(enemy_type, level)
+
+    def acquire_random_enemy(self, level, rng=random):
+        return self.acquire(rng.choice(ENEMY_NAMES), level)
+
+    def acquire_random_boss(self, level, rng=random):
+        return self.acquire(rng.choice(BOSS_NAMES), level)
+
+    def release(self, enemy):
+        if enemy.enemy_class not in SPAWNABLE_TYPES:
+            return
+        free = self.free.setdefault(enemy.enemy_class, [])
+        if len(free) < self.max_free_per_type:
+            free.append(enemy)
+
+    def release_party(self, party):
+        for member in list(party.members):
+            party.remove_member(member)
+            self.release(member)
+
+    def clear(self):
+        self.free.clear()
@@ -0,0 +1,330 @@
+# checks a compiled story graph for the mistakes that only show up when a player walks into them:
+# choices and combat results that lead to nodes nobody wrote, combat nodes without somewhere to go
+# after the fight, nodes that can't be reached from the start, loops the player can't leave, and
+# nodes where every choice is locked behind a visit or a flag.
+# every pass is one walk over the edge arrays, so it runs on every content build, even for huge
+# campaigns. the edge and reverse edge arrays it builds are kept on the StoryIndex (and written into
+# the story bundle) so the game can reuse them instead of walking the choices again.
+# StoryDistances uses the reverse edges to work out how many choices every node is from the nearest
+# fight, from the start and from an ending, for hints and the auto play bot.
+# python story_analysis.py
+# python story_analysis.py --campaign campaign/
+import argparse
+import sys
+from array import array
+from story_graph import NO_NODE
+
+START_NODE = "start"
+# distances are uint32 like the node numbers, so no path is too long to store
+NO_DISTANCE = 0xFFFFFFFF # can't get there from here
+
+# a node's choices in order, then the victory and defeat nodes for combat nodes
+def node_edges(graph, node):
+    first = graph.choice_first[node]
+    edges = list(graph.choice_targets[first:first + graph.choice_count[node]])
+    for target in (graph.victory_targets[node], graph.defeat_targets[node]):
+        if target != NO_NODE:
+            edges.append(target)
+    return edges
+
+# every edge of the story in one array, node n's edges are edge_targets[edge_first[n]:edge_first[n + 1]]
+def build_edges(graph):
+    edge_first = array("I", [0])
+    edge_targets = array("I")
+    for node in range(len(graph.defined)):
+        edge_targets.extend(node_edges(graph, node))
+        edge_first.append(len(edge_targets))
+    return edge_first, edge_targets
+
+# the same thing backwards, reverse_sources[reverse_first[n]:reverse_first[n + 1]] lead into n
+def build_reverse_edges(edge_first, edge_targets):
+    node_count = len(edge_first) - 1
+    counts = array("I", bytes(4 * (node_count + 1)))
+    for target in edge_targets:
+        counts[target + 1] += 1
+    for node in range(node_count):
+        counts[node + 1] += counts[node]
+    reverse_first = array("I", counts)
+    reverse_sources = array("I", bytes(4 * len(edge_targets)))
+    for node in range(node_count):
+        for slot in range(edge_first[node], edge_first[node + 1]):
+            target = edge_targets[slot]
+            reverse_sources[counts[target]] = node
+            counts[target] += 1
+    return reverse_first, reverse_sources
+
+def edge_arrays(graph):
+    # the bundle already has them
+    if hasattr(graph, "edge_first"):
+        return graph.edge_first, graph.edge_targets, graph.reverse_first, graph.reverse_sources
+    edge_first, edge_targets = build_edges(graph)
+    return (edge_first, edge_targets) + build_reverse_edges(edge_first, edge_targets)
+
+def reachable_from(start, edge_first, edge_targets, defined):
+    reached = bytearray(len(defined))
+    if start == NO_NODE:
+        return reached
+    reached[start] = 1
+    queue = [start]
+    for node in queue: # the list grows while it is walked, that is the breadth first queue
+        for slot in range(edge_first[node], edge_first[node + 1]):
+            target = edge_targets[slot]
+            if defined[target] and not reached[target]:
+                reached[target] = 1
+                queue.append(target)
+    return reached
+
+# tarjan's strongly connected components without recursion, deep stories would overflow the stack.
+# returns the component of every defined node (NO_NODE for the undefined ones) and how many there are
+def find_components(edge_first, edge_targets, defined):
+    node_count = len(defined)
+    order = array("i", [NO_NODE]) * node_count
+    low = array("I", bytes(4 * node_count))
+    component = array("i", [NO_NODE]) * node_count
+    on_stack = bytearray(node_count)
+    stack = []
+    counter = 0
+    components = 0
+    for root in range(node_count):
+        if not defined[root] or order[root] != NO_NODE:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, edge_first[root])]
+        while work:
+            node, slot = work[-1]
+            end = edge_first[node + 1]
+            while slot < end:
+                target = edge_targets[slot]
+                slot += 1
+                if not defined[target]:
+                    continue
+                if order[target] == NO_NODE:
+                    work[-1] = (node, slot)
+                    order[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = 1
+                    work.append((target, edge_first[target]))
+                    break
+                if on_stack[target] and order[target] < low[node]:
+                    low[node] = order[target]
+            else:
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == order[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component[member] = components
+                        if member == node:
+                            break
+                    components += 1
+    return component, components
+
+class StoryIndex:
+    def __init__(self, graph, start_node=START_NODE):
+        self.graph = graph
+        self.start = graph.find(start_node)
+        self.edge_first, self.edge_targets, self.reverse_first, self.reverse_sources = edge_arrays(graph)
+        self.reachable = reachable_from(self.start, self.edge_first, self.edge_targets, graph.defined)
+        self.component, self.component_count = find_components(self.edge_first, self.edge_targets, graph.defined)
+
+    def successors(self, node):
+        return self.edge_targets[self.edge_first[node]:self.edge_first[node + 1]]
+
+    def predecessors(self, node):
+        return self.reverse_sources[self.reverse_first[node]:self.reverse_first[node + 1]]
+
+    # (node id, target id) for every edge into a node that doesn't exist
+    def dangling_targets(self):
+        graph = self.graph
+        dangling = []
+        for target in range(len(graph.defined)):
+            if graph.defined[target]:
+                continue
+            for source in self.predecessors(target):
+                dangling.append((graph.node_names[source], graph.node_names[target]))
+        return dangling
+
+    def unreachable_nodes(self):
+        graph = self.graph
+        return [graph.node_names[node] for node in range(len(graph.defined)) if graph.defined[node] and not self.reachable[node]]
+
+    # (node id, missing key) for combat nodes that have nowhere to go after the fight
+    def broken_combat_nodes(self):
+        graph = self.graph
+        broken = []
+        for node in graph.defined_nodes():
+            if graph.node_type(node) != "combat":
+                continue
+            for key, targets in (("victory_node", graph.victory_targets), ("defeat_node", graph.defeat_targets)):
+                if targets[node] == NO_NODE:
+                    broken.append((graph.node_names[node], key))
+        return broken
+
+    # reachable loops where every choice leads back into the loop. the start node isn't a trap, the
+    # town menu is always there, and a loop with a fight in it can end with the player losing
+    def trapped_cycles(self):
+        graph = self.graph
+        closed = bytearray(self.component_count) # 1 is a loop, 2 can be left
+        members = {}
+        for node in range(len(graph.defined)):
+            if not graph.defined[node] or not self.reachable[node]:
+                continue
+            own = self.component[node]
+            members.setdefault(own, []).append(node)
+            if node == self.start or graph.node_type(node) == "combat":
+                closed[own] = 2
+            for target in self.successors(node):
+                if not graph.defined[target] or self.component[target] != own:
+                    closed[own] = 2
+                elif closed[own] == 0:
+                    closed[own] = 1 # an edge inside the component, so it is a loop and not a lone node
+        return [[graph.node_names[node] for node in nodes] for own, nodes in members.items() if closed[own] == 1]
+
+    # narrative and dialog nodes where every choice needs a visited node or a flag, a player who has
+    # neither sees no choices at all
+    def gated_nodes(self):
+        graph = self.graph
+        gated = []
+        for node in graph.defined_nodes():
+            count = graph.choice_count[node]
+            if not count or graph.node_type(node) == "combat":
+                continue
+            first = graph.choice_first[node]
+            if all(graph.choice_visited[slot] != NO_NODE or graph.choice_flags[slot] != NO_NODE
+                   for slot in range(first, first + count)):
+                gated.append(graph.node_names[node])
+        return gated
+
+    def problems(self):
+        problems = [f"{source} leads to missing node {target}" for source, target in self.dangling_targets()]
+        problems += [f"Combat node {node_id} has no {key}" for node_id, key in self.broken_combat_nodes()]
+        problems += [f"{node_id} can't be reached from {START_NODE}" for node_id in self.unreachable_nodes()]
+        problems += [f"No way out of the loop {', '.join(cycle)}" for cycle in self.trapped_cycles()]
+        problems += [f"Every choice of {node_id} can be locked, a player can get stuck there" for node_id in self.gated_nodes()]
+        if self.start == NO_NODE:
+            problems.insert(0, f"The story has no {START_NODE} node")
+        return problems
+
+# breadth first from all the targets at once, backwards along the edges
+def distances_to(targets, reverse_first, reverse_sources, defined):
+    distance = array("I", [NO_DISTANCE]) * len(defined)
+    for node in targets:
+        distance[node] = 0
+    queue = list(targets)
+    for node in queue:
+        step = distance[node] + 1
+        for slot in range(reverse_first[node], reverse_first[node + 1]):
+            source = reverse_sources[slot]
+            if defined[source] and distance[source] == NO_DISTANCE:
+                distance[source] = step
+                queue.append(source)
+    return distance
+
+# (to the nearest fight, to the start, to the nearest ending), an ending is a node with no choices
+def distance_arrays(graph, reverse_first, reverse_sources, start_node=START_NODE):
+    nodes = graph.defined_nodes()
+    start = graph.find(start_node)
+    combat = [node for node in nodes if graph.node_type(node) == "combat"]
+    endings = [node for node in nodes if not node_edges(graph, node)]
+    return (distances_to(combat, reverse_first, reverse_sources, graph.defined),
+            distances_to([start] if start != NO_NODE else [], reverse_first, reverse_sources, graph.defined),
+            distances_to(endings, reverse_first, reverse_sources, graph.defined))
+
+class StoryDistances:
+    # copy_from is the StoryDistances of the graph this one was copied from
+    def __init__(self, graph, start_node=START_NODE, copy_from=None):
+        self.graph = graph
+        self.start_node = start_node
+        if copy_from is not None:
+            self.reverse_first = copy_from.reverse_first
+            self.reverse_sources = copy_from.reverse_sources
+            self.added_sources = {target: list(sources) for target, sources in copy_from.added_sources.items()}
+            self.combat = array("I", copy_from.combat)
+            self.start = array("I", copy_from.start)
+            self.ending = array("I", copy_from.ending)
+        elif hasattr(graph, "combat_distances") and start_node == START_NODE:
+            # worked out when the bundle was built
+            self.reverse_first = graph.reverse_first
+            self.reverse_sources = graph.reverse_sources
+            self.added_sources = {}
+            self.combat, self.start, self.ending = graph.combat_distances, graph.start_distances, graph.ending_distances
+        else:
+            self.rebuild()
+
+    def rebuild(self):
+        edge_first, edge_targets, self.reverse_first, self.reverse_sources = edge_arrays(self.graph)
+        self.added_sources = {} # target -> nodes added since the reverse edges were built that lead to it
+        self.combat, self.start, self.ending = distance_arrays(self.graph, self.reverse_first, self.reverse_sources,
+                                                               self.start_node)
+
+    def predecessors(self, node):
+        sources = self.added_sources.get(node, [])
+        if node + 1 < len(self.reverse_first):
+            return list(self.reverse_sources[self.reverse_first[node]:self.reverse_first[node + 1]]) + sources
+        return sources
+
+    # (edges, whether it is a fight, the start, an ending), what node_added needs from before a node is replaced
+    def node_state(self, node):
+        graph = self.graph
+        edges = node_edges(graph, node)
+        return edges, (graph.node_type(node) == "combat", graph.node_names[node] == self.start_node, not edges)
+
+    # content added to the story while it runs. new nodes and new choices can only make other nodes
+    # closer to something, so that is walked out from the node. a replaced node that lost a choice or
+    # stopped being a fight, the start or an ending can leave nodes further away than before, that
+    # gets the full rebuild. before is node_state from before the node was replaced
+    def node_added(self, node, before=None):
+        graph = self.graph
+        edges, targets = self.node_state(node)
+        new_edges = edges
+        if before is not None:
+            old_edges, old_targets = before
+            if not set(old_edges) <= set(edges) or any(old and not new for old, new in zip(old_targets, targets)):
+                self.rebuild()
+                return
+            new_edges = [target for target in edges if target not in old_edges]
+        for distance in (self.combat, self.start, self.ending):
+            distance.extend([NO_DISTANCE] * (len(graph.defined) - len(distance)))
+        for target in new_edges:
+            self.added_sources.setdefault(target, []).append(node)
+        for distance, is_target in zip((self.combat, self.start, self.ending), targets):
+            nearest = min([distance[target] for target in edges if graph.defined[target]], default=NO_DISTANCE)
+            best = 0 if is_target else nearest if nearest == NO_DISTANCE else nearest + 1
+            if best < distance[node]:
+                distance[node] = best
+                self.lower(distance, node)
+
+    def lower(self, distance, node):
+        queue = [node]
+        for current in queue:
+            step = distance[current] + 1
+            for source in self.predecessors(current):
+                if self.graph.defined[source] and step < distance[source]:
+                    distance[source] = step
+                    queue.append(source)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a story for dead ends and unreachable nodes")
+    parser.add_argument("--campaign", default=None, help="json lines story file or directory, the built in story otherwise")
+    args = parser.parse_args()
+
+    if args.campaign:
+        from story_loader import load_campaign
+        graph = load_campaign(args.campaign).graph
+    else:
+        from tree import get_compiled_story
+        graph = get_compiled_story()
+    problems = StoryIndex(graph).problems()
+    for problem in problems:
+        print(problem)
+    print(f"{len(graph.defined_nodes())} nodes, {len(problems)} problems")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
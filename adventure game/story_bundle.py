@@ -0,0 +1,382 @@
+# the compiled story graph is written to a binary bundle next to story_content.py the first time the
+# game starts, and every start after that maps the bundle instead of building the content literal
+# and compiling it again. the bundle remembers a hash of story_content.py, editing the story
+# rebuilds it. the arrays are used straight out of the mapped file, node text and choices are only
+# decoded for the nodes somebody actually visits, and node ids (and each node's choice ids) are found
+# by binary search over a sorted index instead of a dict that would have to be built at startup. the edge and reverse edge
+# arrays from story_analysis are built with the bundle too, so they are there for free at runtime,
+# and so are the distances to the nearest fight, the start and an ending.
+import hashlib
+import importlib.util
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from atomic_file import write_atomically
+from story_graph import StoryGraph, compile_story, copy_payloads, build_choice_index, NO_NODE
+from story_analysis import build_edges, build_reverse_edges, distance_arrays
+
+MAGIC = b"TAGSTORY"
+BUNDLE_VERSION = 6
+HEADER = struct.Struct("<8sH6x16sQQIIII")
+SECTION = struct.Struct("<QQ")
+SOURCE_STAT = struct.Struct("<QQ") # the mtime and size in the header, rewritten on their own
+SOURCE_STAT_OFFSET = 32
+BUNDLE_FILENAME = "story.bundle"
+
+# name, array typecode
+SECTIONS = (
+        ("string_offsets", "I"),
+        ("string_blob", "B"),
+        ("sorted_strings", "I"),
+        ("node_names", "I"),
+        ("defined", "B"),
+        ("node_types", "I"),
+        ("choice_first", "I"),
+        ("choice_count", "I"),
+        ("victory_targets", "i"),
+        ("defeat_targets", "i"),
+        ("sorted_nodes", "I"),
+        ("choice_keys", "I"),
+        ("choice_order", "I"),
+        ("choice_targets", "I"),
+        ("choice_visited", "i"),
+        ("choice_flags", "i"),
+        ("choice_sets", "i"),
+        ("payload_offsets", "I"),
+        ("payload_blob", "B"),
+        ("edge_first", "I"),
+        ("edge_targets", "I"),
+        ("reverse_first", "I"),
+        ("reverse_sources", "I"),
+        ("combat_distances", "I"),
+        ("start_distances", "I"),
+        ("ending_distances", "I")
+        )
+
+def source_path():
+    return importlib.util.find_spec("story_content").origin
+
+def bundle_path():
+    return os.path.join(os.path.dirname(source_path()), BUNDLE_FILENAME)
+
+def hash_file(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+def pack_strings(strings):
+    offsets = array("I", [0])
+    blob = bytearray()
+    for text in strings:
+        blob += text.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, blob
+
+# each node's choice positions sorted by choice key, in the node's own slots, so a choice id is found by
+# binary search. slots left over from replaced nodes stay 0
+def sorted_choices(graph):
+    order = array("I", bytes(4 * len(graph.choice_keys)))
+    for node in range(len(graph.node_names)):
+        first = graph.choice_first[node]
+        positions = range(graph.choice_count[node])
+        order[first:first + len(positions)] = array("I", sorted(positions, key=lambda position: (
+                graph.choice_keys[first + position], position)))
+    return order
+
+def build_bundle(graph, source_hash, source_stat):
+    string_offsets, string_blob = pack_strings(graph.strings)
+    sorted_strings = array("I", sorted(range(len(graph.strings)), key=graph.strings.__getitem__))
+    node_names = array("I", [graph.string_ids[name] for name in graph.node_names])
+    sorted_nodes = array("I", sorted(range(len(graph.node_names)), key=graph.node_names.__getitem__))
+    choice_order = sorted_choices(graph)
+    payloads = [json.dumps({"content": graph.contents[node], "choices": graph.choice_lists[node]},
+                           separators=(",", ":")) for node in range(len(graph.node_names))]
+    payload_offsets, payload_blob = pack_strings(payloads)
+    edge_first, edge_targets = build_edges(graph)
+    reverse_first, reverse_sources = build_reverse_edges(edge_first, edge_targets)
+    combat_distances, start_distances, ending_distances = distance_arrays(graph, reverse_first, reverse_sources)
+    values = {
+            "string_offsets": string_offsets,
+            "string_blob": string_blob,
+            "sorted_strings": sorted_strings,
+            "node_names": node_names,
+            "defined": graph.defined,
+            "node_types": graph.node_types,
+            "choice_first": graph.choice_first,
+            "choice_count": graph.choice_count,
+            "victory_targets": graph.victory_targets,
+            "defeat_targets": graph.defeat_targets,
+            "sorted_nodes": sorted_nodes,
+            "choice_keys": graph.choice_keys,
+            "choice_order": choice_order,
+            "choice_targets": graph.choice_targets,
+            "choice_visited": graph.choice_visited,
+            "choice_flags": graph.choice_flags,
+            "choice_sets": graph.choice_sets,
+            "payload_offsets": payload_offsets,
+            "payload_blob": payload_blob,
+            "edge_first": edge_first,
+            "edge_targets": edge_targets,
+            "reverse_first": reverse_first,
+            "reverse_sources": reverse_sources,
+            "combat_distances": combat_distances,
+            "start_distances": start_distances,
+            "ending_distances": ending_distances
+            }
+    table_size = HEADER.size + SECTION.size * len(SECTIONS)
+    body = bytearray()
+    table = []
+    for name, typecode in SECTIONS:
+        data = bytes(values[name])
+        body += b"\0" * (-(table_size + len(body)) % 8) # keeps every section aligned for memoryview casts
+        table.append(SECTION.pack(table_size + len(body), len(data)))
+        body += data
+    header = HEADER.pack(MAGIC, BUNDLE_VERSION, source_hash, source_stat.st_mtime_ns, source_stat.st_size,
+                         len(graph.node_names), len(graph.strings), len(graph.choice_keys), len(SECTIONS))
+    return header + b"".join(table) + bytes(body)
+
+# story_content.py was touched but not changed (a checkout, a copy), so the hash still matched. the
+# bundle takes the new mtime and size so the next start trusts them instead of hashing again
+def update_source_stat(path, source_stat):
+    try:
+        with open(path, "r+b") as f:
+            f.seek(SOURCE_STAT_OFFSET)
+            f.write(SOURCE_STAT.pack(source_stat.st_mtime_ns, source_stat.st_size))
+    except OSError:
+        pass # read only install, it is only hashed again
+
+class MappedStrings:
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+class MappedNames:
+    def __init__(self, strings, name_ids):
+        self.strings = strings
+        self.name_ids = name_ids
+
+    def __len__(self):
+        return len(self.name_ids)
+
+    def __getitem__(self, node):
+        return self.strings[self.name_ids[node]]
+
+# node content and choices, decoded from json the first time each node is looked at
+class MappedPayloads:
+    def __init__(self, offsets, blob, field):
+        self.offsets = offsets
+        self.blob = blob
+        self.field = field
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, node):
+        payload = self.cache.get(node)
+        if payload is None:
+            payload = json.loads(str(self.blob[self.offsets[node]:self.offsets[node + 1]], "utf-8"))
+            self.cache[node] = payload
+        return payload[self.field]
+
+class SortedView:
+    def __init__(self, order, names):
+        self.order = order
+        self.names = names
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, position):
+        return self.names[self.order[position]]
+
+class NodeChoiceKeys:
+    def __init__(self, graph, node):
+        self.keys = graph.choice_keys
+        self.order = graph.choice_order
+        self.first = graph.choice_first[node]
+        self.count = graph.choice_count[node]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.keys[self.first + self.order[self.first + index]]
+
+# a read only StoryGraph over a mapped bundle. copy() gives back a normal StoryGraph to change
+class MappedStoryGraph:
+    def __init__(self, data, table):
+        self.data = data
+        view = memoryview(data)
+        for name, typecode in SECTIONS:
+            offset, size = table[name]
+            setattr(self, name, view[offset:offset + size].cast(typecode))
+        self.strings = MappedStrings(self.string_offsets, self.string_blob)
+        self.node_names = MappedNames(self.strings, self.node_names)
+        payloads = {}
+        self.contents = MappedPayloads(self.payload_offsets, self.payload_blob, "content")
+        self.choice_lists = MappedPayloads(self.payload_offsets, self.payload_blob, "choices")
+        self.choice_lists.cache = self.contents.cache = payloads
+        self.sorted_string_view = SortedView(self.sorted_strings, self.strings)
+        self.sorted_node_view = SortedView(self.sorted_nodes, self.node_names)
+
+    def string_id(self, text):
+        position = bisect_left(self.sorted_string_view, text)
+        if position < len(self.sorted_strings) and self.sorted_string_view[position] == text:
+            return self.sorted_strings[position]
+        return None
+
+    def find(self, node_id):
+        position = bisect_left(self.sorted_node_view, node_id)
+        if position < len(self.sorted_nodes) and self.sorted_node_view[position] == node_id:
+            node = self.sorted_nodes[position]
+            if self.defined[node]:
+                return node
+        return NO_NODE
+
+    def node_type(self, node):
+        return self.strings[self.node_types[node]]
+
+    def choice_target(self, node, position):
+        if not 0 <= position < self.choice_count[node]:
+            return NO_NODE
+        return self.choice_targets[self.choice_first[node] + position]
+
+    def choice_position(self, node, choice_id):
+        key = self.string_id(choice_id)
+        if key is None:
+            return NO_NODE
+        keys = NodeChoiceKeys(self, node)
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return self.choice_order[keys.first + index]
+        return NO_NODE
+
+    def resolve_choice(self, node, choice_id):
+        return self.choice_target(node, self.choice_position(node, choice_id))
+
+    def defined_nodes(self):
+        return [node for node in range(len(self.defined)) if self.defined[node]]
+
+    def copy(self):
+        graph = StoryGraph()
+        graph.strings = [self.strings[i] for i in range(len(self.strings))]
+        graph.string_ids = {text: i for i, text in enumerate(graph.strings)}
+        graph.node_names = [graph.strings[i] for i in self.node_names.name_ids]
+        graph.node_numbers = {name: node for node, name in enumerate(graph.node_names)}
+        graph.defined = array("B", self.defined)
+        graph.node_types = array("I", self.node_types)
+        graph.contents = copy_payloads(self.contents)
+        graph.choice_lists = copy_payloads(self.choice_lists)
+        graph.choice_first = array("I", self.choice_first)
+        graph.choice_count = array("I", self.choice_count)
+        graph.victory_targets = array("i", self.victory_targets)
+        graph.defeat_targets = array("i", self.defeat_targets)
+        graph.choice_keys = array("I", self.choice_keys)
+        graph.choice_targets = array("I", self.choice_targets)
+        graph.choice_visited = array("i", self.choice_visited)
+        graph.choice_flags = array("i", self.choice_flags)
+        graph.choice_sets = array("i", self.choice_sets)
+        graph.unused_choices = len(self.choice_keys) - sum(self.choice_count)
+        graph.choice_index = build_choice_index(graph.choice_first, graph.choice_count, graph.choice_keys)
+        return graph
+
+# how many items the sections indexed by node, string or choice have to hold, the rest (blobs, edge
+# targets) only have to fit in the file
+SECTION_LENGTHS = {
+        "string_offsets": ("strings", 1),
+        "sorted_strings": ("strings", 0),
+        "node_names": ("nodes", 0),
+        "defined": ("nodes", 0),
+        "node_types": ("nodes", 0),
+        "choice_first": ("nodes", 0),
+        "choice_count": ("nodes", 0),
+        "victory_targets": ("nodes", 0),
+        "defeat_targets": ("nodes", 0),
+        "sorted_nodes": ("nodes", 0),
+        "choice_keys": ("choices", 0),
+        "choice_order": ("choices", 0),
+        "choice_targets": ("choices", 0),
+        "choice_visited": ("choices", 0),
+        "choice_flags": ("choices", 0),
+        "choice_sets": ("choices", 0),
+        "payload_offsets": ("nodes", 1),
+        "edge_first": ("nodes", 1),
+        "reverse_first": ("nodes", 1),
+        "combat_distances": ("nodes", 0),
+        "start_distances": ("nodes", 0),
+        "ending_distances": ("nodes", 0)
+        }
+
+# a truncated or damaged bundle is rebuilt, so anything that doesn't add up is None rather than an error
+def read_header(data):
+    if len(data) < HEADER.size:
+        return None
+    magic, version, source_hash, mtime_ns, size, nodes, strings, choices, sections = HEADER.unpack_from(data)
+    if magic != MAGIC or version != BUNDLE_VERSION or sections != len(SECTIONS):
+        return None
+    table_size = HEADER.size + SECTION.size * len(SECTIONS)
+    if len(data) < table_size:
+        return None
+    counts = {"nodes": nodes, "strings": strings, "choices": choices}
+    table = {}
+    for i, (name, typecode) in enumerate(SECTIONS):
+        offset, section_size = SECTION.unpack_from(data, HEADER.size + i * SECTION.size)
+        itemsize = array(typecode).itemsize
+        if offset < table_size or offset + section_size > len(data) or offset % 8 or section_size % itemsize:
+            return None
+        if name in SECTION_LENGTHS:
+            count, extra = SECTION_LENGTHS[name]
+            if section_size // itemsize != counts[count] + extra:
+                return None
+        table[name] = offset, section_size
+    return source_hash, mtime_ns, size, table
+
+def map_bundle(path, source, source_stat):
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    graph = None
+    try:
+        header = read_header(data)
+        if header is not None:
+            source_hash, mtime_ns, size, table = header
+            # an unchanged mtime and size is taken on trust, anything else has to match the hash
+            trusted = (mtime_ns, size) == (source_stat.st_mtime_ns, source_stat.st_size)
+            if not trusted and source_hash == hash_file(source):
+                update_source_stat(path, source_stat)
+                trusted = True
+            if trusted:
+                graph = MappedStoryGraph(data, table)
+    finally:
+        if graph is None:
+            data.close()
+    return graph
+
+def load_story_graph(path=None):
+    source = source_path()
+    source_stat = os.stat(source)
+    path = path if path is not None else bundle_path()
+    graph = map_bundle(path, source, source_stat)
+    if graph is not None:
+        return graph
+    from story_content import get_story_content
+    graph = compile_story(get_story_content())
+    try:
+        write_atomically(path, build_bundle(graph, hash_file(source), source_stat))
+    except (OSError, TypeError, ValueError):
+        pass # read only install or content json can't hold, the game still runs from the compiled graph
+    return graph
@@ -0,0 +1,216 @@
+# the story used to be a dict of StoryNode objects rebuilt from story_content on every new Game, and
+# every choice hashed string ids and scanned the choice list twice. this compiles the content into
+# flat arrays instead: every node id gets an int, every string is stored once in a table, and each
+# node's choices are a slice of the shared choice arrays, so following a choice is one index.
+# a choice can point at a node that isn't defined yet, the node gets its number right away and is
+# marked undefined until add_node fills it in, which lets content be appended in any order.
+# choices can depend on a node having been visited or a flag being set, and can set a flag. those are
+# compiled into arrays next to the choice targets too, so the menus check them without the dicts.
+# replacing a node writes its choices over the old ones when they fit, otherwise the old slots are
+# left behind and the choice arrays are compacted once more than half of them are left over.
+# choice ids are found through a dict of (node, choice key) -> position instead of scanning the node's
+# slots, positions are within the node so compacting doesn't touch it.
+from array import array
+
+NO_NODE = -1
+COMPACT_CHOICES_AFTER = 1024 # unused choice slots before compacting is worth it
+
+# the contents or choice lists of a copied graph whose original reads them on demand (a campaign's
+# chapters, a mapped bundle). nodes changed or added since the copy are kept here and everything else
+# is still asked of the original, so a copy doesn't load the whole story
+class PayloadOverlay:
+    def __init__(self, base):
+        self.base = base
+        self.base_length = len(base)
+        self.length = self.base_length
+        self.changed = {}
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, node):
+        if node in self.changed:
+            return self.changed[node]
+        if not 0 <= node < self.base_length:
+            raise IndexError(node)
+        return self.base[node]
+
+    def __setitem__(self, node, payload):
+        if not 0 <= node < self.length:
+            raise IndexError(node)
+        self.changed[node] = payload
+
+    def append(self, payload):
+        self.changed[self.length] = payload
+        self.length += 1
+
+def copy_payloads(payloads):
+    if isinstance(payloads, list):
+        return list(payloads)
+    return PayloadOverlay(payloads)
+
+class StoryGraph:
+    def __init__(self):
+        self.strings = []
+        self.string_ids = {}
+        self.node_names = [] # node number -> node id
+        self.node_numbers = {} # node id -> node number
+        self.defined = array("B")
+        self.node_types = array("I") # string ids
+        self.contents = []
+        self.choice_lists = [] # the choice dicts as written, for the menus
+        self.choice_first = array("I")
+        self.choice_count = array("I")
+        self.victory_targets = array("i") # combat nodes only, NO_NODE everywhere else
+        self.defeat_targets = array("i")
+        self.choice_keys = array("I") # string ids of the choice ids
+        self.choice_targets = array("I")
+        self.choice_visited = array("i") # requires_visited node, NO_NODE for none
+        self.choice_flags = array("i") # string id of requires_flag, NO_NODE for none
+        self.choice_sets = array("i") # string id of sets_flag, NO_NODE for none
+        self.unused_choices = 0 # slots left behind by replaced nodes
+        self.choice_index = {} # (node, choice key) -> position, the first one if a node repeats an id
+
+    def choice_arrays(self):
+        return (self.choice_keys, self.choice_targets, self.choice_visited, self.choice_flags, self.choice_sets)
+
+    def intern(self, text):
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.string_ids[text] = string_id
+            self.strings.append(text)
+        return string_id
+
+    def number(self, node_id):
+        node = self.node_numbers.get(node_id)
+        if node is None:
+            node = len(self.node_names)
+            self.node_numbers[node_id] = node
+            self.node_names.append(self.strings[self.intern(node_id)])
+            self.defined.append(0)
+            self.node_types.append(self.intern(""))
+            self.contents.append(None)
+            self.choice_lists.append([])
+            self.choice_first.append(0)
+            self.choice_count.append(0)
+            self.victory_targets.append(NO_NODE)
+            self.defeat_targets.append(NO_NODE)
+        return node
+
+    # adding a node that already exists replaces it, like assigning to the old nodes dict did
+    def add_node(self, node_id, node_type, content, choices):
+        node = self.number(node_id)
+        old_count = self.choice_count[node] # 0 unless the node is being replaced
+        old_first = self.choice_first[node]
+        for slot in range(old_first, old_first + old_count):
+            self.choice_index.pop((node, self.choice_keys[slot]), None)
+        if len(choices) <= old_count:
+            first = self.choice_first[node] # the new choices fit where the old ones were
+            self.unused_choices += old_count - len(choices)
+        else:
+            first = len(self.choice_keys)
+            self.unused_choices += old_count
+            for choice_array in self.choice_arrays():
+                choice_array.extend([0] * len(choices))
+        self.defined[node] = 1
+        self.node_types[node] = self.intern(node_type)
+        self.contents[node] = content
+        self.choice_lists[node] = choices
+        self.choice_first[node] = first
+        self.choice_count[node] = len(choices)
+        for slot, choice in enumerate(choices, first):
+            self.choice_keys[slot] = self.intern(choice["id"])
+            self.choice_index.setdefault((node, self.choice_keys[slot]), slot - first)
+            self.choice_targets[slot] = self.number(choice["next_node"])
+            self.choice_visited[slot] = self.number(choice["requires_visited"]) if "requires_visited" in choice else NO_NODE
+            self.choice_flags[slot] = self.intern(choice["requires_flag"]) if "requires_flag" in choice else NO_NODE
+            self.choice_sets[slot] = self.intern(choice["sets_flag"]) if "sets_flag" in choice else NO_NODE
+        if self.unused_choices > COMPACT_CHOICES_AFTER and self.unused_choices * 2 > len(self.choice_keys):
+            self.compact_choices()
+        # set every time, a node replaced by one of another type mustn't keep its old targets
+        if node_type == "combat":
+            self.victory_targets[node] = self.number(content["victory_node"]) if "victory_node" in content else NO_NODE
+            self.defeat_targets[node] = self.number(content["defeat_node"]) if "defeat_node" in content else NO_NODE
+        else:
+            self.victory_targets[node] = NO_NODE
+            self.defeat_targets[node] = NO_NODE
+        return node
+
+    # every node's choices next to each other again, in node order, without the left over slots
+    def compact_choices(self):
+        old_first = array("I", self.choice_first)
+        for choice_array in self.choice_arrays():
+            compacted = array(choice_array.typecode)
+            for node in range(len(self.node_names)):
+                first = old_first[node]
+                compacted.extend(choice_array[first:first + self.choice_count[node]])
+            choice_array[:] = compacted
+        first = 0
+        for node in range(len(self.node_names)):
+            self.choice_first[node] = first
+            first += self.choice_count[node]
+        self.unused_choices = 0
+
+    def find(self, node_id):
+        node = self.node_numbers.get(node_id)
+        if node is None or not self.defined[node]:
+            return NO_NODE
+        return node
+
+    def node_type(self, node):
+        return self.strings[self.node_types[node]]
+
+    def choice_target(self, node, position):
+        if not 0 <= position < self.choice_count[node]:
+            return NO_NODE
+        return self.choice_targets[self.choice_first[node] + position]
+
+    def choice_position(self, node, choice_id):
+        key = self.string_ids.get(choice_id)
+        if key is None:
+            return NO_NODE
+        return self.choice_index.get((node, key), NO_NODE)
+
+    def resolve_choice(self, node, choice_id):
+        return self.choice_target(node, self.choice_position(node, choice_id))
+
+    def defined_nodes(self):
+        return [node for node in range(len(self.node_names)) if self.defined[node]]
+
+    def copy(self):
+        graph = StoryGraph()
+        graph.strings = list(self.strings)
+        graph.string_ids = dict(self.string_ids)
+        graph.node_names = list(self.node_names)
+        graph.node_numbers = dict(self.node_numbers)
+        graph.defined = array("B", self.defined)
+        graph.node_types = array("I", self.node_types)
+        graph.contents = copy_payloads(self.contents)
+        graph.choice_lists = copy_payloads(self.choice_lists)
+        graph.choice_first = array("I", self.choice_first)
+        graph.choice_count = array("I", self.choice_count)
+        graph.victory_targets = array("i", self.victory_targets)
+        graph.defeat_targets = array("i", self.defeat_targets)
+        graph.choice_keys = array("I", self.choice_keys)
+        graph.choice_targets = array("I", self.choice_targets)
+        graph.choice_visited = array("i", self.choice_visited)
+        graph.choice_flags = array("i", self.choice_flags)
+        graph.choice_sets = array("i", self.choice_sets)
+        graph.unused_choices = self.unused_choices
+        graph.choice_index = dict(self.choice_index)
+        return graph
+
+def build_choice_index(choice_first, choice_count, choice_keys):
+    index = {}
+    for node in range(len(choice_first)):
+        first = choice_first[node]
+        for slot in range(first, first + choice_count[node]):
+            index.setdefault((node, choice_keys[slot]), slot - first)
+    return index
+
+def compile_story(story_data):
+    graph = StoryGraph()
+    for node_id, node_data in story_data.items():
+        graph.add_node(node_id, node_data["type"], node_data["content"], node_data.get("choices", []))
+    return graph
@@ -0,0 +1,182 @@
+# loads a campaign written outside of python, so big stories don't have to live in one giant literal
+# in story_content.py. a campaign is a json lines file, one node per line:
+#   {"id": "start", "type": "narrative", "content": {...}, "choices": [{"id": "1", "text": "...", "next_node": "..."}]}
+# or a directory of them, every .jsonl file in it is a chapter. the files are read one line at a time
+# and every node is checked as it comes in, only the graph (ids, types and where the choices go) is
+# kept after that. node text and choices are read back a chapter at a time when the story gets
+# there, and only the last few chapters stay in memory.
+# python story_loader.py check campaign/
+# python story_loader.py export campaign/ --chapter-size 500
+import argparse
+import json
+import os
+from array import array
+from collections import OrderedDict
+from save_codecs import json_codec
+from story_graph import StoryGraph, NO_NODE
+
+NODE_TYPES = ("narrative", "dialog", "combat")
+NO_CHAPTER = 0xFFFFFFFF
+RESIDENT_CHAPTERS = 4
+
+def chapter_paths(path):
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl"))
+        if not paths:
+            raise ValueError(f"No .jsonl chapters in {path}")
+        return paths
+    return [path]
+
+# (line number, node record) for every node in a chapter file, blank lines are skipped
+def read_records(path):
+    codec = json_codec()
+    with open(path, "rb") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = codec.decode(line)
+            except ValueError:
+                raise ValueError(f"{path}:{line_number}: not valid json") from None
+            yield line_number, record
+
+def check_record(record, where):
+    if not isinstance(record, dict):
+        raise ValueError(f"{where}: a node has to be a json object")
+    node_id = record.get("id")
+    if not isinstance(node_id, str) or not node_id:
+        raise ValueError(f"{where}: node is missing its id")
+    if record.get("type") not in NODE_TYPES:
+        raise ValueError(f"{where}: node {node_id} has type {record.get('type')!r}, expected one of {NODE_TYPES}")
+    content = record.get("content")
+    if not isinstance(content, dict):
+        raise ValueError(f"{where}: node {node_id} content has to be an object")
+    if record["type"] == "combat":
+        if not isinstance(content.get("enemy"), str):
+            raise ValueError(f"{where}: combat node {node_id} doesn't name an enemy")
+        for key in ("victory_node", "defeat_node"):
+            if key in content and not isinstance(content[key], str):
+                raise ValueError(f"{where}: combat node {node_id} {key} has to be a node id")
+    choices = record.get("choices", [])
+    if not isinstance(choices, list):
+        raise ValueError(f"{where}: node {node_id} choices has to be a list")
+    choice_ids = set()
+    for choice in choices:
+        if not isinstance(choice, dict) or not isinstance(choice.get("id"), str):
+            raise ValueError(f"{where}: node {node_id} has a choice without an id")
+        if not isinstance(choice.get("next_node"), str):
+            raise ValueError(f"{where}: node {node_id} choice {choice['id']} has no next_node")
+        for key in ("requires_visited", "requires_flag", "sets_flag"):
+            if key in choice and not isinstance(choice[key], str):
+                raise ValueError(f"{where}: node {node_id} choice {choice['id']} {key} has to be a string")
+        if choice["id"] in choice_ids:
+            raise ValueError(f"{where}: node {node_id} has two choices with id {choice['id']}")
+        choice_ids.add(choice["id"])
+    return node_id, record["type"], content, choices
+
+# stands in for graph.contents and graph.choice_lists, asks the campaign for the node's chapter
+class ChapterPayloads:
+    def __init__(self, campaign, field):
+        self.campaign = campaign
+        self.field = field
+
+    def __len__(self):
+        return len(self.campaign.node_chapters)
+
+    def __getitem__(self, node):
+        return self.campaign.payload(node)[self.field]
+
+class Campaign:
+    def __init__(self, path, resident_chapters=RESIDENT_CHAPTERS):
+        self.path = path
+        self.chapters = chapter_paths(path)
+        self.resident_chapters = resident_chapters
+        self.graph = StoryGraph()
+        self.node_chapters = array("I") # node number -> chapter number
+        self.resident = OrderedDict() # chapter number -> {node: (content, choices)}, oldest first
+        for chapter, chapter_path in enumerate(self.chapters):
+            self.index_chapter(chapter, chapter_path)
+        graph = self.graph
+        self.dangling = [graph.node_names[node] for node in range(len(graph.node_names)) if not graph.defined[node]]
+        graph.contents = ChapterPayloads(self, 0)
+        graph.choice_lists = ChapterPayloads(self, 1)
+
+    def index_chapter(self, chapter, chapter_path):
+        graph = self.graph
+        for line_number, record in read_records(chapter_path):
+            where = f"{chapter_path}:{line_number}"
+            node_id, node_type, content, choices = check_record(record, where)
+            if graph.find(node_id) != NO_NODE:
+                raise ValueError(f"{where}: node {node_id} is defined twice")
+            node = graph.add_node(node_id, node_type, content, choices)
+            # the text is dropped right away, it is read back from the chapter when it is needed
+            graph.contents[node] = None
+            graph.choice_lists[node] = []
+            while len(self.node_chapters) < len(graph.node_names):
+                self.node_chapters.append(NO_CHAPTER)
+            self.node_chapters[node] = chapter
+
+    def load_chapter(self, chapter):
+        payloads = self.resident.get(chapter)
+        if payloads is not None:
+            self.resident.move_to_end(chapter)
+            return payloads
+        payloads = {}
+        chapter_path = self.chapters[chapter]
+        for line_number, record in read_records(chapter_path):
+            node_id, node_type, content, choices = check_record(record, f"{chapter_path}:{line_number}")
+            payloads[self.graph.node_numbers[node_id]] = (content, choices)
+        self.resident[chapter] = payloads
+        while len(self.resident) > self.resident_chapters:
+            self.resident.popitem(last=False)
+        return payloads
+
+    def payload(self, node):
+        chapter = self.node_chapters[node]
+        if chapter == NO_CHAPTER:
+            return None, [] # only named by a choice, same as an undefined node in a StoryGraph
+        payload = self.load_chapter(chapter).get(node)
+        if payload is None:
+            raise ValueError(f"{self.chapters[chapter]} changed while the campaign was loaded")
+        return payload
+
+def load_campaign(path, resident_chapters=RESIDENT_CHAPTERS, strict=False):
+    campaign = Campaign(path, resident_chapters)
+    if strict and campaign.dangling:
+        raise ValueError(f"{path}: choices lead to nodes that don't exist: {', '.join(campaign.dangling[:10])}")
+    return campaign
+
+def export_story(story_data, directory, chapter_size=None):
+    os.makedirs(directory, exist_ok=True)
+    node_ids = list(story_data)
+    chapter_size = chapter_size or max(1, len(node_ids))
+    for chapter, first in enumerate(range(0, len(node_ids), chapter_size)):
+        with open(os.path.join(directory, f"chapter_{chapter:04d}.jsonl"), "w", encoding="utf-8") as f:
+            for node_id in node_ids[first:first + chapter_size]:
+                record = {"id": node_id}
+                record.update(story_data[node_id])
+                f.write(json.dumps(record) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or export story campaigns")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check = commands.add_parser("check", help="validate a campaign file or directory")
+    check.add_argument("path")
+    check.add_argument("--strict", action="store_true", help="fail on choices that lead nowhere")
+    export = commands.add_parser("export", help="write story_content.py out as a campaign directory")
+    export.add_argument("directory")
+    export.add_argument("--chapter-size", type=int, default=None, help="nodes per chapter file")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from story_content import get_story_content
+        export_story(get_story_content(), args.directory, args.chapter_size)
+        return
+    campaign = load_campaign(args.path, strict=args.strict)
+    graph = campaign.graph
+    print(f"{len(campaign.chapters)} chapters, {len(graph.defined_nodes())} nodes, {len(graph.choice_keys)} choices")
+    for node_id in campaign.dangling:
+        print(f"Missing node: {node_id}")
+
+if __name__ == "__main__":
+    main()
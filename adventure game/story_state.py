@@ -0,0 +1,108 @@
+# what a session has done in the story besides where it is now: which nodes it has been to, the
+# last few choices it made and the flags choices have set. visited nodes are one bit each by compiled
+# node number and flags are bits too, so checking a choice's requirements is a couple of shifts.
+# the recent choices are a fixed size ring, a long session doesn't make it any bigger.
+# in a save the visited bits are stored as a dict of the 64 bit words that have anything in them and
+# the history as a dict of ring slots, so the save journal's delta for an autosave is just the word
+# and the slot that changed. node numbers belong to one compiled story, the save also keeps a
+# fingerprint of the node ids they were numbered against and drops the visited bits and history if
+# the story has since been changed in a way that renumbers them.
+import hashlib
+from array import array
+
+HISTORY_SIZE = 32 # choices remembered
+POSITION_BITS = 16 # a history entry is node << POSITION_BITS | choice position
+
+# hash of the first node_count node ids in order. content appended to the story keeps the old
+# numbers, so a save made before stays valid
+def story_fingerprint(graph, node_count):
+    digest = hashlib.blake2b(digest_size=8)
+    for node in range(node_count):
+        digest.update(graph.node_names[node].encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+def set_bit(words, bit):
+    word = bit >> 6
+    if word >= len(words):
+        words.extend([0] * (word + 1 - len(words)))
+    words[word] |= 1 << (bit & 63)
+
+def has_bit(words, bit):
+    word = bit >> 6
+    return word < len(words) and (words[word] >> (bit & 63)) & 1 == 1
+
+class StoryState:
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.visited = array("Q")
+        self.flags = array("Q")
+        self.flag_bits = {} # flag name -> bit, in the order they were first set
+        self.history = array("Q", [0]) * history_size
+        self.history_next = 0
+        self.history_count = 0
+        self.fingerprints = {} # node count -> story_fingerprint, the names don't change under a tree
+
+    def visit(self, node):
+        set_bit(self.visited, node)
+
+    def has_visited(self, node):
+        return has_bit(self.visited, node)
+
+    def set_flag(self, name):
+        bit = self.flag_bits.setdefault(name, len(self.flag_bits))
+        set_bit(self.flags, bit)
+
+    def has_flag(self, name):
+        bit = self.flag_bits.get(name)
+        return bit is not None and has_bit(self.flags, bit)
+
+    def record_choice(self, node, position):
+        self.history[self.history_next] = node << POSITION_BITS | position
+        self.history_next = (self.history_next + 1) % len(self.history)
+        self.history_count = min(self.history_count + 1, len(self.history))
+
+    # ring slots in use, oldest first
+    def filled_slots(self):
+        size = len(self.history)
+        first = (self.history_next - self.history_count) % size
+        return [(first + i) % size for i in range(self.history_count)]
+
+    # [(node, choice position)], oldest first
+    def recent_choices(self):
+        entries = [self.history[slot] for slot in self.filled_slots()]
+        return [(entry >> POSITION_BITS, entry & ((1 << POSITION_BITS) - 1)) for entry in entries]
+
+    def fingerprint(self, graph, node_count):
+        if node_count not in self.fingerprints:
+            self.fingerprints[node_count] = story_fingerprint(graph, node_count)
+        return self.fingerprints[node_count]
+
+    def snapshot(self, graph):
+        node_count = len(graph.defined)
+        return {
+                "nodes": node_count,
+                "fingerprint": self.fingerprint(graph, node_count),
+                "visited": {str(word): bits for word, bits in enumerate(self.visited) if bits},
+                "history": {str(slot): self.history[slot] for slot in self.filled_slots()},
+                "history_next": self.history_next,
+                "flags": [name for name in self.flag_bits if self.has_flag(name)]
+                }
+
+def restore_story_state(data, graph, history_size=HISTORY_SIZE):
+    state = StoryState(history_size)
+    for name in data["flags"]:
+        state.set_flag(name)
+    node_count = data["nodes"]
+    if node_count > len(graph.defined) or state.fingerprint(graph, node_count) != data["fingerprint"]:
+        return state # the story was rewritten since, the node numbers don't mean the same nodes
+    for word, bits in data["visited"].items():
+        word = int(word)
+        if word >= len(state.visited):
+            state.visited.extend([0] * (word + 1 - len(state.visited)))
+        state.visited[word] = bits
+    # oldest first, counting round the ring from where the next choice would have gone
+    ring_size = max(len(data["history"]), 1)
+    slots = sorted(data["history"], key=lambda slot: (int(slot) - data["history_next"]) % ring_size)
+    for slot in slots[-history_size:]:
+        entry = data["history"][slot]
+        state.record_choice(entry >> POSITION_BITS, entry & ((1 << POSITION_BITS) - 1))
+    return state
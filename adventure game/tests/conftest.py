@@ -0,0 +1,5 @@
+# the game's modules import each other by their bare names, the same as running them from the game directory
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,54 @@
+# a replaced file is either all old or all new, a failed write leaves no temp file behind, and the save
+# menu only says a save worked once it has been written
+import os
+import pytest
+from atomic_file import write_atomically
+from console import ScriptedConsole
+from save_states import GameSave
+from save_writer import SaveWriter
+from player_classes import Mage
+
+def test_replaces_the_file(tmp_path):
+    path = str(tmp_path / "file.bin")
+    write_atomically(path, b"old")
+    write_atomically(path, b"new")
+    with open(path, "rb") as f:
+        assert f.read() == b"new"
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "file.bin")
+    write_atomically(path, b"old")
+    with pytest.raises(TypeError):
+        write_atomically(path, "not bytes")
+    with open(path, "rb") as f:
+        assert f.read() == b"old"
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+def test_failed_rename_removes_the_temp_file(tmp_path):
+    path = tmp_path / "taken"
+    path.mkdir()
+    with pytest.raises(OSError):
+        write_atomically(str(path), b"data")
+    assert os.listdir(tmp_path) == ["taken"]
+
+@pytest.fixture
+def writer():
+    writer = SaveWriter()
+    yield writer
+    writer.close()
+
+def test_save_menu_confirms_after_writing(tmp_path, writer):
+    console = ScriptedConsole(["1"])
+    game_save = GameSave(str(tmp_path), writer=writer, console=console)
+    game_save.handle_save_menu(Mage("Ann"), "town")
+    assert "Game saved successfully" in console.output()
+    assert os.path.exists(tmp_path / "save_1.save")
+
+def test_save_menu_reports_a_failed_write(tmp_path, writer):
+    (tmp_path / "save_1.save").mkdir() # the slot can't be written
+    console = ScriptedConsole(["1", "4"])
+    game_save = GameSave(str(tmp_path), writer=writer, console=console)
+    game_save.handle_save_menu(Mage("Ann"), "town")
+    assert "Could not save the game" in console.output()
+    assert "Game saved successfully" not in console.output()
@@ -0,0 +1,82 @@
+# the spell table has to pick exactly what the old replicated pick list did, and each boss class
+# follows the profile it registered
+import random
+import pytest
+from boss_ai import BOSS_POLICIES, choose_boss_action, score_bosses, register_boss_profile, CAST_BY_CHANCE
+from boss_classes import SpellTable, Dragon, Troll, Giant
+from catalog import SPELLBOOKS
+
+# every castable spell repeated damage // 5 times, in mana cost order
+def replicated_list(spells, magic, current_mana):
+    picks = []
+    for spell_name, spell in sorted(spells.items(), key=lambda item: item[1].mana_cost):
+        if spell.mana_cost <= current_mana:
+            picks += [spell_name] * int((spell.base_damage + magic * spell.scaling_factor) / 5)
+    return picks
+
+class FixedRoll:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+@pytest.mark.parametrize("boss_class", ["Dragon", "Troll", "Giant"])
+@pytest.mark.parametrize("magic", [0, 20, 55])
+@pytest.mark.parametrize("current_mana", [0, 10, 19, 20, 35])
+def test_choose_matches_the_replicated_list(boss_class, magic, current_mana):
+    spells = SPELLBOOKS[boss_class]
+    table = SpellTable(spells, magic)
+    picks = replicated_list(spells, magic, current_mana)
+    assert table.can_cast_any(current_mana) == bool(picks)
+    if not picks:
+        assert table.choose(current_mana, FixedRoll(0.5)) is None
+        return
+    for i in range(len(picks)):
+        assert table.choose(current_mana, FixedRoll((i + 0.5) / len(picks))) == picks[i]
+    damage = {name: spell.base_damage + magic * spell.scaling_factor for name, spell in spells.items()}
+    assert table.expected_damage(current_mana) == pytest.approx(sum(damage[name] for name in picks) / len(picks))
+
+# bosses start with an empty mana pool, the fight fills it
+def make_boss(boss_class, current_mana):
+    boss = boss_class(3)
+    boss.max_mana = 40
+    boss.current_mana = current_mana
+    return boss
+
+def test_every_boss_class_has_a_profile():
+    assert set(BOSS_POLICIES) == {"Dragon", "Troll", "Giant"}
+
+def test_dragon_casts_while_healthy():
+    dragon = make_boss(Dragon, 40)
+    assert choose_boss_action(dragon, random.Random(0))[0] == "cast_spell"
+    dragon.stats["Health"] = int(dragon.max_health * 0.5)
+    assert choose_boss_action(dragon, random.Random(0)) == ("attack", None)
+
+def test_troll_casts_once_hurt():
+    troll = make_boss(Troll, 40)
+    assert choose_boss_action(troll, random.Random(0)) == ("attack", None)
+    troll.stats["Health"] = int(troll.max_health * 0.5)
+    assert choose_boss_action(troll, random.Random(0))[0] == "cast_spell"
+
+def test_giant_casts_by_chance():
+    giant = make_boss(Giant, 40)
+    rng = random.Random(1)
+    casts = sum(choose_boss_action(giant, rng)[0] == "cast_spell" for _ in range(2000))
+    assert 1000 < casts < 1400 # cast_threshold is 0.6
+    assert score_bosses([giant])[0].cast_chance == 0.6
+
+def test_low_mana_boss_drinks_a_potion():
+    dragon = make_boss(Dragon, 0)
+    assert choose_boss_action(dragon, random.Random(0)) == ("use_item", "Mana Potion")
+    assert score_bosses([dragon])[0].uses_potion
+
+def test_registering_a_profile_changes_the_class(monkeypatch):
+    monkeypatch.setitem(BOSS_POLICIES, "Dragon", BOSS_POLICIES["Dragon"])
+    register_boss_profile("Dragon", potion_threshold=0.0, cast_rule=CAST_BY_CHANCE, cast_threshold=0.0)
+    dragon = make_boss(Dragon, 40)
+    assert choose_boss_action(dragon, random.Random(0)) == ("attack", None)
+
+def test_unknown_cast_rule_is_refused():
+    with pytest.raises(ValueError):
+        register_boss_profile("Lich", potion_threshold=0.5, cast_rule="sometimes", cast_threshold=0.5)
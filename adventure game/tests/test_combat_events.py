@@ -0,0 +1,108 @@
+# what a fight emits is what the game draws and the simulator counts, so a scripted fight has to give
+# exactly this stream
+import random
+import pytest
+from boss_classes import Dragon
+from combat import Combat
+from combat_events import DAMAGE, KNOCKOUT, MANA_RESTORED, ITEM, LEVEL_UP, FLED, FAILED_FLEE
+from console import ScriptedConsole
+from game_loop import Game
+from party import Party
+from player_classes import Warrior, Mage
+from save_states import GameSave
+from spawner import spawn
+
+def start_fight(player, *enemies, rng=None):
+    player_party = Party("player")
+    player_party.add_member(player)
+    enemy_party = Party("enemy")
+    for enemy in enemies:
+        enemy_party.add_member(enemy)
+    combat = Combat(player_party, enemy_party, rng or random.Random(0))
+    events = []
+    combat.subscribe(events.append)
+    return combat, events
+
+def fight_it_out(combat):
+    while True:
+        if combat.is_player_turn:
+            result, success = combat.handle_combat_turn("attack", 0)
+        else:
+            result, success = combat.handle_combat_turn("attack")
+        if result in ("VICTORY", "DEFEAT"):
+            return result
+
+def test_scripted_fight():
+    warrior = Warrior("Ann")
+    goblin = spawn("Goblin", 1)
+    combat, events = start_fight(warrior, goblin)
+    assert fight_it_out(combat) == "VICTORY"
+    # warrior strength 20 against goblin defense 5, goblin strength 10 against warrior defense 15
+    assert events == [
+            (DAMAGE, warrior, goblin, 18, None),
+            (DAMAGE, goblin, warrior, 3, None),
+            (DAMAGE, warrior, goblin, 18, None),
+            (DAMAGE, goblin, warrior, 3, None),
+            (DAMAGE, warrior, goblin, 18, None),
+            (KNOCKOUT, warrior, goblin, 20, None)
+            ]
+
+def test_knockout_that_levels_up():
+    warrior = Warrior("Ann")
+    warrior.experience = warrior.experience_to_next_level - 1
+    goblin = spawn("Goblin", 1)
+    combat, events = start_fight(warrior, goblin)
+    fight_it_out(combat)
+    assert [event.kind for event in events[-2:]] == [KNOCKOUT, LEVEL_UP]
+    assert events[-1].actor is warrior and events[-1].amount == 2
+
+def test_spell_and_items():
+    mage = Mage("Cy")
+    orc = spawn("Orc", 1)
+    combat, events = start_fight(mage, orc)
+    combat.handle_combat_turn("cast_spell", 0, "Fireball")
+    spell = mage.spells["Fireball"]
+    assert events[0] == (DAMAGE, mage, orc, spell.base_damage + mage.stats["Magic"] * spell.scaling_factor, "Fireball")
+    events.clear()
+    combat.is_player_turn = True
+    mage.stats["Health"] -= 30
+    combat.handle_combat_turn("use_item", item_name="Health Potion")
+    assert events == [(ITEM, mage, mage, mage.available_items["Health Potion"].effect_value, "Health Potion")]
+
+def test_boss_drinking_a_potion():
+    dragon = Dragon(1)
+    dragon.max_mana = 40
+    combat, events = start_fight(Warrior("Ann"), dragon)
+    combat.is_player_turn = False
+    combat.handle_combat_turn("attack")
+    assert events == [(MANA_RESTORED, dragon, dragon, 20, "Mana Potion")]
+
+def test_flee_events():
+    warrior = Warrior("Ann")
+    kinds = set()
+    for seed in range(10):
+        combat, events = start_fight(warrior, spawn("Orc", 1), rng=random.Random(seed))
+        combat.handle_combat_turn("flee")
+        assert len(events) == 1 and events[0].actor is warrior
+        kinds.add(events[0].kind)
+    assert kinds == {FLED, FAILED_FLEE}
+
+def test_nothing_is_emitted_without_listeners(monkeypatch):
+    combat, events = start_fight(Warrior("Ann"), spawn("Goblin", 1))
+    combat.unsubscribe(events.append)
+    monkeypatch.setattr(Combat, "emit", lambda *args: pytest.fail("emitted with nobody listening"))
+    assert fight_it_out(combat) == "VICTORY"
+
+def test_game_draws_the_events(tmp_path):
+    console = ScriptedConsole()
+    game = Game(seed=0, console=console, game_save=GameSave(str(tmp_path)))
+    game.player = Warrior("Ann")
+    goblin = spawn("Goblin", 1)
+    combat, events = start_fight(game.player, goblin)
+    fight_it_out(combat)
+    for event in events:
+        game.render_combat_event(event)
+    output = console.output()
+    assert "You dealt 18 damage to the Goblin!" in output
+    assert "The Goblin dealt 3 damage to you!" in output
+    assert "The Goblin fell!" in output
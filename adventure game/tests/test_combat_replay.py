@@ -0,0 +1,74 @@
+# the replay log has to hand back exactly what the fights emitted, find a turn without reading
+# everything before it, and survive a crash that cut the last record in half
+import os
+import pytest
+from combat_events import ITEM
+from combat_replay import ReplayReader, ReplayWriter, HEADER, RECORD, record_fights
+
+def record(path, fights, seed=0):
+    record_fights(path, "Warrior", ("Orc", "Goblin"), 3, fights, seed=seed)
+
+@pytest.fixture
+def replay(tmp_path):
+    path = str(tmp_path / "fights.log")
+    record(path, 20)
+    return path
+
+def test_records_come_back_in_fight_and_turn_order(replay):
+    with ReplayReader(replay) as reader:
+        keys = [(reader[i].fight, reader[i].turn) for i in range(len(reader))]
+        assert keys == sorted(keys)
+        assert keys[0][0] == 0 and keys[-1][0] == 19
+
+def test_lookups_match_a_scan(replay):
+    with ReplayReader(replay) as reader:
+        records = [reader[i] for i in range(len(reader))]
+        for fight in (0, 7, 19, 20):
+            assert reader.fight(fight) == [r for r in records if r.fight == fight]
+        for fight, turn in {(r.fight, r.turn) for r in records}:
+            assert reader.turn(fight, turn) == [r for r in records if r.fight == fight and r.turn == turn]
+
+def test_item_events_keep_the_item_name(tmp_path):
+    path = str(tmp_path / "fights.log")
+    record_fights(path, "Warrior", ("Troll",), 1, 5, policy_name="cautious")
+    with ReplayReader(path) as reader:
+        items = [reader[i] for i in range(len(reader)) if reader[i].kind == ITEM]
+    assert items
+    assert all(item.detail == "Health Potion" for item in items)
+
+def test_appending_carries_on_the_fight_numbers(tmp_path):
+    path = str(tmp_path / "fights.log")
+    record(path, 5)
+    record(path, 5, seed=1)
+    with ReplayReader(path) as reader:
+        assert reader[len(reader) - 1].fight == 9
+        assert reader.fight(5)
+
+def test_torn_tail_is_dropped_before_appending(tmp_path, replay):
+    with ReplayReader(replay) as reader:
+        whole = [reader[i] for i in range(len(reader))]
+    os.truncate(replay, os.path.getsize(replay) - RECORD.size // 2)
+
+    # the reader skips the half record, the writer cuts it off so new records line up again
+    with ReplayReader(replay) as reader:
+        assert len(reader) == len(whole) - 1
+    record(replay, 3, seed=1)
+    assert (os.path.getsize(replay) - HEADER.size) % RECORD.size == 0
+
+    fresh = str(tmp_path / "fresh.log")
+    record(fresh, 3, seed=1)
+    with ReplayReader(replay) as reader, ReplayReader(fresh) as expected:
+        kept = [reader[i] for i in range(len(whole) - 1)]
+        assert kept == whole[:-1]
+        appended = [reader[i] for i in range(len(whole) - 1, len(reader))]
+        assert [r._replace(fight=r.fight - whole[-1].fight - 1) for r in appended] == \
+                [expected[i] for i in range(len(expected))]
+
+def test_torn_header_starts_a_new_log(tmp_path):
+    path = str(tmp_path / "fights.log")
+    with open(path, "wb") as file:
+        file.write(b"TAGR")
+    record(path, 2)
+    with ReplayReader(path) as reader:
+        assert reader[0].fight == 0
+        assert reader[len(reader) - 1].fight == 1
@@ -0,0 +1,33 @@
+# the closed form and the simulated fallback are two ways of answering the same question, wherever
+# both can answer it they have to agree
+import pytest
+from combat_solver import expected_outcome, simulate_outcome, solve_duel
+from simulation import PLAYER_CLASSES
+
+DUELS = [(player_class, level, enemy_class, enemy_level)
+         for player_class in PLAYER_CLASSES
+         for level in (1, 3, 5, 10)
+         for enemy_class in ("Goblin", "Orc", "Ogre", "Dragon")
+         for enemy_level in (1, 3)]
+
+@pytest.mark.parametrize("player_class, level, enemy_class, enemy_level", DUELS)
+def test_solver_matches_simulation(player_class, level, enemy_class, enemy_level):
+    if solve_duel(player_class, level, enemy_class, enemy_level) is None:
+        pytest.skip("this enemy casts, there is no closed form")
+    exact = expected_outcome(player_class, level, enemy_class, enemy_level)
+    simulated = simulate_outcome(player_class, level, (enemy_class,), enemy_level, "attack", 5, 0)
+    assert exact.exact and not simulated.exact
+    assert exact.win_rate == simulated.win_rate
+    assert exact.turns == simulated.turns
+    assert exact.hp_remaining == simulated.hp_remaining
+
+# these level up on the winning blow, the heal from it isn't part of what the fight left
+@pytest.mark.parametrize("level, hp_remaining", [(10, 253), (5, 78)])
+def test_hp_remaining_is_before_the_level_up(level, hp_remaining):
+    assert expected_outcome("Warrior", level, "Dragon", 1).hp_remaining == hp_remaining
+    assert simulate_outcome("Warrior", level, ("Dragon",), 1, "attack", 5, 0).hp_remaining == hp_remaining
+
+def test_spells_fall_back_to_simulation():
+    outcome = expected_outcome("Mage", 3, "Orc", policy_name="caster", fights=50)
+    assert not outcome.exact
+    assert 0 <= outcome.win_rate <= 1
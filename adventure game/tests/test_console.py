@@ -0,0 +1,61 @@
+# a whole game can be played from a script: the console hands the game its lines, keeps every frame it
+# sends back, and each frame is one screen ending in the prompt that asked for the next line
+import pytest
+from console import ScriptedConsole, NullConsole
+from game_loop import Game
+from save_states import GameSave
+from save_writer import SaveWriter
+
+# new game as a warrior, rest in town, a look at the stats, then quit from the main menu
+SESSION = ["1", "Ann", "1", "2", "2", "3", "3", "", "4", "4", "3"]
+
+@pytest.fixture
+def writer():
+    writer = SaveWriter()
+    yield writer
+    writer.close()
+
+def play(tmp_path, writer, console, seed=7):
+    game = Game(seed=seed, console=console, game_save=GameSave(str(tmp_path), writer=writer, console=console))
+    with pytest.raises(SystemExit):
+        game.main_menu()
+    return game
+
+def test_scripted_session_plays_to_the_end(tmp_path, writer):
+    console = ScriptedConsole(SESSION)
+    game = play(tmp_path, writer, console)
+    output = console.output()
+    assert "Welcome, Ann!" in output
+    assert "HP and Mana restored!" in output
+    assert "Name: Ann" in output and "Class: Warrior" in output
+    assert output.endswith("Thanks for playing!\n")
+    assert not console.lines
+    assert game.player.name == "Ann"
+
+def test_each_frame_ends_with_its_prompt(tmp_path, writer):
+    console = ScriptedConsole(SESSION)
+    play(tmp_path, writer, console)
+    prompts = [frame for frame in console.frames if frame.endswith(("choice: ", "continue...", ": "))]
+    assert len(prompts) == len(SESSION) # one screen per line read
+    assert all(frame.count("Enter your choice: ") <= 1 for frame in console.frames)
+
+def test_same_seed_and_script_same_session(tmp_path, writer):
+    first = ScriptedConsole(SESSION)
+    second = ScriptedConsole(SESSION)
+    play(tmp_path / "a", writer, first)
+    play(tmp_path / "b", writer, second)
+    assert first.frames == second.frames
+
+def test_running_out_of_input_is_eof(tmp_path, writer):
+    console = ScriptedConsole(["1", "Ann"])
+    game = Game(seed=7, console=console, game_save=GameSave(str(tmp_path), writer=writer, console=console))
+    with pytest.raises(EOFError):
+        game.main_menu()
+    console.feed("3")
+    assert console.read_line("Enter your choice: ") == "3"
+
+def test_null_console_throws_the_output_away(tmp_path, writer):
+    console = NullConsole(SESSION)
+    play(tmp_path, writer, console)
+    assert console.frames == [] and console.output() == ""
+    assert not console.lines
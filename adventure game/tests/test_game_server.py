@@ -0,0 +1,35 @@
+# players find their saves again under their name, and directories nobody has used in a long time
+# are deleted unless that player is on right now
+import os
+import time
+from game_server import GameServer
+
+def make_save_directory(root, name, age_days):
+    directory = root / name
+    directory.mkdir()
+    save = directory / "save_1.save"
+    save.write_bytes(b"save")
+    then = time.time() - age_days * 86400
+    for path in (save, directory):
+        os.utime(path, (then, then))
+
+def test_old_directories_are_expired(tmp_path):
+    server = GameServer(save_root=str(tmp_path), max_sessions=1, expire_days=30)
+    make_save_directory(tmp_path, "player_ann", 2)
+    make_save_directory(tmp_path, "player_bob", 45)
+    make_save_directory(tmp_path, "player_cy", 45)
+    make_save_directory(tmp_path, "session_0123", 45) # from before players had names
+    server.players.add("cy")
+    server.expire_saves()
+    assert sorted(os.listdir(tmp_path)) == ["player_ann", "player_cy"]
+
+def test_recent_save_keeps_an_old_directory(tmp_path):
+    server = GameServer(save_root=str(tmp_path), max_sessions=1, expire_days=30)
+    make_save_directory(tmp_path, "player_ann", 45)
+    (tmp_path / "player_ann" / "save_2.save").write_bytes(b"new save")
+    server.expire_saves()
+    assert os.listdir(tmp_path) == ["player_ann"]
+
+def test_save_directory_is_named_for_the_player(tmp_path):
+    server = GameServer(save_root=str(tmp_path), max_sessions=1)
+    assert server.save_directory("ann") == os.path.join(str(tmp_path), "player_ann")
@@ -0,0 +1,78 @@
+# a lazily opened save has to read back exactly what a full load does, while only reading the big
+# sections somebody asks for
+import pytest
+from save_codecs import CODECS
+from save_journal import SaveJournal, EAGER_SECTION_BYTES
+
+def big_state():
+    return {
+            "player": {"name": "A", "level": 3},
+            "location": "town",
+            "companions": {str(i): {"name": f"c{i}", "inventory": {f"item{j}": j for j in range(40)}}
+                           for i in range(3)},
+            "story_state": {"visited": list(range(500)), "flags": ["met_king"]}
+            }
+
+@pytest.fixture(params=sorted(CODECS))
+def journal(request, tmp_path):
+    return SaveJournal(str(tmp_path / "save_1.save"), CODECS[request.param], allow_pickle=True)
+
+def reopen(journal):
+    return SaveJournal(journal.path, journal.codec, allow_pickle=True)
+
+def test_lazy_matches_eager(journal):
+    state = big_state()
+    journal.write(state)
+    with reopen(journal).open_lazy() as lazy:
+        assert set(lazy) == set(state)
+        assert dict(lazy) == reopen(journal).load() == state
+
+def test_only_small_sections_are_read_up_front(journal):
+    journal.write(big_state())
+    lazy = reopen(journal).open_lazy()
+    try:
+        assert set(lazy.loaded) == {"player", "location"}
+        assert all(lazy.table[name][1] > EAGER_SECTION_BYTES for name in ("companions", "story_state"))
+        lazy["companions"]
+        assert not lazy.file.closed
+        lazy["story_state"]
+        assert lazy.file.closed # everything has been read, the file isn't needed
+    finally:
+        lazy.close()
+
+def test_deltas_reach_the_lazy_sections(journal):
+    state = big_state()
+    journal.write(state)
+    state["companions"]["1"]["inventory"]["item3"] = 99
+    state["location"] = "dungeon"
+    journal.write(state)
+    del state["story_state"]
+    state["rng"] = {"state": "AAAA", "gauss_next": None}
+    journal.write(state)
+    assert journal.deltas == 2
+    with reopen(journal).open_lazy() as lazy:
+        assert "story_state" not in lazy
+        with pytest.raises(KeyError):
+            lazy["story_state"]
+        assert dict(lazy) == reopen(journal).load() == state
+
+def test_compaction_under_an_open_save(journal):
+    state = big_state()
+    journal.write(state)
+    lazy = reopen(journal).open_lazy()
+    try:
+        changed = big_state()
+        changed["companions"] = {}
+        journal.write_base(changed) # replaces the file, the open one still reads the old sections
+        assert lazy["companions"] == state["companions"]
+    finally:
+        lazy.close()
+    with reopen(journal).open_lazy() as lazy:
+        assert lazy["companions"] == {}
+
+def test_closing_early_releases_the_file(journal):
+    journal.write(big_state())
+    lazy = reopen(journal).open_lazy()
+    lazy.close()
+    assert lazy.file.closed
+    assert lazy["player"]["name"] == "A" # small sections were read before it closed
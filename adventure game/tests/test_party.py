@@ -0,0 +1,55 @@
+# the party keeps its living members, total health and level sum up to date as health changes, they
+# have to come out the same as counting them again from scratch
+import random
+from party import Party
+from player_classes import Warrior, Mage, Archer
+from npc_classes import Fighter, Healer, Rogue
+
+def assert_counts_match(party):
+    living = [member for member in party.members if member.stats["Health"] > 0]
+    assert sorted(map(id, party.living_members)) == sorted(map(id, living))
+    assert party.get_active_members() == living
+    assert party.get_total_health() == sum(member.stats["Health"] for member in party.members)
+    assert party.level_total == sum(member.level for member in party.members)
+
+def test_counters_follow_damage_healing_knockouts_and_removals():
+    rng = random.Random(3)
+    party = Party("player")
+    bench = [Warrior("A"), Mage("B"), Archer("C"), Fighter("D"), Healer("E"), Rogue("F")]
+    for member in bench[:4]:
+        party.add_member(member)
+    for _ in range(5000):
+        roll = rng.random()
+        if roll < 0.05 and party.members:
+            party.remove_member(rng.choice(party.members))
+        elif roll < 0.1 and len(party.members) < party.max_size:
+            party.add_member(rng.choice([member for member in bench if member not in party.members]))
+        elif roll < 0.12 and party.members:
+            member = rng.choice(party.members)
+            member.level += 1
+            member.update_stats() # a level up rewrites health, that is how the party hears about it
+        elif party.members:
+            member = rng.choice(party.members)
+            if rng.random() < 0.2:
+                member.stats["Health"] = 0 # knocked out
+            else:
+                member.stats["Health"] = max(0, member.stats["Health"] + rng.randint(-40, 30))
+        assert_counts_match(party)
+
+# a member in two parties at once reports to both, and leaving one doesn't stop the other hearing
+def test_member_in_two_parties():
+    shared = Warrior("A")
+    first = Party("player")
+    second = Party("player")
+    first.add_member(shared)
+    first.add_member(Mage("B"))
+    second.add_member(shared)
+    shared.stats["Health"] -= 30
+    assert_counts_match(first)
+    assert_counts_match(second)
+    first.remove_member(shared)
+    shared.stats["Health"] = 0
+    assert_counts_match(first)
+    assert_counts_match(second)
+    assert not second.is_party_alive()
+    assert first.is_party_alive()
@@ -0,0 +1,104 @@
+# every installed codec has to give back exactly what it was given, in a frame and in a whole save
+import random
+import pytest
+from save_codecs import CODECS, detect_codec, json_codec
+from save_journal import SaveJournal
+from save_states import GameSave, restore_rng
+from save_writer import SaveWriter
+from player_classes import Mage
+
+RECORD = {
+        "player": {"name": "Ãnn ⚔", "level": 3, "stats": {"Health": 120, "Magic": 30}},
+        "location": "dungeon",
+        "companions": {"1": {"name": "Rogue", "inventory": {"Health Potion": 2}, "active_buffs": {"Agility": [10]}}},
+        "rng": 2 ** 63 + 5,
+        "ratio": 0.25,
+        "flags": ["met_king", ""],
+        "story": {"current_node": None},
+        "alive": True
+        }
+
+@pytest.fixture(params=sorted(CODECS))
+def codec(request):
+    return CODECS[request.param]
+
+def test_encode_decode(codec):
+    assert codec.decode(codec.encode(RECORD)) == RECORD
+
+def test_frames(codec):
+    records = [RECORD, {"delta": {"location": "town"}}, {"delta": {}}]
+    data = codec.magic + b"".join(codec.frame(record) for record in records)
+    assert codec.read_frames(data) == ([(record, len(codec.frame(record))) for record in records], False)
+    decoded, torn = codec.read_frames(data[:-2])
+    assert torn
+    assert [record for record, size in decoded] == records[:2]
+
+def test_detected_from_the_file(codec):
+    detected = detect_codec(codec.magic + codec.frame(RECORD), allow_pickle=True)
+    if codec.magic:
+        assert detected is codec
+    else:
+        assert detected is json_codec() # plain json lines, read with orjson when it is installed
+
+def test_journal_round_trip(codec, tmp_path):
+    path = str(tmp_path / "save_1.save")
+    journal = SaveJournal(path, codec, allow_pickle=True)
+    journal.write(RECORD)
+    changed = dict(RECORD, location="town")
+    journal.write(changed)
+    assert journal.deltas == 1
+    assert SaveJournal(path, allow_pickle=True).load() == changed
+    with SaveJournal(path, allow_pickle=True).open_lazy() as lazy:
+        assert dict(lazy) == changed
+
+# a GameSave writing with one codec and another loading with the default still agree on the save
+def test_game_save_round_trip(codec, tmp_path):
+    writer = SaveWriter()
+    try:
+        player = Mage("Ann")
+        GameSave(str(tmp_path), writer=writer, codec=codec.name).save_game(player, "dungeon", slot=2)
+        reader = GameSave(str(tmp_path), writer=writer, codec=codec.name)
+        with reader.load_game("save_2.save") as save_data:
+            assert save_data["player"]["name"] == "Ann"
+            assert save_data["player"]["class"] == "Mage"
+            assert save_data["location"] == "dungeon"
+        assert [save["filename"] for save in reader.list_saves()] == ["save_2.save"]
+    finally:
+        writer.close()
+
+# saving reads the rng without drawing from it, and loading puts it back where it was
+def test_rng_round_trip(codec, tmp_path):
+    writer = SaveWriter()
+    try:
+        rng = random.Random(7)
+        rng.random()
+        untouched = random.Random()
+        untouched.setstate(rng.getstate())
+        GameSave(str(tmp_path), writer=writer, codec=codec.name).save_game(Mage("Ann"), "dungeon", slot=1, rng=rng)
+        expected = [rng.random() for _ in range(5)]
+        assert expected == [untouched.random() for _ in range(5)]
+
+        restored = random.Random()
+        with GameSave(str(tmp_path), writer=writer, codec=codec.name).load_game("save_1.save") as save_data:
+            restore_rng(restored, save_data["rng"])
+        assert [restored.random() for _ in range(5)] == expected
+    finally:
+        writer.close()
+
+def test_pickle_needs_to_be_allowed(tmp_path):
+    path = str(tmp_path / "save_1.save")
+    SaveJournal(path, CODECS["pickle"], allow_pickle=True).write(RECORD)
+    with pytest.raises(ValueError):
+        SaveJournal(path).load()
+
+# switching codecs rewrites the file as a snapshot in the new one instead of appending to the old
+def test_switching_codecs_rewrites(tmp_path):
+    path = str(tmp_path / "save_1.save")
+    SaveJournal(path, CODECS["marshal"]).write(RECORD)
+    journal = SaveJournal(path, CODECS["json"])
+    changed = dict(RECORD, location="town")
+    journal.write(changed)
+    assert journal.deltas == 0
+    with open(path, "rb") as f:
+        assert detect_codec(f.read()) is json_codec()
+    assert SaveJournal(path).load() == changed
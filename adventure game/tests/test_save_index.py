@@ -0,0 +1,45 @@
+# the save menu lists saves from the index, which has to notice saves written, replaced or deleted
+# by something other than the GameSave that indexed them
+import os
+import shutil
+import pytest
+from save_states import GameSave, INDEX_FILENAME
+from save_writer import SaveWriter
+from player_classes import Mage, Warrior
+
+@pytest.fixture
+def writer():
+    writer = SaveWriter()
+    yield writer
+    writer.close()
+
+def names(game_save):
+    return {save["filename"]: save["name"] for save in game_save.list_saves()}
+
+def test_saves_are_listed_from_the_index(tmp_path, writer):
+    game_save = GameSave(str(tmp_path), writer=writer)
+    game_save.save_game(Mage("Ann"), "town", slot=1)
+    game_save.save_game(Warrior("Bo"), "dungeon", slot=2)
+    assert names(game_save) == {"save_1.save": "Ann", "save_2.save": "Bo"}
+    assert os.path.exists(tmp_path / INDEX_FILENAME)
+
+def test_index_is_rebuilt_after_an_outside_change(tmp_path, writer):
+    saves = tmp_path / "saves"
+    other = tmp_path / "other"
+    game_save = GameSave(str(saves), writer=writer)
+    game_save.save_game(Mage("Ann"), "town", slot=1)
+    game_save.save_game(Mage("Cy"), "town", slot=2)
+    assert names(game_save) == {"save_1.save": "Ann", "save_2.save": "Cy"}
+
+    # another copy of the game writes saves the index has never seen
+    other_save = GameSave(str(other), writer=writer)
+    other_save.save_game(Warrior("Bartholomew"), "castle", slot=1)
+    other_save.save_game(Warrior("Dee"), "castle", slot=3)
+    writer.flush()
+    shutil.copy(other / "save_1.save", saves / "save_1.save")
+    shutil.copy(other / "save_3.save", saves / "save_3.save")
+    os.remove(saves / "save_2.save")
+
+    assert names(game_save) == {"save_1.save": "Bartholomew", "save_3.save": "Dee"}
+    # and the rebuilt index is what a fresh GameSave lists
+    assert names(GameSave(str(saves), writer=writer)) == {"save_1.save": "Bartholomew", "save_3.save": "Dee"}
@@ -0,0 +1,115 @@
+# a journal is a snapshot plus the deltas after it, reading it back has to give the last state written
+import copy
+import os
+import random
+from save_codecs import CODECS
+from save_journal import SaveJournal, diff_state, apply_delta, encode_snapshot
+
+def random_value(rng, depth):
+    roll = rng.random()
+    if depth < 3 and roll < 0.3:
+        return {f"k{rng.randint(0, 5)}": random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+    if roll < 0.5:
+        return rng.randint(-5, 5)
+    if roll < 0.7:
+        return rng.choice(["town", "dungeon", ""])
+    if roll < 0.85:
+        return [rng.randint(0, 3) for _ in range(rng.randint(0, 3))]
+    return rng.choice([None, True, 1.5])
+
+def mutate(rng, state):
+    state = copy.deepcopy(state)
+    target = state
+    while isinstance(target.get("nested"), dict) and rng.random() < 0.5:
+        target = target["nested"]
+    key = rng.choice(["player", "location", "companions", "nested", "rng", f"k{rng.randint(0, 5)}"])
+    if key in target and rng.random() < 0.2:
+        del target[key]
+    else:
+        target[key] = random_value(rng, 0)
+    return state
+
+def test_diff_then_apply_gives_the_new_state():
+    rng = random.Random(1)
+    state = {"player": {"name": "A", "level": 1}, "location": "town"}
+    for _ in range(2000):
+        new_state = mutate(rng, state)
+        delta = diff_state(state, new_state)
+        assert apply_delta(copy.deepcopy(state), delta) == new_state
+        assert diff_state(new_state, new_state) == {}
+        state = new_state
+
+def test_journal_round_trip(tmp_path):
+    rng = random.Random(2)
+    path = str(tmp_path / "autosave.save")
+    journal = SaveJournal(path, CODECS["json"], compact_after=16)
+    state = {"player": {"name": "A", "level": 1}, "location": "town"}
+    for _ in range(300):
+        state = mutate(rng, state)
+        journal.write(state)
+        assert SaveJournal(path, CODECS["json"]).load() == state
+        with SaveJournal(path, CODECS["json"]).open_lazy() as lazy:
+            assert dict(lazy) == state
+
+# bench_saves measures encode_snapshot, so it has to be byte for byte what a save starts with
+def test_snapshot_is_what_write_base_writes(tmp_path):
+    path = tmp_path / "save_1.save"
+    state = {"player": {"name": "A", "level": 1}, "location": "town", "rng": {"state": "AAAA", "gauss_next": None}}
+    SaveJournal(str(path), CODECS["json"]).write_base(state)
+    assert path.read_bytes() == encode_snapshot(CODECS["json"], state)
+
+def test_unchanged_state_appends_nothing(tmp_path):
+    path = str(tmp_path / "save_1.save")
+    journal = SaveJournal(path, CODECS["json"])
+    state = {"player": {"name": "A"}, "location": "town"}
+    journal.write(state)
+    size = os.path.getsize(path)
+    journal.write(copy.deepcopy(state))
+    assert os.path.getsize(path) == size
+
+def test_small_change_appends_a_delta(tmp_path):
+    path = str(tmp_path / "save_1.save")
+    journal = SaveJournal(path, CODECS["json"])
+    state = {"player": {"name": "A", "stats": {str(i): i for i in range(200)}}, "location": "town"}
+    journal.write(state)
+    size = os.path.getsize(path)
+    state["location"] = "dungeon"
+    journal.write(state)
+    assert journal.deltas == 1
+    assert os.path.getsize(path) - size < 100
+    assert SaveJournal(path, CODECS["json"]).load() == state
+
+def test_compaction_rewrites_a_single_snapshot(tmp_path):
+    path = str(tmp_path / "save_1.save")
+    journal = SaveJournal(path, CODECS["json"], compact_after=8)
+    state = {"player": {"name": "A", "level": 0, "stats": {str(i): i for i in range(200)}}, "location": "town"}
+    journal.write(state)
+    snapshot_size = os.path.getsize(path)
+    for level in range(1, 9):
+        state["player"]["level"] = level
+        journal.write(state)
+    assert journal.deltas == 8
+    state["player"]["level"] = 9
+    journal.write(state) # the ninth goes over compact_after, the file starts over as one snapshot
+    assert journal.deltas == 0
+    assert abs(os.path.getsize(path) - snapshot_size) < 4
+    reread = SaveJournal(path, CODECS["json"])
+    assert reread.load() == state
+    assert reread.deltas == 0
+
+def test_torn_last_delta_is_dropped_and_compacted(tmp_path):
+    path = str(tmp_path / "save_1.save")
+    journal = SaveJournal(path, CODECS["json"])
+    state = {"player": {"name": "A", "level": 1}, "location": "town"}
+    journal.write(state)
+    saved = copy.deepcopy(state)
+    state["location"] = "dungeon"
+    journal.write(state)
+    os.truncate(path, os.path.getsize(path) - 3) # the game died halfway through the append
+    reread = SaveJournal(path, CODECS["json"])
+    assert reread.load() == saved
+    assert reread.torn
+    state["location"] = "forest"
+    reread.write(state)
+    assert not reread.torn
+    assert SaveJournal(path, CODECS["json"]).load() == state
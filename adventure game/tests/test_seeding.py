@@ -0,0 +1,44 @@
+# a seed has to replay a fight exactly, in this process or any other, whatever the global random
+# module is doing in the meantime
+import os
+import random
+import subprocess
+import sys
+from console import NullConsole
+from game_loop import Game
+from save_states import GameSave
+from seeding import derive_seed, derive_rng
+from simulation import simulate_fight, POLICIES
+
+def recorded_fight(seed, fight_number, player_class="Mage", enemies=("Orc", "Goblin")):
+    events = []
+    rng = derive_rng(seed, player_class, enemies, 2, "caster", fight_number)
+    fight = simulate_fight(player_class, enemies, 2, POLICIES["caster"], rng=rng, listener=events.append)
+    return fight, [(event.kind, event.amount, event.detail) for event in events]
+
+def test_derived_seeds_depend_on_every_key():
+    assert derive_seed(1, "Mage", 3) == derive_seed(1, "Mage", 3)
+    assert len({derive_seed(1, "Mage", 3), derive_seed(2, "Mage", 3), derive_seed(1, "Rogue", 3),
+                derive_seed(1, "Mage", 4)}) == 4
+
+def test_derived_seeds_are_the_same_in_another_process():
+    code = "from seeding import derive_seed; print(derive_seed(7, 'Warrior', ('Orc',), 1))"
+    env = dict(os.environ, PYTHONHASHSEED="123", PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    assert int(output) == derive_seed(7, "Warrior", ("Orc",), 1)
+
+def test_same_seed_same_fight():
+    for fight_number in range(20):
+        random.seed(fight_number) # the global generator mustn't matter
+        first = recorded_fight(4, fight_number)
+        random.random()
+        assert recorded_fight(4, fight_number) == first
+
+def test_different_seeds_give_different_fights():
+    assert len({repr(recorded_fight(seed, 0, "Warrior")) for seed in range(20)}) > 1
+
+def test_game_rng_follows_its_seed(tmp_path):
+    first = Game(seed=11, console=NullConsole(), game_save=GameSave(str(tmp_path / "a")))
+    random.seed() # the global generator mustn't matter
+    second = Game(seed=11, console=NullConsole(), game_save=GameSave(str(tmp_path / "b")))
+    assert [first.rng.random() for _ in range(5)] == [second.rng.random() for _ in range(5)]
@@ -0,0 +1,39 @@
+# the simulator's totals can't depend on how the fights were split up or how many processes ran them
+import pytest
+from simulation import run_simulations, SimulationStats
+
+MATCHUPS = [("Warrior", "Goblin", 1), ("Mage", "Orc", 2), ("Archer", ("Goblin", "Orc"), 1)]
+
+def totals(results):
+    return {key: (stats.fights, stats.outcomes, stats.turns, stats.damage_dealt, stats.damage_taken, stats.events)
+            for key, stats in results.items()}
+
+def test_chunking_doesnt_change_the_totals():
+    whole = run_simulations(MATCHUPS, fights=60, seed=3, processes=1, chunk_size=60)
+    for chunk_size in (1, 7, 25):
+        assert totals(run_simulations(MATCHUPS, fights=60, seed=3, processes=1, chunk_size=chunk_size)) == totals(whole)
+
+def test_process_pool_gives_the_same_totals():
+    alone = run_simulations(MATCHUPS, fights=40, seed=5, processes=1, chunk_size=40)
+    pooled = run_simulations(MATCHUPS, fights=40, seed=5, processes=2, chunk_size=9)
+    assert totals(pooled) == totals(alone)
+
+def test_every_fight_is_counted():
+    results = run_simulations(MATCHUPS, fights=30, processes=1, chunk_size=8)
+    for key, stats in results.items():
+        assert stats.fights == 30
+        assert sum(stats.outcomes.values()) == 30
+        assert set(stats.outcomes) <= {"VICTORY", "DEFEAT", "FLED", "TIMEOUT"}
+
+def test_merge_adds_up():
+    first = run_simulations(MATCHUPS[:1], fights=10, seed=1, processes=1)[MATCHUPS[0]]
+    second = run_simulations(MATCHUPS[:1], fights=10, seed=2, processes=1)[MATCHUPS[0]]
+    merged = SimulationStats()
+    merged.merge(first)
+    merged.merge(second)
+    assert merged.fights == 20
+    assert merged.outcomes == first.outcomes + second.outcomes
+
+def test_unknown_policy_is_refused():
+    with pytest.raises(ValueError):
+        run_simulations(MATCHUPS, fights=1, policy_name="berserk", processes=1)
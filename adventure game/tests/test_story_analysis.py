@@ -0,0 +1,112 @@
+# the checks have to find every kind of mistake a writer can make, the components have to agree with
+# plain reachability, and distances kept up to date as nodes are added have to match working them
+# out again from scratch, and stay exact however long the story gets
+import random
+from story_analysis import StoryDistances, StoryIndex, NO_DISTANCE
+from story_graph import compile_story, NO_NODE
+from tree import StoryTree
+
+def fresh(graph):
+    distances = StoryDistances(graph)
+    return [list(distances.combat), list(distances.start), list(distances.ending)]
+
+def tracked(distances):
+    return [list(distances.combat), list(distances.start), list(distances.ending)]
+
+def random_node(rng, names):
+    choices = [{"id": f"c{i}", "next_node": rng.choice(names)} for i in range(rng.randrange(4))]
+    if rng.random() < 0.2:
+        return "combat", {"victory_node": rng.choice(names), "defeat_node": rng.choice(names)}, choices
+    return "story", {}, choices
+
+def test_node_added_matches_a_rebuild():
+    rng = random.Random(9)
+    names = ["start"] + [f"n{i}" for i in range(40)]
+    tree = StoryTree()
+    tree.add_node("start", "story", {}, [{"id": "go", "next_node": "n0"}])
+    tree.get_distances()
+    for _ in range(600):
+        tree.add_node(rng.choice(names), *random_node(rng, names))
+        assert tracked(tree.distances) == fresh(tree.graph)
+
+def test_long_paths_are_exact():
+    length = 70000 # further than a uint16 could count
+    story = {f"n{i}": {"type": "story", "content": {}, "choices": [{"id": "on", "next_node": f"n{i + 1}"}]}
+             for i in range(length)}
+    story["start"] = {"type": "story", "content": {}, "choices": [{"id": "on", "next_node": "n0"}]}
+    story[f"n{length}"] = {"type": "story", "content": {}, "choices": []}
+    graph = compile_story(story)
+    distances = StoryDistances(graph)
+    assert distances.ending[graph.find("start")] == length + 1
+    assert distances.ending[graph.find("n0")] == length
+    assert distances.combat[graph.find("start")] == NO_DISTANCE
+
+def node(node_type="narrative", *targets, **content):
+    return {"type": node_type, "content": content,
+            "choices": [{"id": str(i), "next_node": target} for i, target in enumerate(targets)]}
+
+def test_every_kind_of_problem_is_found():
+    story = {
+            "start": node("narrative", "fork", "ghost"),
+            "fork": node("narrative", "fight", "loop_a", "locked"),
+            "fight": node("combat", enemy="Orc", victory_node="start"), # no defeat_node
+            "loop_a": node("narrative", "loop_b"),
+            "loop_b": node("narrative", "loop_a"),
+            "locked": {"type": "dialog", "content": {},
+                       "choices": [{"id": "1", "next_node": "start", "requires_flag": "key"}]},
+            "island": node("narrative", "start")
+            }
+    index = StoryIndex(compile_story(story))
+    assert index.dangling_targets() == [("start", "ghost")]
+    assert index.broken_combat_nodes() == [("fight", "defeat_node")]
+    assert index.unreachable_nodes() == ["island"]
+    assert [sorted(cycle) for cycle in index.trapped_cycles()] == [["loop_a", "loop_b"]]
+    assert index.gated_nodes() == ["locked"]
+    assert len(index.problems()) == 5
+
+def test_loops_with_a_way_out_are_fine():
+    story = {
+            "start": node("narrative", "a"),
+            "a": node("narrative", "b"),
+            "b": node("narrative", "a", "end"),
+            "end": node("narrative")
+            }
+    assert StoryIndex(compile_story(story)).problems() == []
+
+def test_missing_start_is_reported():
+    problems = StoryIndex(compile_story({"a": node("narrative")})).problems()
+    assert problems[0] == "The story has no start node"
+
+def mutually_reachable(graph, index):
+    nodes = graph.defined_nodes()
+    reach = {}
+    for source in nodes:
+        seen = {source}
+        queue = [source]
+        for current in queue:
+            for target in index.successors(current):
+                if graph.defined[target] and target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+        reach[source] = seen
+    return {(a, b): a in reach[b] and b in reach[a] for a in nodes for b in nodes}
+
+def test_components_match_reachability():
+    rng = random.Random(3)
+    for _ in range(30):
+        names = [f"n{i}" for i in range(rng.randrange(2, 25))]
+        story = {name: node("narrative", *rng.sample(names + ["gone"], rng.randrange(3))) for name in names}
+        graph = compile_story(story)
+        index = StoryIndex(graph, start_node="n0")
+        for (a, b), together in mutually_reachable(graph, index).items():
+            assert (index.component[a] == index.component[b]) == together
+        assert all(index.component[n] == NO_NODE for n in range(len(graph.defined)) if not graph.defined[n])
+
+def test_deep_story_doesnt_recurse():
+    length = 20000 # far deeper than python lets a recursive walk go
+    story = {f"n{i}": node("narrative", f"n{(i + 1) % length}") for i in range(length)}
+    story["start"] = node("narrative", "n0")
+    index = StoryIndex(compile_story(story))
+    assert index.component_count == 2 # the whole ring, and start
+    assert index.unreachable_nodes() == []
+    assert len(index.trapped_cycles()) == 1
@@ -0,0 +1,75 @@
+# a bundle that is stale, cut short or damaged is turned down (and rebuilt by the game) instead of
+# mapped, and turning one down doesn't leave the file mapped
+import mmap
+import types
+import pytest
+from atomic_file import write_atomically
+import story_bundle
+from story_bundle import build_bundle, hash_file, map_bundle, HEADER, SECTION, SECTIONS
+from story_content import get_story_content
+from story_graph import compile_story
+
+@pytest.fixture
+def bundle(tmp_path):
+    source = tmp_path / "story_content.py"
+    source.write_text("story")
+    path = tmp_path / "story.bundle"
+    write_atomically(str(path), build_bundle(compile_story(get_story_content()), hash_file(str(source)),
+                                             source.stat()))
+    return path, source
+
+@pytest.fixture
+def maps(monkeypatch):
+    opened = []
+    def record(*args, **kwargs):
+        data = mmap.mmap(*args, **kwargs)
+        opened.append(data)
+        return data
+    monkeypatch.setattr(story_bundle, "mmap", types.SimpleNamespace(mmap=record, ACCESS_READ=mmap.ACCESS_READ))
+    return opened
+
+def damage(path, offset, data):
+    contents = bytearray(path.read_bytes())
+    contents[offset:offset + len(data)] = data
+    path.write_bytes(bytes(contents))
+
+def section_entry(name):
+    return HEADER.size + SECTION.size * [section for section, typecode in SECTIONS].index(name)
+
+def test_good_bundle_is_mapped(bundle, maps):
+    path, source = bundle
+    graph = map_bundle(str(path), str(source), source.stat())
+    assert graph is not None and graph.find("start") != -1
+    assert not maps[0].closed
+
+def test_edited_source_is_turned_down(bundle, maps):
+    path, source = bundle
+    source.write_text("edited story")
+    assert map_bundle(str(path), str(source), source.stat()) is None
+    assert maps[0].closed
+
+@pytest.mark.parametrize("cut", [4, HEADER.size - 1, HEADER.size + 5, -3])
+def test_short_bundle_is_turned_down(bundle, maps, cut):
+    path, source = bundle
+    path.write_bytes(path.read_bytes()[:cut])
+    assert map_bundle(str(path), str(source), source.stat()) is None
+    assert maps[0].closed
+
+@pytest.mark.parametrize("name, offset, size", [
+        ("payload_blob", 1 << 40, 4), # past the end of the file
+        ("choice_keys", None, 6), # not a whole number of items
+        ("node_names", None, 0), # fewer items than the header's node count
+        ("string_blob", 3, 0) # inside the header
+        ])
+def test_damaged_table_is_turned_down(bundle, maps, name, offset, size):
+    path, source = bundle
+    entry = section_entry(name)
+    old_offset, old_size = SECTION.unpack_from(path.read_bytes(), entry)
+    damage(path, entry, SECTION.pack(old_offset if offset is None else offset, size))
+    assert map_bundle(str(path), str(source), source.stat()) is None
+    assert maps[0].closed
+
+def test_missing_bundle_is_none(tmp_path):
+    source = tmp_path / "story_content.py"
+    source.write_text("story")
+    assert map_bundle(str(tmp_path / "story.bundle"), str(source), source.stat()) is None
@@ -0,0 +1,66 @@
+# replacing nodes in place has to leave the graph looking like it was compiled that way, and choice
+# ids are found the same way in a graph, its copies and a mapped bundle
+import random
+import pytest
+from atomic_file import write_atomically
+from story_bundle import build_bundle, hash_file, map_bundle
+from story_content import get_story_content
+from story_graph import StoryGraph, compile_story, NO_NODE
+
+def scan_position(graph, node, choice_id):
+    for position, choice in enumerate(graph.choice_lists[node]):
+        if choice["id"] == choice_id:
+            return position
+    return NO_NODE
+
+def assert_choices_found(graph):
+    for node in graph.defined_nodes():
+        for choice in graph.choice_lists[node]:
+            assert graph.choice_position(node, choice["id"]) == scan_position(graph, node, choice["id"])
+        assert graph.choice_position(node, "no such choice") == NO_NODE
+
+def test_combat_node_replaced_by_a_story_node_loses_its_targets():
+    graph = StoryGraph()
+    node = graph.add_node("fight", "combat", {"victory_node": "won", "defeat_node": "lost"}, [])
+    assert graph.victory_targets[node] != NO_NODE and graph.defeat_targets[node] != NO_NODE
+    graph.add_node("fight", "story", {"text": "nothing here"}, [{"id": "on", "next_node": "won"}])
+    assert graph.victory_targets[node] == NO_NODE and graph.defeat_targets[node] == NO_NODE
+
+def test_choice_index_follows_replacements_and_compaction():
+    rng = random.Random(4)
+    graph = StoryGraph()
+    for _ in range(5000):
+        node_id = f"n{rng.randrange(50)}"
+        choices = [{"id": f"c{rng.randrange(8)}", "next_node": f"n{rng.randrange(50)}"}
+                   for _ in range(rng.randrange(6))]
+        graph.add_node(node_id, "story", {}, choices)
+    assert_choices_found(graph)
+    copied = graph.copy()
+    copied.add_node("n0", "story", {}, [{"id": "fresh", "next_node": "n1"}])
+    assert copied.choice_position(copied.find("n0"), "fresh") == 0
+    assert graph.choice_position(graph.find("n0"), "fresh") == NO_NODE
+    assert_choices_found(graph)
+    assert_choices_found(copied)
+
+def test_repeated_choice_id_finds_the_first():
+    graph = StoryGraph()
+    node = graph.add_node("a", "story", {}, [{"id": "x", "next_node": "b"}, {"id": "x", "next_node": "c"}])
+    assert graph.choice_position(node, "x") == 0
+
+@pytest.fixture
+def mapped(tmp_path):
+    graph = compile_story(get_story_content())
+    source = tmp_path / "story_content.py"
+    source.write_text("story")
+    path = str(tmp_path / "story.bundle")
+    write_atomically(path, build_bundle(graph, hash_file(str(source)), source.stat()))
+    return graph, map_bundle(path, str(source), source.stat())
+
+def test_mapped_bundle_finds_the_same_choices(mapped):
+    graph, mapped = mapped
+    for node in graph.defined_nodes():
+        for choice in graph.choice_lists[node]:
+            assert mapped.choice_position(node, choice["id"]) == graph.choice_position(node, choice["id"])
+        assert mapped.choice_position(node, "no such choice") == NO_NODE
+    assert_choices_found(mapped)
+    assert_choices_found(mapped.copy())
@@ -0,0 +1,68 @@
+# a campaign on disk has to play like the same story compiled in memory, while only a few chapters
+# are ever held at once
+import pytest
+import story_loader
+from story_content import get_story_content
+from story_graph import compile_story
+from story_loader import load_campaign, export_story
+
+def chain_story(length):
+    story = {}
+    for i in range(length):
+        choices = [{"id": "on", "text": "Go on", "next_node": f"n{i + 1}"}] if i + 1 < length else []
+        story[f"n{i}"] = {"type": "narrative", "content": {"text": f"Scene {i}"}, "choices": choices}
+    return story
+
+def test_exported_story_loads_back(tmp_path):
+    story = get_story_content()
+    export_story(story, str(tmp_path), chapter_size=2)
+    graph = load_campaign(str(tmp_path)).graph
+    compiled = compile_story(story)
+    for node_id, node_data in story.items():
+        node = graph.find(node_id)
+        assert graph.contents[node] == node_data["content"]
+        assert graph.choice_lists[node] == node_data.get("choices", [])
+        assert graph.node_type(node) == compiled.node_type(compiled.find(node_id))
+        for position, choice in enumerate(node_data.get("choices", [])):
+            assert graph.node_names[graph.choice_target(node, position)] == choice["next_node"]
+
+def test_only_the_last_chapters_stay_loaded(tmp_path, monkeypatch):
+    export_story(chain_story(50), str(tmp_path), chapter_size=10)
+    campaign = load_campaign(str(tmp_path), resident_chapters=2)
+    reads = []
+    real_read_records = story_loader.read_records
+    monkeypatch.setattr(story_loader, "read_records", lambda path: reads.append(path) or real_read_records(path))
+    graph = campaign.graph
+    for i in range(50):
+        assert graph.contents[graph.find(f"n{i}")] == {"text": f"Scene {i}"}
+        assert len(campaign.resident) <= 2
+    assert len(reads) == 5 # walked in order, every chapter is read once
+    assert list(campaign.resident) == [3, 4]
+
+    graph.contents[graph.find("n35")] # still loaded, and now the newest
+    assert len(reads) == 5 and list(campaign.resident) == [4, 3]
+    graph.contents[graph.find("n0")] # evicted long ago, read again and 4 goes
+    assert len(reads) == 6 and list(campaign.resident) == [3, 0]
+
+def test_missing_nodes_are_reported(tmp_path):
+    story = chain_story(3)
+    story["n2"]["choices"] = [{"id": "lost", "text": "Get lost", "next_node": "nowhere"}]
+    export_story(story, str(tmp_path))
+    assert load_campaign(str(tmp_path)).dangling == ["nowhere"]
+    with pytest.raises(ValueError, match="nowhere"):
+        load_campaign(str(tmp_path), strict=True)
+
+@pytest.mark.parametrize("line, message", [
+        ('{"id": "a", "type": "narrative", "content": {}}\n{not json', ":2: not valid json"),
+        ('{"id": "a", "type": "cutscene", "content": {}}', "has type 'cutscene'"),
+        ('{"id": "a", "type": "combat", "content": {}}', "doesn't name an enemy"),
+        ('{"id": "a", "type": "narrative", "content": {}}\n{"id": "a", "type": "narrative", "content": {}}',
+         "defined twice"),
+        ('{"id": "a", "type": "narrative", "content": {}, "choices": [{"id": "1", "next_node": "b"}, '
+         '{"id": "1", "next_node": "c"}]}', "two choices with id 1")
+        ])
+def test_bad_nodes_are_refused(tmp_path, line, message):
+    path = tmp_path / "campaign.jsonl"
+    path.write_text(line + "\n")
+    with pytest.raises(ValueError, match=message):
+        load_campaign(str(path))
@@ -0,0 +1,89 @@
+# the visited bits, flags and choice ring have to survive a save exactly, and a save made against a
+# different story mustn't mark the wrong nodes visited
+import json
+import pytest
+from save_journal import diff_state
+from story_graph import compile_story
+from story_state import StoryState, restore_story_state, HISTORY_SIZE
+
+def chain_graph(length):
+    return compile_story({f"n{i}": {"type": "narrative", "content": {},
+                                    "choices": [{"id": "on", "next_node": f"n{(i + 1) % length}"}]}
+                          for i in range(length)})
+
+def test_visited_bits():
+    state = StoryState()
+    for node in (0, 63, 64, 1000):
+        state.visit(node)
+    assert [node for node in range(1100) if state.has_visited(node)] == [0, 63, 64, 1000]
+
+def test_flags():
+    state = StoryState()
+    state.set_flag("met_king")
+    state.set_flag("has_key")
+    state.set_flag("met_king")
+    assert state.has_flag("met_king") and state.has_flag("has_key")
+    assert not state.has_flag("saw_dragon")
+
+@pytest.mark.parametrize("choices", [0, 1, 8, 9, 50])
+def test_ring_keeps_the_newest(choices):
+    state = StoryState(history_size=8)
+    for i in range(choices):
+        state.record_choice(i, i % 3)
+    assert state.recent_choices() == [(i, i % 3) for i in range(max(0, choices - 8), choices)]
+    assert len(state.history) == 8
+
+@pytest.mark.parametrize("choices", [0, 5, HISTORY_SIZE, HISTORY_SIZE * 2 + 3])
+def test_snapshot_round_trip(choices):
+    graph = chain_graph(200)
+    state = StoryState()
+    for i in range(choices):
+        state.visit(i * 3 % 200)
+        state.record_choice(i * 3 % 200, 0)
+    state.set_flag("met_king")
+    data = json.loads(json.dumps(state.snapshot(graph))) # the way it comes back from a save
+    restored = restore_story_state(data, graph)
+    assert restored.recent_choices() == state.recent_choices()
+    assert all(restored.has_visited(node) == state.has_visited(node) for node in range(200))
+    assert restored.has_flag("met_king")
+    restored.record_choice(7, 1) # and the ring carries on from where it was
+    state.record_choice(7, 1)
+    assert restored.recent_choices() == state.recent_choices()
+
+def test_smaller_ring_keeps_the_newest():
+    graph = chain_graph(100)
+    state = StoryState()
+    for i in range(20):
+        state.record_choice(i, 0)
+    restored = restore_story_state(state.snapshot(graph), graph, history_size=4)
+    assert restored.recent_choices() == [(i, 0) for i in range(16, 20)]
+
+def test_one_choice_is_a_small_delta():
+    graph = chain_graph(500)
+    state = StoryState()
+    for node in range(0, 400, 7):
+        state.visit(node)
+        state.record_choice(node, 0)
+    before = state.snapshot(graph)
+    state.visit(450)
+    state.record_choice(450, 0)
+    delta = diff_state(before, state.snapshot(graph))
+    assert set(delta) == {"visited", "history", "history_next"}
+    assert len(delta["visited"]) == 1 and len(delta["history"]) == 1
+
+def test_renumbered_story_drops_the_node_bits():
+    state = StoryState()
+    state.visit(3)
+    state.record_choice(3, 0)
+    state.set_flag("met_king")
+    data = state.snapshot(chain_graph(10))
+    renamed = compile_story({f"m{i}": {"type": "narrative", "content": {}, "choices": []} for i in range(10)})
+    restored = restore_story_state(data, renamed)
+    assert not restored.has_visited(3) and restored.recent_choices() == []
+    assert restored.has_flag("met_king") # flags are names, they still mean the same thing
+
+def test_appended_story_keeps_the_node_bits():
+    state = StoryState()
+    state.visit(3)
+    data = state.snapshot(chain_graph(10))
+    assert restore_story_state(data, chain_graph(20)).has_visited(3)
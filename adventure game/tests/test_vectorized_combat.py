@@ -0,0 +1,30 @@
+# the numpy engine has to tell the same story as Combat played one fight at a time
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vectorized_combat import compare_with_scalar, simulate, FLED, VICTORY
+
+@pytest.mark.parametrize("player_class, enemy_classes, level, policy_name", [
+        ("Warrior", ("Goblin",), 1, "attack"),
+        ("Archer", ("Orc", "Ogre"), 1, "cautious"),
+        ("Mage", ("Orc", "Ogre"), 1, "cautious"),
+        ("Mage", ("Ogre", "Ogre"), 1, "cautious")
+        ])
+def test_vectorized_matches_scalar(player_class, enemy_classes, level, policy_name):
+    comparison = compare_with_scalar(player_class, enemy_classes, level, fights=1000, policy_name=policy_name)
+    assert comparison["consistent"], comparison["z_scores"]
+
+# the mage can't win this one and gets away some of the time, so the comparison above has a real
+# distribution to check and not just the same fight a thousand times
+def test_fleeing_is_random():
+    result = simulate("Mage", ("Ogre", "Ogre"), 1, 1000, "cautious", seed=0)
+    assert result.rate(VICTORY) == 0
+    assert 0.2 < result.rate(FLED) < 0.6
+    assert np.std(result.turns) > 0
+
+def test_same_seed_same_fights():
+    first = simulate("Mage", ("Orc", "Ogre"), 1, 200, "cautious", seed=7)
+    second = simulate("Mage", ("Orc", "Ogre"), 1, 200, "cautious", seed=7)
+    assert np.array_equal(first.outcomes, second.outcomes)
+    assert np.array_equal(first.turns, second.turns)
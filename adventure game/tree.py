@@ -1,54 +1,180 @@
-from story_content import get_story_content
+from collections.abc import Mapping
+from story_graph import StoryGraph, NO_NODE
+from story_bundle import load_story_graph
+from story_analysis import StoryDistances, NO_DISTANCE
+from story_state import StoryState
 
 class StoryNode:
-    def __init__(self, node_id, node_type, content, choices=None):
+    def __init__(self, node_id, node_type, content, choices=None, index=NO_NODE):
         self.node_id = node_id
         self.node_type = node_type
         self.content = content
         self.choices = choices if choices else []
         self.combat_data = None
+        self.index = index # the node's number in the compiled graph
+
+# story.nodes still works like the old dict of StoryNodes, the nodes are made from the graph when
+# they are first looked at
+class StoryNodes(Mapping):
+    def __init__(self, tree):
+        self.tree = tree
+        self.views = {}
+
+    def view(self, node):
+        story_node = self.views.get(node)
+        if story_node is None:
+            graph = self.tree.graph
+            story_node = StoryNode(graph.node_names[node], graph.node_type(node), graph.contents[node],
+                                   graph.choice_lists[node], node)
+            if story_node.node_type == "combat":
+                story_node.combat_data = story_node.content
+            self.views[node] = story_node
+        return story_node
+
+    def __getitem__(self, node_id):
+        node = self.tree.graph.find(node_id)
+        if node == NO_NODE:
+            raise KeyError(node_id)
+        return self.view(node)
+
+    def __contains__(self, node_id):
+        return self.tree.graph.find(node_id) != NO_NODE
+
+    def __iter__(self):
+        graph = self.tree.graph
+        return iter([graph.node_names[node] for node in graph.defined_nodes()])
+
+    def __len__(self):
+        return len(self.tree.graph.defined_nodes())
 
 class StoryTree:
-    def __init__(self):
-        self.nodes = {}
-        self.current_node = None
+    def __init__(self, graph=None, shared=False):
+        self.graph = graph if graph is not None else StoryGraph()
+        self.shared = shared # the graph belongs to other trees too, copy it before changing it
+        self.distances = None # StoryDistances, worked out the first time somebody asks
+        self.nodes = StoryNodes(self)
+        self.current = NO_NODE
+        self.state = StoryState() # visited nodes, recent choices and flags for this session
+
+    @property
+    def current_node(self):
+        if self.current == NO_NODE:
+            return None
+        return self.nodes.view(self.current)
+
+    @current_node.setter
+    def current_node(self, node):
+        self.current = NO_NODE if node is None else node.index
+        if node is not None:
+            self.state.visit(node.index)
 
     def add_node(self, node_id, node_type, content, choices):
-        self.nodes[node_id] = StoryNode(node_id, node_type, content, choices)
+        if self.shared:
+            self.graph = self.graph.copy()
+            self.shared = False
+            if self.distances is not None:
+                self.distances = StoryDistances(self.graph, copy_from=self.distances)
+        node = self.graph.find(node_id)
+        before = self.distances.node_state(node) if self.distances is not None and node != NO_NODE else None
+        node = self.graph.add_node(node_id, node_type, content, choices)
+        self.nodes.views.pop(node, None)
+        if self.distances is not None:
+            self.distances.node_added(node, before)
 
+    # a new playthrough, nothing visited yet
     def start_story(self, start_node):
-        self.current_node = self.nodes.get(start_node)
+        self.state = StoryState()
+        self.move_to(self.graph.find(start_node))
+
+    def move_to(self, node):
+        # a choice can lead to a node nobody wrote yet, that ends the story like a missing key used to
+        self.current = node if node != NO_NODE and self.graph.defined[node] else NO_NODE
+        if self.current != NO_NODE:
+            self.state.visit(self.current)
+        return self.current_node
+
+    # whether the choice at position can be picked, its requires_visited node has been visited and
+    # its requires_flag is set
+    def choice_available(self, position):
+        if self.current == NO_NODE or not 0 <= position < self.graph.choice_count[self.current]:
+            return False
+        slot = self.graph.choice_first[self.current] + position
+        required_node = self.graph.choice_visited[slot]
+        if required_node != NO_NODE and not self.state.has_visited(required_node):
+            return False
+        required_flag = self.graph.choice_flags[slot]
+        return required_flag == NO_NODE or self.state.has_flag(self.graph.strings[required_flag])
+
+    def available_positions(self):
+        if self.current == NO_NODE:
+            return []
+        return [position for position in range(self.graph.choice_count[self.current]) if self.choice_available(position)]
 
     def make_choice(self, choice_id):
-        if not self.current_node:
+        if self.current == NO_NODE:
             return None
+        return self.make_choice_at(self.graph.choice_position(self.current, choice_id))
 
-        current_node = self.current_node
-        if choice_id not in [choice["id"] for choice in current_node.choices]:
+    # same as make_choice but by the choice's place in the list, what the menus already have
+    def make_choice_at(self, position):
+        if not self.choice_available(position):
             return None
-    
-        for choice in current_node.choices:
-            if choice["id"] == choice_id:
-                next_node = choice["next_node"]
-                self.current_node = self.nodes.get(next_node)
-                return self.current_node
-        return None
+        node = self.graph.choice_target(self.current, position)
+        if node == NO_NODE:
+            return None
+        flag = self.graph.choice_sets[self.graph.choice_first[self.current] + position]
+        if flag != NO_NODE:
+            self.state.set_flag(self.graph.strings[flag])
+        self.state.record_choice(self.current, position)
+        return self.move_to(node)
+
+    # where the story goes after the fight at the current combat node
+    def finish_combat(self, victory):
+        if self.current == NO_NODE:
+            return None
+        targets = self.graph.victory_targets if victory else self.graph.defeat_targets
+        return self.move_to(targets[self.current])
+
+    def get_distances(self):
+        if self.distances is None:
+            self.distances = StoryDistances(self.graph)
+        return self.distances
+
+    # how many choices the current node is from the nearest fight, the start or an ending, None
+    # when there is no way to get there
+    def distance_from_current(self, distance):
+        if self.current == NO_NODE or distance[self.current] == NO_DISTANCE:
+            return None
+        return distance[self.current]
+
+    def distance_to_combat(self):
+        return self.distance_from_current(self.get_distances().combat)
+
+    def distance_to_start(self):
+        return self.distance_from_current(self.get_distances().start)
+
+    def distance_to_ending(self):
+        return self.distance_from_current(self.get_distances().ending)
 
     def get_available_choices(self):
         if self.current_node:
-            return self.current_node.choices
+            choices = self.current_node.choices
+            return [choices[position] for position in self.available_positions()]
         return None
 
-def create_story():
-    story = StoryTree()
-    story_data = get_story_content()
+# the content never changes while the game runs, so it is loaded once (from the bundle when it is
+# up to date) and shared by every story
+compiled_story = None
 
-    for node_id, node_data in story_data.items():
-        choices = node_data.get("choices", []) # checks if a node has choices attached
-        story.add_node(node_id, node_data["type"], node_data["content"], choices)
-        if node_data["type"] == "combat":
-            story.nodes[node_id].combat_data = node_data["content"]
+def get_compiled_story():
+    global compiled_story
+    if compiled_story is None:
+        compiled_story = load_story_graph()
+    return compiled_story
 
+# graph is a campaign's graph from story_loader, the built in story when there isn't one
+def create_story(graph=None):
+    story = StoryTree(graph if graph is not None else get_compiled_story(), shared=True)
     story.start_story("start")
     return story
 
@@ -58,11 +184,17 @@ def handle_story_progression(story):
 
     current_node = story.current_node
     if current_node.node_type == "combat":
-        return current_node.combat_data
+        return {
+                "type": "combat",
+                "content": current_node.combat_data
+                }
     if current_node.node_type in ["narrative", "dialog"]:
+        # choices whose requirements aren't met are left out, positions maps the ones shown back to the node's list
+        positions = story.available_positions()
         return {
                 "type": current_node.node_type,
                 "content": current_node.content,
-                "choices": current_node.choices
+                "choices": [current_node.choices[position] for position in positions],
+                "positions": positions
                 }
     return None
@@ -0,0 +1,325 @@
+# numpy version of the headless simulator. every fight is a row in a set of arrays and all the
+# fights move forward one turn at a time, so a balance pass doesn't go through Combat objects.
+# it follows the same rules as Combat.handle_combat_turn and the policies in simulation.py, and
+# compare_with_scalar runs both engines side by side to check that they agree.
+import argparse
+import math
+import time
+from seeding import derive_rng
+from simulation import create_player, create_enemy, simulate_fight, SimulationStats, POLICIES, MAX_TURNS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ATTACK = 0
+CAST = 1
+ITEM = 2
+FLEE = 3
+
+ONGOING = 0
+VICTORY = 1
+DEFEAT = 2
+FLED = 3
+TIMEOUT = 4
+
+OUTCOME_NAMES = {
+        VICTORY: "VICTORY",
+        DEFEAT: "DEFEAT",
+        FLED: "FLED",
+        TIMEOUT: "TIMEOUT"
+        }
+
+STAT_NAMES = ("Strength", "Health", "Defense", "Magic")
+
+FLEE_CHANCE = 0.4
+HEALTH_POTION_VALUE = 50
+
+def linear_growth(level_one, level_two):
+    # every class uses base + growth * (level - 1), so two samples are enough to describe it
+    base = {stat: level_one.stats[stat] for stat in STAT_NAMES}
+    growth = {stat: level_two.stats[stat] - level_one.stats[stat] for stat in STAT_NAMES}
+    base["Mana"] = level_one.max_mana if hasattr(level_one, "max_mana") else 0
+    growth["Mana"] = (level_two.max_mana - level_one.max_mana) if hasattr(level_one, "max_mana") else 0
+    return base, growth
+
+class VectorizedResult:
+    def __init__(self, outcomes, turns, damage_dealt, damage_taken):
+        self.outcomes = outcomes
+        self.turns = turns
+        self.damage_dealt = damage_dealt
+        self.damage_taken = damage_taken
+
+    @property
+    def fights(self):
+        return len(self.outcomes)
+
+    def rate(self, outcome):
+        return float(np.mean(self.outcomes == outcome))
+
+    @property
+    def win_rate(self):
+        return self.rate(VICTORY)
+
+    def to_simulation_stats(self):
+        stats = SimulationStats()
+        stats.fights = self.fights
+        for values, counter in ((self.outcomes, stats.outcomes), (self.turns, stats.turns),
+                                (self.damage_dealt.astype(np.int64), stats.damage_dealt),
+                                (self.damage_taken.astype(np.int64), stats.damage_taken)):
+            keys, counts = np.unique(values, return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                counter[key] = count
+        for code, name in OUTCOME_NAMES.items():
+            if code in stats.outcomes:
+                stats.outcomes[name] = stats.outcomes.pop(code)
+        return stats
+
+class VectorizedCombat:
+    def __init__(self, player_class, enemy_classes, level, fights, policy_name="caster", seed=None):
+        if np is None:
+            raise ImportError("vectorized_combat needs numpy (pip install numpy)")
+        if policy_name not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy_name}")
+        if isinstance(enemy_classes, str):
+            enemy_classes = (enemy_classes,)
+
+        self.policy_name = policy_name
+        self.fights = fights
+        self.rng = np.random.default_rng(seed)
+
+        player = create_player(player_class, level)
+        self.player_base, self.player_growth = linear_growth(
+                create_player(player_class, 1), create_player(player_class, 2))
+        self.spells = list(player.spells.values())
+
+        enemies = []
+        for enemy_class in enemy_classes:
+            enemy = create_enemy(enemy_class, level)
+            if hasattr(enemy, "boss_class"):
+                raise ValueError(f"{enemy_class} turns go through the boss AI, use simulation.py for bosses")
+            enemies.append(enemy)
+
+        n = fights
+        self.level = np.full(n, player.level, dtype=np.int64)
+        self.experience = np.zeros(n, dtype=np.int64)
+        self.experience_to_next_level = np.full(n, player.experience_to_next_level, dtype=np.int64)
+        self.health = np.full(n, player.stats["Health"], dtype=np.float64)
+        self.strength = np.full(n, player.stats["Strength"], dtype=np.int64)
+        self.defense = np.full(n, player.stats["Defense"], dtype=np.int64)
+        self.magic = np.full(n, player.stats["Magic"], dtype=np.int64)
+        self.mana = np.full(n, player.current_mana, dtype=np.float64)
+        self.max_mana = np.full(n, player.max_mana, dtype=np.int64)
+        self.potions = np.full(n, player.inventory.get_item_count("Health Potion"), dtype=np.int64)
+
+        self.enemy_health = np.tile(np.array([e.stats["Health"] for e in enemies], dtype=np.float64), (n, 1))
+        self.enemy_strength = np.array([e.stats["Strength"] for e in enemies], dtype=np.int64)
+        self.enemy_defense = np.array([e.stats["Defense"] for e in enemies], dtype=np.int64)
+        self.enemy_experience = np.array([e.experience_value for e in enemies], dtype=np.int64)
+
+        self.spell_cost = np.array([s.mana_cost for s in self.spells], dtype=np.float64)
+        self.spell_base = np.array([s.base_damage for s in self.spells], dtype=np.float64)
+        self.spell_scaling = np.array([s.scaling_factor for s in self.spells], dtype=np.float64)
+
+        self.outcomes = np.full(n, ONGOING, dtype=np.int8)
+        self.turns = np.zeros(n, dtype=np.int64)
+
+    def max_health(self, rows):
+        return self.player_base["Health"] + self.player_growth["Health"] * (self.level[rows] - 1)
+
+    def choose_actions(self, rows):
+        actions = np.full(len(rows), ATTACK, dtype=np.int8)
+        spell_choice = np.full(len(rows), -1, dtype=np.int64)
+
+        if self.policy_name in ("caster", "cautious") and self.spells:
+            damage = self.spell_base + self.magic[rows, None] * self.spell_scaling
+            castable = (self.mana[rows, None] >= self.spell_cost) & (damage > 0)
+            masked = np.where(castable, damage, -np.inf)
+            best = np.argmax(masked, axis=1)
+            can_cast = castable.any(axis=1)
+            actions[can_cast] = CAST
+            spell_choice[can_cast] = best[can_cast]
+
+        if self.policy_name == "cautious":
+            low = self.health[rows] < self.max_health(rows) * 0.3
+            has_potion = self.potions[rows] > 0
+            actions[low & has_potion] = ITEM
+            actions[low & ~has_potion] = FLEE
+
+        return actions, spell_choice
+
+    def gain_experience(self, rows, experience):
+        self.experience[rows] += experience
+        leveling = rows[self.experience[rows] >= self.experience_to_next_level[rows]]
+        if not len(leveling):
+            return
+        self.level[leveling] += 1
+        self.experience[leveling] -= self.experience_to_next_level[leveling]
+        self.experience_to_next_level[leveling] = (self.experience_to_next_level[leveling] * 1.5).astype(np.int64)
+        steps = self.level[leveling] - 1
+        base, growth = self.player_base, self.player_growth
+        self.strength[leveling] = base["Strength"] + growth["Strength"] * steps
+        self.health[leveling] = base["Health"] + growth["Health"] * steps
+        self.defense[leveling] = base["Defense"] + growth["Defense"] * steps
+        self.magic[leveling] = base["Magic"] + growth["Magic"] * steps
+        new_max_mana = base["Mana"] + growth["Mana"] * steps
+        self.mana[leveling] += new_max_mana - self.max_mana[leveling]
+        self.max_mana[leveling] = new_max_mana
+
+    def damage_enemy(self, rows, targets, damage):
+        health = self.enemy_health[rows, targets] - damage
+        killed = health < 0
+        health[killed] = 0
+        self.enemy_health[rows, targets] = health
+        # Combat only hands out experience when the blow takes health below zero
+        if killed.any():
+            self.gain_experience(rows[killed], self.enemy_experience[targets[killed]])
+
+    def player_turn(self, rows):
+        actions, spell_choice = self.choose_actions(rows)
+        targets = np.argmax(self.enemy_health[rows] > 0, axis=1)
+
+        attacking = actions == ATTACK
+        if attacking.any():
+            attack_rows = rows[attacking]
+            attack_targets = targets[attacking]
+            damage = np.maximum(1, self.strength[attack_rows] - self.enemy_defense[attack_targets] // 2)
+            self.damage_enemy(attack_rows, attack_targets, damage)
+
+        casting = actions == CAST
+        if casting.any():
+            cast_rows = rows[casting]
+            spells = spell_choice[casting]
+            damage = self.spell_base[spells] + self.magic[cast_rows] * self.spell_scaling[spells]
+            self.mana[cast_rows] -= self.spell_cost[spells]
+            self.damage_enemy(cast_rows, targets[casting], damage)
+
+        drinking = actions == ITEM
+        if drinking.any():
+            item_rows = rows[drinking]
+            max_health = self.max_health(item_rows).astype(np.float64)
+            self.health[item_rows] = np.minimum(self.health[item_rows] + HEALTH_POTION_VALUE, max_health)
+            self.potions[item_rows] -= 1
+
+        fleeing = actions == FLEE
+        if fleeing.any():
+            flee_rows = rows[fleeing]
+            escaped = self.rng.random(len(flee_rows)) < FLEE_CHANCE
+            self.outcomes[flee_rows[escaped]] = FLED
+
+    def enemy_turn(self, rows):
+        alive = self.enemy_health[rows] > 0
+        living = alive.sum(axis=1)
+        # same as random.choice over the living enemies: pick the k-th living column
+        picks = (self.rng.random(len(rows)) * living).astype(np.int64)
+        attackers = np.argmax(np.cumsum(alive, axis=1) > picks[:, None], axis=1)
+        damage = np.maximum(1, self.enemy_strength[attackers] - self.defense[rows] // 2)
+        health = self.health[rows] - damage
+        health[health < 0] = 0
+        self.health[rows] = health
+
+    def run(self, max_turns=MAX_TURNS):
+        start_player_health = self.health.copy()
+        start_enemy_health = self.enemy_health.sum(axis=1)
+        for step in range(max_turns):
+            rows = np.flatnonzero(self.outcomes == ONGOING)
+            if not len(rows):
+                break
+            self.turns[rows] += 1
+            # every handle_combat_turn call flips the turn, so all fights stay on the same side
+            if step % 2 == 0:
+                self.player_turn(rows)
+            else:
+                self.enemy_turn(rows)
+            ongoing = rows[self.outcomes[rows] == ONGOING]
+            self.outcomes[ongoing[~(self.enemy_health[ongoing] > 0).any(axis=1)]] = VICTORY
+            ongoing = rows[self.outcomes[rows] == ONGOING]
+            self.outcomes[ongoing[self.health[ongoing] <= 0]] = DEFEAT
+        self.outcomes[self.outcomes == ONGOING] = TIMEOUT
+
+        return VectorizedResult(
+                self.outcomes.copy(),
+                self.turns.copy(),
+                start_enemy_health - self.enemy_health.sum(axis=1),
+                start_player_health - self.health
+                )
+
+def simulate(player_class, enemy_classes, level, fights, policy_name="caster", seed=None, max_turns=MAX_TURNS):
+    return VectorizedCombat(player_class, enemy_classes, level, fights, policy_name, seed).run(max_turns)
+
+def proportion_z(p1, p2, n1, n2):
+    pooled = (p1 * n1 + p2 * n2) / (n1 + n2)
+    spread = math.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    if spread == 0:
+        return 0.0 if p1 == p2 else math.inf
+    return (p1 - p2) / spread
+
+def mean_z(a, b):
+    spread = math.sqrt(np.var(a) / len(a) + np.var(b) / len(b))
+    difference = float(np.mean(a) - np.mean(b))
+    if spread == 0:
+        return 0.0 if difference == 0 else math.inf
+    return difference / spread
+
+def compare_with_scalar(player_class, enemy_classes, level, fights=2000, policy_name="caster", seed=0, tolerance=4.0):
+    if isinstance(enemy_classes, str):
+        enemy_classes = (enemy_classes,)
+    vector = simulate(player_class, enemy_classes, level, fights, policy_name, seed)
+
+    policy = POLICIES[policy_name]
+    scalar_fights = [simulate_fight(player_class, enemy_classes, level, policy,
+                                    rng=derive_rng(seed, player_class, enemy_classes, level, policy_name, n))
+                     for n in range(fights)]
+    codes = {name: code for code, name in OUTCOME_NAMES.items()}
+    scalar = VectorizedResult(
+            np.array([codes[f["outcome"]] for f in scalar_fights], dtype=np.int8),
+            np.array([f["turns"] for f in scalar_fights], dtype=np.int64),
+            np.array([f["damage_dealt"] for f in scalar_fights], dtype=np.float64),
+            np.array([f["damage_taken"] for f in scalar_fights], dtype=np.float64)
+            )
+
+    z_scores = {
+            "win_rate": proportion_z(vector.win_rate, scalar.win_rate, fights, fights),
+            "flee_rate": proportion_z(vector.rate(FLED), scalar.rate(FLED), fights, fights),
+            "turns": mean_z(vector.turns, scalar.turns),
+            "damage_dealt": mean_z(vector.damage_dealt, scalar.damage_dealt),
+            "damage_taken": mean_z(vector.damage_taken, scalar.damage_taken)
+            }
+    return {
+            "vector": vector,
+            "scalar": scalar,
+            "z_scores": z_scores,
+            "consistent": all(abs(z) < tolerance for z in z_scores.values())
+            }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run vectorized combat simulations")
+    parser.add_argument("player_class")
+    parser.add_argument("enemies", nargs="+")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--fights", type=int, default=1_000_000)
+    parser.add_argument("--policy", default="caster", choices=list(POLICIES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", type=int, default=0, help="also run this many scalar fights and compare")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = simulate(args.player_class, args.enemies, args.level, args.fights, args.policy, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"{result.fights} fights in {elapsed:.2f}s ({result.fights / elapsed:,.0f} fights/s)")
+    for code, name in OUTCOME_NAMES.items():
+        print(f"{name:<8} {result.rate(code) * 100:6.2f}%")
+    print(f"Turns    {result.turns.mean():6.2f}")
+    print(f"Dealt    {result.damage_dealt.mean():6.2f}")
+    print(f"Taken    {result.damage_taken.mean():6.2f}")
+
+    if args.check:
+        comparison = compare_with_scalar(args.player_class, args.enemies, args.level, args.check,
+                                         args.policy, args.seed)
+        for name, z in comparison["z_scores"].items():
+            print(f"z({name}) = {z:+.2f}")
+        print("consistent with Combat" if comparison["consistent"] else "DIVERGES from Combat")
+
+if __name__ == "__main__":
+    main()